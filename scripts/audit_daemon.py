@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Resident audit daemon for audit_logger.py (CLAUDE_AUDIT_DAEMON=1).
+
+Listens on ~/.claude/run/audit-daemon.sock, keeps host/user info and git
+metadata warm, and batches log writes from concurrent sessions into a single
+write (and, with CLAUDE_AUDIT_GROUP_COMMIT=1, a single fsync). A client is
+acknowledged only after its entry has been flushed to the log, so a daemon
+crash never drops an acknowledged entry; clients without an acknowledgement
+write the entry themselves. The daemon answers before the client's timeout
+and withdraws entries it could not start writing in time, so such an entry
+is never written twice.
+
+Only one daemon runs per user: a lock file is held for the daemon's lifetime
+and extra instances exit immediately.
+
+Usage:
+    audit_daemon.py           # Run in the foreground
+    audit_daemon.py --stop    # Ask a running daemon to exit
+
+Environment variables:
+    CLAUDE_AUDIT_DAEMON_IDLE  - Seconds without requests before exiting (default 600)
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+import audit_logger
+import audit_store
+from git_reader import find_git_dir
+
+BATCH_WINDOW = 0.005  # seconds to wait for more entries before writing
+MAX_BATCH = 256
+# How long a request waits for its entry to be written. Shorter than the
+# client's socket timeout, so the client hears the outcome before giving up
+WRITE_TIMEOUT = audit_logger.DAEMON_TIMEOUT / 2
+MAX_MESSAGE = 1024 * 1024
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def parse_idle_timeout(value):
+    try:
+        parsed = float(value) if value is not None else DEFAULT_IDLE_TIMEOUT
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+    return parsed if parsed > 0 else DEFAULT_IDLE_TIMEOUT
+
+
+class WriteRequest:
+    """One queued entry and the outcome of writing it."""
+
+    __slots__ = ("claimed", "done", "durable", "entry", "ok", "withdrawn")
+
+    def __init__(self, entry, durable):
+        self.entry = entry
+        self.durable = durable
+        self.done = threading.Event()
+        self.ok = False
+        self.claimed = False  # Taken into a batch by the writer thread
+        self.withdrawn = False  # Given up on by its client: never written
+
+
+class BatchWriter:
+    """Single writer thread that coalesces entries into one write per batch."""
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._fd = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, entry, durable=False, timeout=WRITE_TIMEOUT):
+        """Queue entry and block until it is written. Returns True on success.
+
+        An entry still queued after timeout is withdrawn, so False always
+        means it was not written and the client can write it itself without
+        duplicating it. One already being written is waited for.
+        """
+        request = WriteRequest(entry, durable)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            with self._lock:
+                if not request.claimed:
+                    request.withdrawn = True
+                    return False
+            request.done.wait()
+        return request.ok
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while len(batch) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                batch = [request for request in batch if not request.withdrawn]
+                for request in batch:
+                    request.claimed = True
+            if not batch:
+                continue
+            data = "".join(request.entry + "\n" for request in batch).encode("utf-8")
+            # Group commit: one fsync covers every durable entry in the batch
+            ok = self._write(data, any(request.durable for request in batch))
+            for request in batch:
+                request.ok = ok
+                request.done.set()
+
+    def _write(self, data, durable):
+        try:
+            fd = self._open()
+            while not audit_store.write_entry(fd, data):
+                self._close()  # Replaced by a rewrite: write to the new file
+                fd = self._open()
+            if durable:
+                audit_store.group_sync(self.log_file, fd)
+            st = os.fstat(fd)
+        except OSError as e:
+            print(f"audit_daemon: failed to write log: {e}", file=sys.stderr)
+            self._close()
+            return False
+        # The next batch reopens the fresh file if this one was rotated
+        audit_store.maybe_rotate(self.log_file, st)
+        return True
+
+    def _open(self):
+        # Reopen when the log was rotated or removed underneath us
+        if self._fd is not None:
+            try:
+                if os.stat(self.log_file).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except OSError:
+                pass
+            self._close()
+        self.log_file.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        return self._fd
+
+    def _close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+
+class GitInfoCache:
+    """In-memory git metadata keyed by worktree root and HEAD signature."""
+
+    def __init__(self, max_entries=256):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, cwd, check_dirty):
+        root, git_dir = find_git_dir(cwd)
+        signature = None
+        if git_dir and audit_logger.git_info_cacheable(git_dir):
+            signature = audit_logger.git_head_signature(git_dir)
+        if signature is not None:
+            with self._lock:
+                hit = self._entries.get(root)
+            if hit and hit[0] == signature and not check_dirty:
+                return dict(hit[1])
+
+        info = audit_logger.get_git_info(cwd, check_dirty=check_dirty)
+        if signature is not None:
+            with self._lock:
+                if len(self._entries) >= self._max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[root] = (signature, {**info, "dirty": False})
+        return info
+
+
+class AuditRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.last_activity = time.monotonic()
+        try:
+            payload = json.loads(self.rfile.read(MAX_MESSAGE))
+        except ValueError:
+            self.wfile.write(b"error\n")
+            return
+
+        if payload.get("control") == "stop":
+            self.wfile.write(b"ok\n")
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return
+
+        hook_data = payload.get("hook", {})
+        cwd = payload.get("cwd") or os.path.expanduser("~")
+        fmt = payload.get("format", "text")
+        try:
+            git_info = server.git_cache.get(cwd, bool(payload.get("check_dirty")))
+            formatter = audit_logger.LOG_FORMATTERS[fmt]
+            entry = formatter(hook_data, git_info, server.system_info)
+        except (OSError, LookupError, TypeError, ValueError, AttributeError) as e:
+            # Let the client fall back to writing the entry itself
+            print(f"audit_daemon: failed to format entry ({type(e).__name__}): {e}", file=sys.stderr)
+            self.wfile.write(b"error\n")
+            return
+
+        writer = server.get_writer(fmt)
+        written = writer.submit(entry, durable=bool(payload.get("durable")))
+        self.wfile.write(b"ok\n" if written else b"error\n")
+
+
+class AuditServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # Parallel sessions connect in bursts
+
+    def __init__(self, sock_path, log_dir):
+        super().__init__(str(sock_path), AuditRequestHandler)
+        self.system_info = audit_logger.get_system_info()
+        self.git_cache = GitInfoCache()
+        self.log_dir = log_dir
+        self._writers = {}
+        self._writers_lock = threading.Lock()
+        self.last_activity = time.monotonic()
+
+    def get_writer(self, fmt):
+        """One batch writer per log format (each format has its own file)."""
+        with self._writers_lock:
+            if fmt not in self._writers:
+                log_file = self.log_dir / audit_logger.LOG_FILENAMES[fmt]
+                self._writers[fmt] = BatchWriter(log_file)
+            return self._writers[fmt]
+
+
+def watch_idle(server, idle_timeout):
+    while True:
+        time.sleep(min(idle_timeout, 5))
+        if time.monotonic() - server.last_activity >= idle_timeout:
+            server.shutdown()
+            return
+
+
+def serve(sock_path=None, log_dir=None, idle_timeout=None):
+    """Run the daemon until idle or stopped. Returns a process exit code."""
+    sock_path = Path(sock_path or audit_logger.daemon_socket_path())
+    log_dir = Path(log_dir or os.path.dirname(audit_logger.audit_log_path()))
+    if idle_timeout is None:
+        idle_timeout = parse_idle_timeout(os.environ.get("CLAUDE_AUDIT_DAEMON_IDLE"))
+
+    sock_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    # Held for the daemon's lifetime
+    with audit_store.locked(f"{sock_path}.lock", blocking=False) as acquired:
+        if not acquired:
+            return 0  # Another daemon is already serving
+
+        # Holding the lock means any existing socket file is stale
+        try:
+            os.unlink(sock_path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o077)
+        try:
+            server = AuditServer(sock_path, log_dir)
+        finally:
+            os.umask(old_umask)
+
+        threading.Thread(target=watch_idle, args=(server, idle_timeout), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            try:
+                os.unlink(sock_path)
+            except FileNotFoundError:
+                pass
+    return 0
+
+
+def stop():
+    """Ask a running daemon to exit. Returns 0 if one acknowledged."""
+    return 0 if audit_logger.send_to_daemon({"control": "stop"}) else 1
+
+
+def main():
+    if not hasattr(socket, "AF_UNIX"):
+        print("audit_daemon: Unix sockets not supported on this platform", file=sys.stderr)
+        return 1
+    if "--stop" in sys.argv[1:]:
+        return stop()
+    return serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
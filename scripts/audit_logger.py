@@ -3,27 +3,60 @@
 Claude Code Enhanced Audit Logger
 Logs detailed command execution information with context.
 
+Environment variables:
+    CLAUDE_AUDIT_GIT_STATUS=1  - Include working tree dirty flag ("[dirty?]" when
+                                 the check exceeds its time budget)
+    CLAUDE_AUDIT_DIRTY_BUDGET  - Time budget for the dirty check in ms (default 300)
+    CLAUDE_AUDIT_DIRTY_UNTRACKED=1 - Count untracked files as dirty (slower)
+    CLAUDE_AUDIT_DAEMON=1      - Hand entries to the resident audit daemon
+                                 (scripts/audit_daemon.py), starting it on demand
+    CLAUDE_AUDIT_FORMAT=jsonl  - Write structured JSON Lines to command-audit.jsonl
+                                 instead of text records to command-audit.log
+    CLAUDE_AUDIT_MAX_BYTES=N   - Rotate the active log above N bytes (default
+                                 50 MiB, 0 disables); rotated segments are gzipped
+    CLAUDE_AUDIT_GROUP_COMMIT=1 - fsync entries, sharing one fsync between
+                                 concurrent writers (group commit)
+    CLAUDE_AUDIT_REDACT=0      - Log commands without redacting secrets
+    CLAUDE_AUDIT_REDACT_RULES  - Extra redaction rules file (default
+                                 ~/.claude/audit-redact.json, see audit_redact.py)
+    CLAUDE_HOOK_METRICS=1      - Record the timing of each git command to
+                                 ~/.claude/hook-metrics.jsonl (hooks/hook_metrics.py)
+
+Subcommands (run manually, not as a hook):
+    audit_logger.py query [--session S] [--repo R] [--since 7d] ...
+        Search the audit logs through an incrementally updated SQLite index
+    audit_logger.py stats [--since 30d] [--top 10] [--jobs 0] [--json]
+        Single-pass report: top commands, prefixes, per session/repo/hour, bursts
+    audit_logger.py redact [--dry-run]
+        Redact secrets from existing logs (rotated and compressed segments too)
+
 Exit codes:
     0 - Success
     1 - Invalid JSON input (blocking error)
     2 - Non-critical error (file write failed, unexpected error) - does not block operations
 """
 
+# Runs as a fresh interpreter on every Bash call: keep module-level imports to
+# what the common path needs and import everything else where it is used.
 import json
-import sys
-import shlex
-import subprocess
 import os
-import socket
-import getpass
-import traceback
-from datetime import datetime
-from pathlib import Path
+import sys
+
+import audit_redact
+import audit_store
+from git_reader import GIT_ENV_OVERRIDES, common_git_dir, find_git_dir, read_git_info, read_head
 
 
 def run_command(cmd, cwd=None, timeout=5):
     """Run a command safely with timeout."""
+    import shlex
+    import subprocess
+    import time
+
     cmd_list = shlex.split(cmd) if isinstance(cmd, str) else cmd
+    started = time.perf_counter()
+    returncode = None
+    timed_out = False
     try:
         result = subprocess.run(
             cmd_list,
@@ -33,6 +66,7 @@ def run_command(cmd, cwd=None, timeout=5):
             timeout=timeout,
             cwd=cwd,
         )
+        returncode = result.returncode
         return result.stdout.strip() if result.returncode == 0 else None
     except (
         subprocess.TimeoutExpired,
@@ -40,12 +74,201 @@ def run_command(cmd, cwd=None, timeout=5):
         FileNotFoundError,
         OSError,
     ) as e:
+        timed_out = isinstance(e, subprocess.TimeoutExpired)
         print(f"audit_logger: command failed: {' '.join(cmd_list)} ({e})", file=sys.stderr)
         return None
+    finally:
+        record_metric(None, cmd_list, time.perf_counter() - started, returncode, timed_out, cwd)
+
+
+def record_metric(handler, cmd, seconds, returncode, timed_out, cwd):
+    """Record a command's timing with hook_metrics (CLAUDE_HOOK_METRICS=1)."""
+    if os.environ.get("CLAUDE_HOOK_METRICS") != "1":
+        return
+    hooks_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "hooks")
+    if hooks_dir not in sys.path:
+        sys.path.append(hooks_dir)
+    import hook_metrics
+
+    hook_metrics.record("audit_logger", handler, cmd, seconds, returncode, timed_out, cwd)
+
+
+def git_cache_dir():
+    """Directory holding per-repository git metadata cache files."""
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "git-info")
+
+
+def _stat_signature(path):
+    """Return (inode, mtime_ns, size) for path, or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def git_head_signature(git_dir):
+    """Build a cheap signature that changes whenever HEAD could resolve differently.
+
+    Covers .git/HEAD itself, the loose ref it points at, packed-refs, and
+    (for detached HEADs) the tags directory used by ``git describe``.
+    """
+    head_path = os.path.join(git_dir, "HEAD")
+    head = read_head(git_dir)
+    if head is None:
+        return None
+
+    # Linked worktrees keep refs in the common dir
+    common_dir = common_git_dir(git_dir)
+    signature = [head, _stat_signature(head_path)]
+    if head.startswith("ref:"):
+        ref = head[len("ref:"):].strip()
+        signature.append(_stat_signature(os.path.join(common_dir, ref)))
+    else:
+        signature.append(_stat_signature(os.path.join(common_dir, "refs", "tags")))
+    signature.append(_stat_signature(os.path.join(common_dir, "packed-refs")))
+    return signature
+
+
+def git_info_cacheable(git_dir):
+    """Whether git_head_signature(git_dir) tracks what git would report.
+
+    GIT_DIR/GIT_WORK_TREE/GIT_COMMON_DIR point git elsewhere than the .git
+    found from cwd, and reftable refs live outside the files the signature
+    stats: both always run git.
+    """
+    if any(os.environ.get(var) for var in GIT_ENV_OVERRIDES):
+        return False
+    return not os.path.isdir(os.path.join(common_git_dir(git_dir), "reftable"))
+
+
+def _cache_file(repo_root, kind):
+    import hashlib
+
+    key = hashlib.sha1(repo_root.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(git_cache_dir(), f"{key}.{kind}.json")
+
+
+def _load_cache_entry(repo_root, kind):
+    try:
+        with open(_cache_file(repo_root, kind), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("root") != repo_root:
+        return None
+    return entry
+
+
+def _store_cache_entry(repo_root, kind, entry):
+    """Atomically write a cache file for repo_root.
+
+    One file per repository plus write-to-temp + os.replace means concurrent
+    sessions never observe a torn file; the last writer simply wins.
+    """
+    import tempfile
+
+    cache_file = _cache_file(repo_root, kind)
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"root": repo_root, **entry}, f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"audit_logger: failed to write git cache: {e}", file=sys.stderr)
+
+
+DEFAULT_DIRTY_BUDGET = 0.3  # seconds
+DIRTY_SNAPSHOT_TTL = 2.0  # reuse a result this long while index and HEAD are unchanged
+DIRTY_TIMEOUT_BACKOFF = 60.0  # don't retry a timed-out check sooner than this
+
+
+def parse_dirty_budget(value, default=DEFAULT_DIRTY_BUDGET):
+    """Parse CLAUDE_AUDIT_DIRTY_BUDGET (milliseconds) into seconds."""
+    if value is None:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        print("audit_logger: Invalid CLAUDE_AUDIT_DIRTY_BUDGET; using default", file=sys.stderr)
+        return default
+    return parsed / 1000 if parsed > 0 else default
+
+
+def git_status_dirty(cwd, budget, untracked=False):
+    """Run a bounded git status. Returns True/False, or None if over budget."""
+    import subprocess
+    import time
+
+    cmd = [
+        "git",
+        "--no-optional-locks",  # Never contend for index.lock with the session's own git
+        "status",
+        "--porcelain",
+        f"--untracked-files={'normal' if untracked else 'no'}",
+    ]
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(
+            cmd, cwd=cwd, capture_output=True, text=True, timeout=budget, check=False
+        )
+    except subprocess.TimeoutExpired:
+        record_metric("git_status", cmd, time.perf_counter() - started, None, True, cwd)
+        return None
+    except (subprocess.SubprocessError, OSError) as e:
+        record_metric("git_status", cmd, time.perf_counter() - started, None, False, cwd)
+        print(f"audit_logger: command failed: {' '.join(cmd)} ({e})", file=sys.stderr)
+        return False
+    record_metric("git_status", cmd, time.perf_counter() - started, result.returncode, False, cwd)
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+
+def get_dirty_state(cwd):
+    """Working tree dirty state: True, False, or None when it could not be
+    determined within CLAUDE_AUDIT_DIRTY_BUDGET.
+
+    Untracked files are skipped unless CLAUDE_AUDIT_DIRTY_UNTRACKED=1. Results
+    are cached per repository with the index and HEAD signatures: a result is
+    reused for a couple of seconds while both are unchanged, and a check that
+    ran out of time is not retried for a minute, so huge trees cost at most
+    one budget per minute.
+    """
+    import time
+
+    budget = parse_dirty_budget(os.environ.get("CLAUDE_AUDIT_DIRTY_BUDGET"))
+    untracked = os.environ.get("CLAUDE_AUDIT_DIRTY_UNTRACKED") == "1"
+    worktree_root, git_dir = find_git_dir(cwd)
+    if not git_dir or not git_info_cacheable(git_dir):
+        return git_status_dirty(cwd, budget, untracked)
+
+    key = [
+        _stat_signature(os.path.join(git_dir, "index")),
+        git_head_signature(git_dir),
+        untracked,
+    ]
+    snapshot = _load_cache_entry(worktree_root, "dirty")
+    now = time.time()
+    if snapshot and snapshot.get("key") == key:
+        ttl = DIRTY_TIMEOUT_BACKOFF if snapshot.get("dirty") is None else DIRTY_SNAPSHOT_TTL
+        if 0 <= now - snapshot.get("checked_at", 0) < ttl:
+            return snapshot.get("dirty")
+
+    dirty = git_status_dirty(cwd, budget, untracked)
+    _store_cache_entry(worktree_root, "dirty", {"key": key, "dirty": dirty, "checked_at": now})
+    return dirty
+
 
+def get_git_info(cwd, check_dirty=None):
+    """Get Git repository information
 
-def get_git_info(cwd):
-    """Get Git repository information"""
+    check_dirty defaults to the CLAUDE_AUDIT_GIT_STATUS opt-in.
+    """
     git_info = {}
 
     # Check if directory exists
@@ -57,24 +280,35 @@ def get_git_info(cwd):
             "dirty": False,
         }
 
-    # Repository name
-    repo_root = run_command(["git", "rev-parse", "--show-toplevel"], cwd)
-    git_info["repo"] = os.path.basename(repo_root) if repo_root else "unknown"
+    # Read .git directly; run git only for layouts the reader can't handle
+    info = read_git_info(cwd)
+    if info == {}:
+        return {"repo": "unknown", "branch": "unknown", "commit": "unknown", "dirty": False}
 
-    # Current branch
-    branch = run_command(["git", "branch", "--show-current"], cwd)
-    if not branch:
-        branch = run_command(["git", "describe", "--tags", "--exact-match"], cwd)
-    git_info["branch"] = branch or "unknown"
+    if info:
+        git_info["repo"] = info["repo"]
+        git_info["branch"] = info["branch"] or info["tag"] or "unknown"
+        git_info["commit"] = info["commit"] or "unknown"
+    else:
+        # Repository name
+        repo_root = run_command(["git", "rev-parse", "--show-toplevel"], cwd)
+        git_info["repo"] = os.path.basename(repo_root) if repo_root else "unknown"
+
+        # Current branch
+        branch = run_command(["git", "branch", "--show-current"], cwd)
+        if not branch:
+            branch = run_command(["git", "describe", "--tags", "--exact-match"], cwd)
+        git_info["branch"] = branch or "unknown"
 
-    # Commit hash (short)
-    commit = run_command(["git", "rev-parse", "--short", "HEAD"], cwd)
-    git_info["commit"] = commit or "unknown"
+        # Commit hash (short)
+        commit = run_command(["git", "rev-parse", "--short", "HEAD"], cwd)
+        git_info["commit"] = commit or "unknown"
 
     # Check if repo is dirty (opt-in to avoid slowdowns)
-    if os.environ.get("CLAUDE_AUDIT_GIT_STATUS") == "1":
-        dirty = run_command(["git", "status", "--porcelain"], cwd)
-        git_info["dirty"] = bool(dirty)
+    if check_dirty is None:
+        check_dirty = os.environ.get("CLAUDE_AUDIT_GIT_STATUS") == "1"
+    if check_dirty:
+        git_info["dirty"] = get_dirty_state(cwd)
     else:
         git_info["dirty"] = False
 
@@ -83,23 +317,39 @@ def get_git_info(cwd):
 
 def get_system_info():
     """Get system information"""
+    # os.uname() and the login variables getpass checks first cover the
+    # common case without importing socket or getpass
     try:
-        hostname = socket.gethostname()
-    except OSError as e:
-        print(f"audit_logger: failed to get hostname: {e}", file=sys.stderr)
-        hostname = "unknown"
-
-    try:
-        username = getpass.getuser()
-    except (OSError, KeyError) as e:
-        print(f"audit_logger: failed to get username: {e}", file=sys.stderr)
-        username = "unknown"
+        hostname = os.uname().nodename
+    except AttributeError:
+        import socket
+
+        try:
+            hostname = socket.gethostname()
+        except OSError as e:
+            print(f"audit_logger: failed to get hostname: {e}", file=sys.stderr)
+            hostname = "unknown"
+
+    username = next(
+        (os.environ[var] for var in ("LOGNAME", "USER", "LNAME", "USERNAME") if os.environ.get(var)),
+        None,
+    )
+    if username is None:
+        import getpass
+
+        try:
+            username = getpass.getuser()
+        except (OSError, KeyError) as e:
+            print(f"audit_logger: failed to get username: {e}", file=sys.stderr)
+            username = "unknown"
 
     return {"hostname": hostname, "username": username}
 
 
 def format_log_entry(hook_data, git_info, system_info):
     """Format the log entry"""
+    from datetime import datetime
+
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
 
     # Extract command info
@@ -115,7 +365,8 @@ def format_log_entry(hook_data, git_info, system_info):
         f"REPO: {git_info['repo']} "
         f"BRANCH: {git_info['branch']}"
         + (f"@{git_info['commit']}" if git_info["commit"] != "unknown" else "")
-        + (" [dirty]" if git_info.get("dirty") else ""),
+        + (" [dirty]" if git_info.get("dirty") else "")
+        + (" [dirty?]" if git_info.get("dirty", False) is None else ""),
         f"COMMAND: {command}",
         f"DESCRIPTION: {description}",
         f"EVENT: {hook_data.get('hook_event_name', 'unknown')} "
@@ -126,7 +377,134 @@ def format_log_entry(hook_data, git_info, system_info):
     return "\n".join(lines)
 
 
-def main():
+def format_json_entry(hook_data, git_info, system_info):
+    """Format the log entry as one JSON Lines record with typed fields"""
+    from datetime import datetime
+
+    tool_input = hook_data.get("tool_input", {})
+
+    def known(value):
+        return None if value in (None, "unknown") else value
+
+    record = {
+        "timestamp": datetime.now().astimezone().isoformat(timespec="milliseconds"),
+        "session": hook_data.get("session_id"),
+        "host": known(system_info["hostname"]),
+        "user": known(system_info["username"]),
+        "cwd": hook_data.get("cwd"),
+        "repo": known(git_info["repo"]),
+        "branch": known(git_info["branch"]),
+        "commit": known(git_info["commit"]),
+        "dirty": git_info.get("dirty", False),
+        "command": tool_input.get("command"),
+        "description": tool_input.get("description"),
+        "event": hook_data.get("hook_event_name"),
+        "tool": hook_data.get("tool_name"),
+    }
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+LOG_FORMATTERS = {
+    "text": format_log_entry,
+    "jsonl": format_json_entry,
+}
+
+LOG_FILENAMES = {
+    "text": "command-audit.log",
+    "jsonl": "command-audit.jsonl",
+}
+
+
+def get_log_format():
+    """Configured log format (CLAUDE_AUDIT_FORMAT), defaulting to text."""
+    fmt = os.environ.get("CLAUDE_AUDIT_FORMAT", "text").lower()
+    if fmt not in LOG_FORMATTERS:
+        print(f"audit_logger: Unknown CLAUDE_AUDIT_FORMAT '{fmt}'; using text", file=sys.stderr)
+        return "text"
+    return fmt
+
+
+def audit_log_path(fmt="text"):
+    """Path of the command audit log for the given format."""
+    return os.path.join(os.path.expanduser("~"), ".claude", LOG_FILENAMES[fmt])
+
+
+def write_log_entry(log_entry, fmt="text"):
+    """Append one formatted entry to the audit log, rotating it when full."""
+    audit_store.append(audit_log_path(fmt), log_entry + "\n")
+
+
+# =============================================================================
+# Resident daemon client
+# =============================================================================
+
+DAEMON_TIMEOUT = 2.0
+
+
+def daemon_socket_path():
+    """Unix socket the resident audit daemon listens on."""
+    return os.path.join(os.path.expanduser("~"), ".claude", "run", "audit-daemon.sock")
+
+
+def send_to_daemon(payload, timeout=DAEMON_TIMEOUT):
+    """Send payload to the audit daemon.
+
+    Returns True only once the daemon confirms the entry reached the log, so
+    a False result (no daemon, crash, timeout) means the caller must write it.
+    """
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(daemon_socket_path()))
+            sock.sendall(json.dumps(payload).encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            return sock.recv(16).strip() == b"ok"
+    except OSError:
+        return False
+
+
+def start_daemon():
+    """Launch the audit daemon in the background; duplicates exit on their own."""
+    import subprocess
+
+    daemon = os.path.join(os.path.dirname(os.path.realpath(__file__)), "audit_daemon.py")
+    try:
+        subprocess.Popen(
+            [sys.executable, daemon],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print(f"audit_logger: failed to start daemon: {e}", file=sys.stderr)
+
+
+def run_subcommand(argv):
+    """Dispatch audit_logger.py subcommands; heavy modules load only here."""
+    log_files = [audit_log_path(fmt) for fmt in LOG_FILENAMES]
+    if argv[0] == "query":
+        import audit_query
+
+        return audit_query.main(argv[1:], log_files)
+    if argv[0] == "stats":
+        import audit_stats
+
+        return audit_stats.main(argv[1:], log_files)
+    if argv[0] == "redact":
+        return audit_redact.main(argv[1:], log_files)
+    print(f"audit_logger: Unknown subcommand '{argv[0]}' (expected: query, stats, redact)", file=sys.stderr)
+    return 1
+
+
+def main(argv=()):
+    if argv:
+        sys.exit(run_subcommand(list(argv)))
+
     try:
         # Read JSON input from stdin
         input_data = json.load(sys.stdin)
@@ -144,18 +522,33 @@ def main():
         if not os.path.exists(cwd):
             cwd = os.path.expanduser("~")
 
+        # Strip secrets before the entry leaves this process
+        if audit_redact.redaction_enabled():
+            input_data = audit_redact.redact_hook_data(input_data)
+
+        # Hand off to the resident daemon when enabled; write directly otherwise
+        if os.environ.get("CLAUDE_AUDIT_DAEMON") == "1":
+            payload = {
+                "hook": input_data,
+                "cwd": cwd,
+                "check_dirty": os.environ.get("CLAUDE_AUDIT_GIT_STATUS") == "1",
+                "format": get_log_format(),
+                "durable": audit_store.group_commit_enabled(),
+            }
+            if send_to_daemon(payload):
+                return
+            start_daemon()
+
         # Collect information
         git_info = get_git_info(cwd)
         system_info = get_system_info()
 
         # Format and write log entry
-        log_entry = format_log_entry(input_data, git_info, system_info)
+        fmt = get_log_format()
+        log_entry = LOG_FORMATTERS[fmt](input_data, git_info, system_info)
 
         # Ensure log directory exists and append to audit log
-        log_file = Path.home() / ".claude" / "command-audit.log"
-        log_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_entry + "\n")
+        write_log_entry(log_entry, fmt)
 
         # Silent operation - no output unless error
 
@@ -168,10 +561,12 @@ def main():
         sys.exit(2)
     except Exception as e:
         # Catch-all for unexpected errors - don't block operations
+        import traceback
+
         print(f"audit_logger: Unexpected error ({type(e).__name__}): {e}", file=sys.stderr)
         print(f"audit_logger: {traceback.format_exc()}", file=sys.stderr)
         sys.exit(2)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
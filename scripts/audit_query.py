@@ -0,0 +1,279 @@
+"""
+Indexed queries over the command audit log (audit_logger.py query).
+
+An SQLite index at ~/.claude/cache/audit-index.sqlite is brought up to date
+before every query by ingesting only the bytes appended since the offset
+stored for each log segment. Segments are identified by a fingerprint of
+their first line, so a log keeps its offset when it is rotated (renamed) or
+compressed, and rotated/gzipped segments are handled transparently.
+
+Both the text format and JSONL format logs are indexed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import audit_store
+
+COMMIT_EVERY = 5000
+FINGERPRINT_BYTES = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    fingerprint TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    session TEXT,
+    host TEXT,
+    user TEXT,
+    cwd TEXT,
+    repo TEXT,
+    branch TEXT,
+    commit_sha TEXT,
+    dirty INTEGER,
+    command TEXT,
+    description TEXT,
+    event TEXT,
+    tool TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries(timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_session ON entries(session, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_repo ON entries(repo, timestamp);
+"""
+
+ENTRY_COLUMNS = (
+    "timestamp", "session", "host", "user", "cwd", "repo", "branch",
+    "commit_sha", "dirty", "command", "description", "event", "tool",
+)
+
+RELATIVE_TIME_RE = re.compile(r"^(\d+)([mhdw])$")
+RELATIVE_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def index_path():
+    return Path.home() / ".claude" / "cache" / "audit-index.sqlite"
+
+
+def remove_index():
+    """Delete the index (and its WAL files); the next query rebuilds it."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.unlink(f"{index_path()}{suffix}")
+        except FileNotFoundError:
+            pass
+
+
+def connect(path=None):
+    path = Path(path or index_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def fingerprint(path):
+    """Hash of a segment's first line, or None while it has no complete line."""
+    with audit_store.open_segment(path) as f:
+        head = f.readline(FINGERPRINT_BYTES)
+    if not head.endswith(b"\n") and len(head) < FINGERPRINT_BYTES:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+
+def _entry_row(entry):
+    return (
+        entry.get("timestamp"),
+        entry.get("session"),
+        entry.get("host"),
+        entry.get("user"),
+        entry.get("cwd"),
+        entry.get("repo"),
+        entry.get("branch"),
+        entry.get("commit"),
+        None if entry.get("dirty") is None else int(bool(entry["dirty"])),
+        entry.get("command"),
+        entry.get("description"),
+        entry.get("event"),
+        entry.get("tool"),
+    )
+
+
+def ingest_segment(conn, path):
+    """Index new entries from one segment. Returns the number of entries added."""
+    name = path.name
+    compressed = name.endswith(".gz")
+    if compressed:
+        done = conn.execute(
+            "SELECT 1 FROM segments WHERE name = ? AND complete = 1", (name,)
+        ).fetchone()
+        if done:
+            return 0
+
+    key = fingerprint(path)
+    if key is None:
+        return 0
+    row = conn.execute(
+        "SELECT offset, complete FROM segments WHERE fingerprint = ?", (key,)
+    ).fetchone()
+    offset = row[0] if row else 0
+    if row and row[1]:
+        return 0
+
+    insert = (
+        f"INSERT INTO entries ({', '.join(ENTRY_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(ENTRY_COLUMNS))})"
+    )
+    added = 0
+    batch = []
+
+    def flush(new_offset, complete=False):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(insert, batch)
+            conn.execute(
+                "INSERT INTO segments (fingerprint, name, offset, complete) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint) DO UPDATE SET name = excluded.name, "
+                "offset = excluded.offset, complete = excluded.complete",
+                (key, name, new_offset, int(complete)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        batch.clear()
+
+    fmt = audit_store.segment_format(path)
+    with audit_store.open_segment(path) as stream:
+        for end_offset, entry in audit_store.iter_entries(stream, fmt, offset):
+            batch.append(_entry_row(entry))
+            offset = end_offset
+            added += 1
+            if len(batch) >= COMMIT_EVERY:
+                flush(offset)
+    # Compressed segments never change again
+    flush(offset, complete=compressed)
+    return added
+
+
+def update_index(conn, log_files):
+    """Ingest new bytes from every segment of every log. Returns entries added."""
+    added = 0
+    for log_file in log_files:
+        for segment in audit_store.list_segments(log_file):
+            try:
+                added += ingest_segment(conn, segment)
+            except (OSError, EOFError) as e:
+                print(f"audit_logger: skipping {segment}: {e}", file=sys.stderr)
+    return added
+
+
+def parse_time(value, now=None):
+    """Parse "7d"/"12h"/"30m"/"2w", a date, or a date-time into the index's format."""
+    now = now or datetime.now()
+    match = RELATIVE_TIME_RE.match(value.strip())
+    if match:
+        delta = timedelta(**{RELATIVE_UNITS[match.group(2)]: int(match.group(1))})
+        return (now - delta).strftime(audit_store.TIMESTAMP_FORMAT)[:-3]
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"invalid time: {value}") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime(audit_store.TIMESTAMP_FORMAT)[:-3]
+
+
+def build_query(args):
+    clauses, params = [], []
+    if args.session:
+        # Text logs keep an 8-character session prefix, JSONL the full id;
+        # a shorter argument matches as a prefix (range scan on the index)
+        clauses.append("(session IN (?, ?) OR (session >= ? AND session < ?))")
+        params += [args.session, args.session[:8], args.session, args.session + "\U0010ffff"]
+    for column in ("repo", "branch", "host"):
+        value = getattr(args, column)
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if args.since:
+        clauses.append("timestamp >= ?")
+        params.append(parse_time(args.since))
+    if args.until:
+        clauses.append("timestamp < ?")
+        params.append(parse_time(args.until))
+    if args.command:
+        clauses.append("instr(command, ?) > 0")
+        params.append(args.command)
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries{where} ORDER BY timestamp, id"
+    if args.limit:
+        sql += " LIMIT ?"
+        params.append(args.limit)
+    return sql, params
+
+
+def format_row(row):
+    record = dict(zip(ENTRY_COLUMNS, row))
+    location = record["repo"] or "-"
+    if record["branch"]:
+        location += f"@{record['branch']}"
+    command = (record["command"] or "").splitlines()[0] if record["command"] else ""
+    return f"{record['timestamp']} {record['session'] or '-'} {location} {command}"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="audit_logger.py query", description="Query the command audit log."
+    )
+    parser.add_argument("--session", help="Session id (or prefix)")
+    parser.add_argument("--repo", help="Repository name")
+    parser.add_argument("--branch", help="Branch or tag name")
+    parser.add_argument("--host", help="Host name")
+    parser.add_argument("--since", help="Start time: 7d, 12h, 30m, 2w or YYYY-MM-DD[ HH:MM[:SS]]")
+    parser.add_argument("--until", help="End time (exclusive), same formats as --since")
+    parser.add_argument("--command", help="Command substring")
+    parser.add_argument("--limit", type=int, help="Maximum number of entries")
+    parser.add_argument("--json", action="store_true", help="Print entries as JSON Lines")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index from scratch")
+    return parser
+
+
+def main(argv, log_files):
+    args = build_parser().parse_args(argv)
+    if args.reindex:
+        remove_index()
+
+    try:
+        sql, params = build_query(args)
+    except ValueError as e:
+        print(f"audit_logger: {e}", file=sys.stderr)
+        return 1
+
+    conn = connect()
+    try:
+        update_index(conn, log_files)
+        for row in conn.execute(sql, params):
+            if args.json:
+                record = dict(zip(ENTRY_COLUMNS, row))
+                record["commit"] = record.pop("commit_sha")
+                record["dirty"] = None if record["dirty"] is None else bool(record["dirty"])
+                print(json.dumps(record, ensure_ascii=False))
+            else:
+                print(format_row(row))
+    finally:
+        conn.close()
+    return 0
@@ -0,0 +1,380 @@
+"""
+Secret redaction for the command audit log.
+
+Commands and descriptions are redacted before an entry is formatted, so
+tokens pasted into `curl -H`, `export` lines or URLs never reach disk (or
+the audit daemon's socket). The same engine rewrites historical logs in
+bulk with `audit_logger.py redact`.
+
+Each rule has literal keywords. A text is first checked for the keywords
+of every rule (plain substring tests on the lowercased text), and only the
+rules whose keywords occur are combined into a single alternation regex
+that replaces all matches in one pass. Most commands contain no keyword
+and skip regex matching entirely; combined patterns are cached per rule
+subset, so bulk runs compile each combination once.
+
+Rules are (name, pattern, keywords). A pattern with a group named "secret"
+has only that group replaced, keeping e.g. the variable name of an
+assignment; otherwise the whole match is replaced. Rules without keywords
+are always applied.
+
+Extra rules are read from ~/.claude/audit-redact.json (or the file named by
+CLAUDE_AUDIT_REDACT_RULES) as a JSON list of
+{"name": ..., "pattern": ..., "keywords": [...]} objects. Patterns use
+Python regex syntax; refer to groups by name, not number. Leading inline
+flags such as (?i) apply to their own rule only.
+
+Usage (internal):
+    audit_logger.py redact [--dry-run]   # Redact existing audit logs in place
+"""
+
+import json
+import os
+import re
+import sys
+
+import audit_store
+
+REPLACEMENT = "[REDACTED:{name}]"
+MAX_CACHED_PATTERNS = 256
+
+_SECRET_KEYWORDS = ("token", "secret", "password", "passwd", "key", "credential", "auth")
+
+DEFAULT_RULES = (
+    (
+        "authorization-header",
+        r"(?i:authorization)\s*:\s*(?:(?i:bearer|basic|token)\s+)?(?P<secret>[^\s'\"]+)",
+        ("authorization",),
+    ),
+    ("bearer-token", r"\b(?i:bearer)\s+(?P<secret>[A-Za-z0-9._~+/=-]{8,})", ("bearer",)),
+    ("url-credentials", r"://[^\s/:@'\"]+:(?P<secret>[^\s/@'\"]+)@", ("://",)),
+    (
+        "user-option",
+        r"(?:(?<=\s)|^)(?:-u|--user)(?:=|\s+)['\"]?[^\s:'\"]+:(?P<secret>[^\s'\"]+)",
+        ("-u", "--user"),
+    ),
+    ("aws-access-key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", ("akia", "asia")),
+    (
+        "github-token",
+        r"\b(?:gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{22,})",
+        ("ghp_", "gho_", "ghu_", "ghs_", "ghr_", "github_pat_"),
+    ),
+    ("slack-token", r"\bxox[abprs]-[A-Za-z0-9-]{10,}", ("xox",)),
+    ("sk-api-key", r"\bsk-[A-Za-z0-9_-]{20,}", ("sk-",)),
+    ("google-api-key", r"\bAIza[0-9A-Za-z_-]{35}", ("aiza",)),
+    ("jwt", r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}", ("eyj",)),
+    (
+        "private-key",
+        r"-----BEGIN [A-Z ]*PRIVATE KEY-----(?:[\s\S]*?-----END [A-Z ]*PRIVATE KEY-----|[\s\S]*)",
+        ("private key",),
+    ),
+    (
+        "secret-assignment",
+        (
+            r"\b(?i:[A-Z0-9_]*(?:TOKEN|SECRET|PASSWORD|PASSWD|API_?KEY|ACCESS_?KEY|AUTH(?![A-Z])|CREDENTIALS?)[A-Z0-9_]*)"
+            r"=(?P<secret>\"[^\"]*\"|'[^']*'|[^\s'\"]+)"
+        ),
+        _SECRET_KEYWORDS,
+    ),
+    (
+        "secret-option",
+        (
+            r"--(?i:[a-z-]*(?:password|passwd|token|secret|api-?key|auth))(?:=|\s+)"
+            r"(?P<secret>\"[^\"]*\"|'[^']*'|[^\s'\"-][^\s'\"]*)"
+        ),
+        _SECRET_KEYWORDS,
+    ),
+)
+
+
+def redaction_enabled():
+    return os.environ.get("CLAUDE_AUDIT_REDACT") != "0"
+
+
+def rules_path():
+    return os.environ.get("CLAUDE_AUDIT_REDACT_RULES") or os.path.join(
+        os.path.expanduser("~"), ".claude", "audit-redact.json"
+    )
+
+
+def load_rules(path=None):
+    """Default rules plus valid user rules from path (missing file: defaults only)."""
+    path = path or rules_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+    except FileNotFoundError:
+        return list(DEFAULT_RULES)
+    except (OSError, ValueError) as e:
+        print(f"audit_logger: ignoring redaction rules {path}: {e}", file=sys.stderr)
+        return list(DEFAULT_RULES)
+
+    rules = list(DEFAULT_RULES)
+    for rule in extra if isinstance(extra, list) else []:
+        try:
+            name, pattern = str(rule["name"]), rule["pattern"]
+            keywords = tuple(str(k) for k in rule.get("keywords", ()))
+            pattern = _scope_flags(pattern)
+            # Validate the rule as it appears in a combined pattern
+            re.compile(f"(?P<r0>{_scope_groups(pattern, 0)})")
+        except (KeyError, TypeError, AttributeError, re.error) as e:
+            print(f"audit_logger: skipping redaction rule {rule!r}: {e}", file=sys.stderr)
+            continue
+        rules.append((name, pattern, keywords))
+    return rules
+
+
+_GLOBAL_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def _scope_flags(pattern):
+    """Turn leading global flags, e.g. "(?i)x", into a scoped "(?i:x)" group.
+
+    Global flags are only valid at the start of a whole regex, so they
+    cannot survive being combined with other rules.
+    """
+    match = _GLOBAL_FLAGS.match(pattern) if isinstance(pattern, str) else None
+    if match is None:
+        return pattern
+    flags = match.group(1)
+    rest = pattern[match.end():]
+    while match := _GLOBAL_FLAGS.match(rest):
+        flags += match.group(1)
+        rest = rest[match.end():]
+    return f"(?{flags}:{rest})"
+
+
+def _scope_groups(pattern, index):
+    """Prefix named groups so rules can share one combined pattern."""
+    return pattern.replace("(?P<", f"(?P<r{index}_").replace("(?P=", f"(?P=r{index}_")
+
+
+class Redactor:
+    """Keyword-prefiltered, single-pass redaction over a set of rules."""
+
+    def __init__(self, rules):
+        self.names = [name for name, _, _ in rules]
+        self._patterns = [pattern for _, pattern, _ in rules]
+        self._always = []
+        self._by_keyword = {}
+        for index, (_, _, keywords) in enumerate(rules):
+            if not keywords:
+                self._always.append(index)
+            for keyword in keywords:
+                self._by_keyword.setdefault(keyword.lower(), []).append(index)
+        self._compiled = {}
+
+    def candidates(self, text):
+        """Indices of the rules whose keywords occur in text."""
+        lowered = text.lower()
+        hits = set(self._always)
+        for keyword, indices in self._by_keyword.items():
+            if keyword in lowered:
+                hits.update(indices)
+        return tuple(sorted(hits))
+
+    def pattern(self, indices):
+        compiled = self._compiled.get(indices)
+        if compiled is None:
+            if len(self._compiled) >= MAX_CACHED_PATTERNS:
+                self._compiled.clear()
+            compiled = re.compile(
+                "|".join(f"(?P<r{i}>{_scope_groups(self._patterns[i], i)})" for i in indices)
+            )
+            self._compiled[indices] = compiled
+        return compiled
+
+    def redact(self, text):
+        """Return text with every rule match replaced."""
+        if not text or not isinstance(text, str):
+            return text
+        indices = self.candidates(text)
+        if not indices:
+            return text
+        return self.pattern(indices).sub(self._replace, text)
+
+    def _replace(self, match):
+        # The rule's outer group closes last, so it is the match's lastgroup
+        group = match.lastgroup
+        index = int(group[1:])
+        replacement = REPLACEMENT.format(name=self.names[index])
+        secret = f"{group}_secret"
+        if secret in match.re.groupindex and match.start(secret) >= 0:
+            start = match.start(secret) - match.start()
+            end = match.end(secret) - match.start()
+            text = match.group()
+            return text[:start] + replacement + text[end:]
+        return replacement
+
+
+_default = None
+
+
+def default_redactor():
+    global _default
+    if _default is None:
+        _default = Redactor(load_rules())
+    return _default
+
+
+def redact_hook_data(hook_data, redactor=None):
+    """Return hook_data with tool_input command/description redacted."""
+    tool_input = hook_data.get("tool_input")
+    if not isinstance(tool_input, dict):
+        return hook_data
+    redactor = redactor or default_redactor()
+    keys = [key for key in ("command", "description") if key in tool_input]
+    try:
+        redacted = {key: redactor.redact(tool_input[key]) for key in keys}
+    except re.error as e:
+        # Rules that only fail once combined must not cost the audit entry
+        print(f"audit_logger: redaction rules failed ({e}); using the defaults", file=sys.stderr)
+        fallback = Redactor(DEFAULT_RULES)
+        redacted = {key: fallback.redact(tool_input[key]) for key in keys}
+    if all(redacted[key] == tool_input[key] for key in redacted):
+        return hook_data
+    return {**hook_data, "tool_input": {**tool_input, **redacted}}
+
+
+def redact_text_record(record, redactor):
+    """record (a text entry, "---" line included) with its COMMAND and
+    DESCRIPTION values redacted, as redact_hook_data does before writing.
+
+    Other lines are left alone, and so is a record that does not parse: a
+    rule must never match across fields or into the separator.
+    """
+    lines = record.split("\n")
+    # header, context, COMMAND..., DESCRIPTION..., EVENT, "---", ""
+    if len(lines) < 7 or not lines[2].startswith("COMMAND: ") or lines[-2:] != ["---", ""]:
+        return record
+    event = len(lines) - 3
+    desc = max((i for i in range(3, event) if lines[i].startswith("DESCRIPTION: ")), default=None)
+    if desc is None:
+        return record
+    command = "\n".join(lines[2:desc])[len("COMMAND: "):]
+    description = "\n".join(lines[desc:event])[len("DESCRIPTION: "):]
+    redacted_command = redactor.redact(command)
+    redacted_description = redactor.redact(description)
+    if redacted_command == command and redacted_description == description:
+        return record
+    return "\n".join([
+        *lines[:2],
+        f"COMMAND: {redacted_command}",
+        f"DESCRIPTION: {redacted_description}",
+        *lines[event:],
+    ])
+
+
+def redact_text_records(stream, redactor):
+    """Yield (bytes, changed) per text record, separator included."""
+    pending = []
+    for raw in stream:
+        pending.append(raw)
+        if raw != audit_store.TEXT_SEPARATOR:
+            continue
+        record = b"".join(pending).decode("utf-8", errors="surrogateescape")
+        pending = []
+        redacted = redact_text_record(record, redactor)
+        yield redacted.encode("utf-8", errors="surrogateescape"), redacted != record
+    if pending:
+        yield b"".join(pending), False
+
+
+def redact_json_lines(stream, redactor):
+    """Yield (bytes, changed) per JSONL record, re-serializing changed ones."""
+    for raw in stream:
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            yield raw, False
+            continue
+        if not isinstance(record, dict):
+            yield raw, False
+            continue
+        changed = False
+        for key in ("command", "description"):
+            value = record.get(key)
+            redacted = redactor.redact(value)
+            if redacted != value:
+                record[key] = redacted
+                changed = True
+        if not changed:
+            yield raw, False
+            continue
+        newline = b"\n" if raw.endswith(b"\n") else b""
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + newline, True
+
+
+def redact_segment(path, redactor, dry_run=False):
+    """Redact one segment in place. Returns the number of entries changed."""
+    import contextlib
+    import gzip
+
+    path = str(path)
+    records = redact_json_lines if audit_store.segment_format(path) == "jsonl" else redact_text_records
+    tmp = f"{path}.redact.tmp"
+    changed = 0
+    compressed = path.endswith(".gz")
+    # Entries are appended to the active log, and to a just-rotated segment by
+    # writers that opened it before the rotation: hold their lock from the
+    # first read to the replace. Compressed segments are never appended to.
+    with contextlib.nullcontext() if compressed or dry_run else audit_store.entry_lock(path):
+        with audit_store.open_segment(path) as src:
+            if dry_run:
+                return sum(1 for _, hit in records(src, redactor) if hit)
+            with (gzip.open if compressed else open)(tmp, "wb") as dst:
+                for data, hit in records(src, redactor):
+                    dst.write(data)
+                    changed += hit
+        if changed:
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            os.replace(tmp, path)
+        else:
+            os.unlink(tmp)
+    return changed
+
+
+def redact_logs(log_files, redactor=None, dry_run=False):
+    """Redact every segment of log_files. Returns {segment: entries changed}."""
+    redactor = redactor or default_redactor()
+    results = {}
+    for log_file in log_files:
+        # Block rotation and background compression while rewriting;
+        # redact_segment blocks appends to each segment it rewrites
+        with audit_store.locked(f"{log_file}.compress.lock"), \
+                audit_store.locked(audit_store.lock_path(log_file)):
+            for segment in audit_store.list_segments(log_file):
+                try:
+                    results[str(segment)] = redact_segment(segment, redactor, dry_run)
+                except (OSError, EOFError) as e:
+                    print(f"audit_logger: skipping {segment}: {e}", file=sys.stderr)
+    return results
+
+
+def main(argv, log_files):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="audit_logger.py redact",
+        description="Redact secrets from existing audit logs in place.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Count entries that would change without writing"
+    )
+    args = parser.parse_args(argv)
+
+    existing = [log_file for log_file in log_files if audit_store.list_segments(log_file)]
+    results = redact_logs(existing, dry_run=args.dry_run)
+    verb = "would redact" if args.dry_run else "redacted"
+    for segment, changed in results.items():
+        if changed:
+            print(f"{segment}: {verb} {changed} entries")
+    total = sum(results.values())
+    print(f"{verb} {total} entries in {len(results)} segments")
+
+    if total and not args.dry_run:
+        # The query index holds copies of the old commands
+        import audit_query
+
+        audit_query.remove_index()
+    return 0
@@ -0,0 +1,330 @@
+"""
+Streaming analytics over the command audit log (audit_logger.py stats).
+
+Every segment (active, rotated and gzipped, text and JSONL) is read once
+through a generator pipeline, so memory stays constant however large the
+history is: counters keep at most a fixed number of keys, dropping the
+rarest when full, and burst detection only holds the timestamps inside the
+sliding window of sessions that are currently active.
+
+Segments are independent units of work: with --jobs they are summarized in
+parallel worker processes and the partial results merged (a burst that
+straddles two segments is then counted in each half separately).
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+import audit_store
+
+TOP_CAPACITY = 10000  # keys kept per counter before the rarest are dropped
+BURST_CAPACITY = 1000  # bursty sessions kept
+DEFAULT_BURST_WINDOW = 60  # seconds
+DEFAULT_BURST_THRESHOLD = 30  # commands within the window
+PRUNE_EVERY = 1024  # entries between sweeps of idle burst windows
+EPOCH = datetime(1970, 1, 1)
+
+
+class BoundedCounter:
+    """Counter holding at most capacity keys.
+
+    Once it grows past twice the capacity, only the capacity most frequent
+    keys are kept, so frequent keys stay exact while counts of keys near the
+    cut-off are lower bounds.
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, n=1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + n
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def merge(self, other):
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        if len(self.counts) > self.capacity:
+            self._prune()
+
+    def most_common(self, n):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+    def _prune(self):
+        self.counts = dict(self.most_common(self.capacity))
+
+
+def command_prefix(command):
+    """Program name of a command line: skips VAR=value assignments and paths."""
+    for token in command.split():
+        if "=" in token and not token.startswith(("=", "-")) and token.split("=", 1)[0].isidentifier():
+            continue
+        return token.rsplit("/", 1)[-1] or token
+    return ""
+
+
+def to_seconds(timestamp):
+    """Seconds since the epoch for a normalized "YYYY-MM-DD HH:MM:SS.mmm" timestamp."""
+    try:
+        return (datetime.fromisoformat(timestamp) - EPOCH).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def from_seconds(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).strftime(audit_store.TIMESTAMP_FORMAT)[:-3]
+
+
+class AuditStats:
+    """Mergeable single-pass summary of audit entries."""
+
+    def __init__(self, burst_window=DEFAULT_BURST_WINDOW, burst_threshold=DEFAULT_BURST_THRESHOLD):
+        self.burst_window = burst_window
+        self.burst_threshold = burst_threshold
+        self.entries = 0
+        self.first = None
+        self.last = None
+        self.commands = BoundedCounter()
+        self.prefixes = BoundedCounter()
+        self.sessions = BoundedCounter()
+        self.repos = BoundedCounter()
+        self.hours = [0] * 24
+        self.bursts = {}  # session -> (peak commands in window, window start)
+        self._windows = {}  # session -> deque of recent timestamps (seconds)
+
+    def add(self, entry):
+        command = entry.get("command")
+        if not command:
+            return
+        timestamp = entry.get("timestamp") or ""
+        session = entry.get("session") or "-"
+        self.entries += 1
+        if timestamp:
+            if self.first is None or timestamp < self.first:
+                self.first = timestamp
+            if self.last is None or timestamp > self.last:
+                self.last = timestamp
+            hour = timestamp[11:13]
+            if hour.isdigit():
+                self.hours[int(hour) % 24] += 1
+
+        self.commands.add(command)
+        self.prefixes.add(command_prefix(command))
+        self.sessions.add(session)
+        self.repos.add(entry.get("repo") or "-")
+        self._track_burst(session, timestamp)
+
+    def _track_burst(self, session, timestamp):
+        now = to_seconds(timestamp)
+        if now is None:
+            return
+        window = self._windows.get(session)
+        if window is None:
+            window = self._windows[session] = deque()
+        window.append(now)
+        while now - window[0] > self.burst_window:
+            window.popleft()
+        if len(window) >= self.burst_threshold:
+            peak = self.bursts.get(session)
+            if peak is None or len(window) > peak[0]:
+                self.bursts[session] = (len(window), window[0])
+                if len(self.bursts) > 2 * BURST_CAPACITY:
+                    self._prune_bursts()
+        if self.entries % PRUNE_EVERY == 0:
+            # Forget windows of sessions that have gone quiet
+            self._windows = {
+                key: w for key, w in self._windows.items() if now - w[-1] <= self.burst_window
+            }
+
+    def _prune_bursts(self):
+        kept = sorted(self.bursts.items(), key=lambda item: -item[1][0])[:BURST_CAPACITY]
+        self.bursts = dict(kept)
+
+    def merge(self, other):
+        """Fold another partial summary (e.g. from a worker) into this one."""
+        self.entries += other.entries
+        for bound in (other.first, other.last):
+            if bound is None:
+                continue
+            if self.first is None or bound < self.first:
+                self.first = bound
+            if self.last is None or bound > self.last:
+                self.last = bound
+        self.commands.merge(other.commands)
+        self.prefixes.merge(other.prefixes)
+        self.sessions.merge(other.sessions)
+        self.repos.merge(other.repos)
+        self.hours = [a + b for a, b in zip(self.hours, other.hours)]
+        for session, burst in other.bursts.items():
+            if session not in self.bursts or burst[0] > self.bursts[session][0]:
+                self.bursts[session] = burst
+        if len(self.bursts) > BURST_CAPACITY:
+            self._prune_bursts()
+
+    def __getstate__(self):
+        # Open burst windows only matter while a segment is being read
+        state = dict(self.__dict__)
+        state["_windows"] = {}
+        return state
+
+    def report(self, top=10):
+        """Summary as a JSON-serializable dict."""
+        bursts = sorted(self.bursts.items(), key=lambda item: (-item[1][0], item[0]))[:top]
+        return {
+            "entries": self.entries,
+            "first": self.first,
+            "last": self.last,
+            "top_commands": self.commands.most_common(top),
+            "prefixes": self.prefixes.most_common(top),
+            "distinct_prefixes": len(self.prefixes.counts),
+            "sessions": self.sessions.most_common(top),
+            "repos": self.repos.most_common(top),
+            "hours": self.hours,
+            "bursts": [
+                {
+                    "session": session,
+                    "commands": peak,
+                    "window": self.burst_window,
+                    "start": from_seconds(start),
+                }
+                for session, (peak, start) in bursts
+            ],
+        }
+
+
+def iter_segment_entries(path):
+    """Stream the entries of one segment."""
+    fmt = audit_store.segment_format(path)
+    with audit_store.open_segment(path) as stream:
+        for _, entry in audit_store.iter_entries(stream, fmt):
+            yield entry
+
+
+def in_range(entries, since=None, until=None):
+    for entry in entries:
+        timestamp = entry.get("timestamp") or ""
+        if since and timestamp < since:
+            continue
+        if until and timestamp >= until:
+            continue
+        yield entry
+
+
+def summarize_segment(path, since=None, until=None, burst_window=DEFAULT_BURST_WINDOW,
+                      burst_threshold=DEFAULT_BURST_THRESHOLD):
+    """Summarize one segment; runs in a worker process with --jobs."""
+    stats = AuditStats(burst_window, burst_threshold)
+    try:
+        for entry in in_range(iter_segment_entries(path), since, until):
+            stats.add(entry)
+    except (OSError, EOFError) as e:
+        print(f"audit_logger: skipping {path}: {e}", file=sys.stderr)
+    return stats
+
+
+def collect(log_files, since=None, until=None, jobs=1,
+            burst_window=DEFAULT_BURST_WINDOW, burst_threshold=DEFAULT_BURST_THRESHOLD):
+    """Summarize every segment of log_files, in parallel when jobs > 1."""
+    segments = [segment for log_file in log_files for segment in audit_store.list_segments(log_file)]
+    options = (since, until, burst_window, burst_threshold)
+    total = AuditStats(burst_window, burst_threshold)
+    if jobs > 1 and len(segments) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(segments))) as pool:
+            futures = [pool.submit(summarize_segment, segment, *options) for segment in segments]
+            for future in futures:
+                total.merge(future.result())
+    else:
+        # Share one summary so bursts carry across consecutive segments
+        for segment in segments:
+            try:
+                for entry in in_range(iter_segment_entries(segment), since, until):
+                    total.add(entry)
+            except (OSError, EOFError) as e:
+                print(f"audit_logger: skipping {segment}: {e}", file=sys.stderr)
+    return total
+
+
+def format_counts(title, counts):
+    lines = [f"{title}:"]
+    width = max((len(str(n)) for _, n in counts), default=1)
+    for key, n in counts:
+        label = key.splitlines()[0] if key else "-"
+        lines.append(f"  {n:>{width}}  {label}")
+    if not counts:
+        lines.append("  (none)")
+    return lines
+
+
+def format_report(report):
+    lines = [f"Entries: {report['entries']}"]
+    if report["entries"]:
+        lines[0] += f" ({report['first']} .. {report['last']})"
+    lines += format_counts("Top commands", report["top_commands"])
+    lines += format_counts(f"Command prefixes ({report['distinct_prefixes']} distinct)", report["prefixes"])
+    lines += format_counts("Commands per session", report["sessions"])
+    lines += format_counts("Commands per repo", report["repos"])
+    lines.append("Commands per hour:")
+    peak = max(report["hours"]) or 1
+    for hour, n in enumerate(report["hours"]):
+        if n:
+            lines.append(f"  {hour:02d}:00  {n:>6}  {'#' * max(1, round(40 * n / peak))}")
+    lines.append("Activity bursts:")
+    for burst in report["bursts"]:
+        lines.append(
+            f"  {burst['session']}  {burst['commands']} commands in {burst['window']}s from {burst['start']}"
+        )
+    if not report["bursts"]:
+        lines.append("  (none)")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="audit_logger.py stats", description="Summarize the command audit log."
+    )
+    parser.add_argument("--since", help="Start time: 7d, 12h, 30m, 2w or YYYY-MM-DD[ HH:MM[:SS]]")
+    parser.add_argument("--until", help="End time (exclusive), same formats as --since")
+    parser.add_argument("--top", type=int, default=10, help="Rows per table (default 10)")
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Worker processes, one segment each (0 = one per CPU, default 1)",
+    )
+    parser.add_argument(
+        "--burst-window", type=float, default=DEFAULT_BURST_WINDOW,
+        help=f"Burst window in seconds (default {DEFAULT_BURST_WINDOW})",
+    )
+    parser.add_argument(
+        "--burst-threshold", type=int, default=DEFAULT_BURST_THRESHOLD,
+        help=f"Commands within the window that count as a burst (default {DEFAULT_BURST_THRESHOLD})",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser
+
+
+def main(argv, log_files):
+    args = build_parser().parse_args(argv)
+    from audit_query import parse_time
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"audit_logger: {e}", file=sys.stderr)
+        return 1
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    stats = collect(log_files, since, until, jobs, args.burst_window, max(1, args.burst_threshold))
+    report = stats.report(args.top)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        print(format_report(report))
+    return 0
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+On-disk layout of the command audit log: appends, size-based rotation,
+background compression of rotated segments, and parsing entries back.
+
+Each entry is written with a single write() on an O_APPEND descriptor while
+holding an exclusive flock on the log, so entries from parallel sessions
+never interleave, however large. A writer that finds the file unlinked once
+it holds the lock (replaced by a rewrite under that lock) reopens it. With
+group commit enabled, writers fsync through a shared marker: whoever holds
+the sync lock flushes everything written so far, and writers whose entries
+were covered skip their own fsync.
+
+The active log (e.g. ~/.claude/command-audit.log) is renamed to
+<name>.<timestamp> once it exceeds the size limit, and a detached process
+gzips rotated segments to <name>.<timestamp>.gz after a short grace period
+(writers only hold the file open for a single append). Appends stay O(1):
+the size check is an fstat on the descriptor that was just written.
+
+Usage (internal):
+    audit_store.py compress LOG_FILE   # Compress rotated segments of LOG_FILE
+
+Environment variables:
+    CLAUDE_AUDIT_MAX_BYTES     - Rotate the active log above this size
+                                 (default 50 MiB, 0 disables rotation)
+    CLAUDE_AUDIT_GROUP_COMMIT  - 1 to fsync entries, batching concurrent writers
+"""
+
+# Imported by audit_logger on every hook call: the append path only needs
+# os/fcntl, so everything else is imported where it is used.
+import contextlib
+import json
+import os
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation still works, without cross-process locking
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+COMPRESS_GRACE = 2.0  # seconds a rotated segment must be untouched before gzip
+
+
+def parse_max_bytes(value, default=DEFAULT_MAX_BYTES):
+    if value is None:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        print("audit_logger: Invalid CLAUDE_AUDIT_MAX_BYTES; using default", file=sys.stderr)
+        return default
+    return max(parsed, 0)
+
+
+def max_bytes():
+    return parse_max_bytes(os.environ.get("CLAUDE_AUDIT_MAX_BYTES"))
+
+
+@contextlib.contextmanager
+def locked(lock_file, blocking=True):
+    """Hold an advisory lock on lock_file. Yields False if non-blocking and busy."""
+    if fcntl is None:
+        yield True
+        return
+    with open(lock_file, "a") as f:
+        flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def lock_path(log_file):
+    return f"{log_file}.lock"
+
+
+def group_commit_enabled():
+    return os.environ.get("CLAUDE_AUDIT_GROUP_COMMIT") == "1"
+
+
+def write_entry(fd, data):
+    """Write data to an O_APPEND fd in one write() under an exclusive flock.
+
+    The lock also covers the rare short write (huge entries, network file
+    systems), so a retry can never be split by another writer's entry.
+    Returns False without writing if the file was unlinked while we waited
+    for the lock (a rewrite such as `audit_logger.py redact` replaced it);
+    the caller reopens the path and writes again.
+    """
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        if fcntl is not None and os.fstat(fd).st_nlink == 0:
+            return False
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        return True
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def entry_lock(path):
+    """Hold the lock write_entry takes on path, blocking appends to it.
+
+    A file rewritten under this lock must be replaced (renamed over), not
+    truncated: writers that opened it meanwhile see it unlinked and retry.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def sync_path(log_file):
+    return f"{log_file}.sync.lock"
+
+
+def group_sync(log_file, fd):
+    """fsync fd unless a concurrent writer already synced past our entry.
+
+    The sync lock file records "<inode> <synced size>". Writers queue on its
+    lock; the holder fsyncs everything written so far, so writers that were
+    waiting find their entries covered and return without another fsync.
+    Returns True if this call performed the fsync.
+    """
+    if fcntl is None:
+        os.fsync(fd)
+        return True
+    written_to = os.lseek(fd, 0, os.SEEK_CUR)
+    inode = os.fstat(fd).st_ino
+    marker = os.open(sync_path(log_file), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(marker, fcntl.LOCK_EX)
+        parts = os.pread(marker, 64, 0).split()
+        if len(parts) == 2 and int(parts[0]) == inode and int(parts[1]) >= written_to:
+            return False
+        size = os.fstat(fd).st_size
+        os.fsync(fd)
+        record = f"{inode} {size}".encode()
+        os.ftruncate(marker, 0)
+        os.pwrite(marker, record, 0)
+        return True
+    finally:
+        os.close(marker)
+
+
+def append(log_file, data, durable=None):
+    """Append data to log_file atomically, rotating it afterwards if it grew too large.
+
+    durable defaults to CLAUDE_AUDIT_GROUP_COMMIT.
+    """
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    if durable is None:
+        durable = group_commit_enabled()
+    payload = data.encode("utf-8") if isinstance(data, str) else data
+    while True:
+        fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            if not write_entry(fd, payload):
+                continue  # Replaced while we waited: append to the new file
+            if durable:
+                group_sync(log_file, fd)
+            st = os.fstat(fd)
+            break
+        finally:
+            os.close(fd)
+    maybe_rotate(log_file, st)
+
+
+def maybe_rotate(log_file, st):
+    """Rotate log_file if the stat result of the just-written file exceeds the limit."""
+    limit = max_bytes()
+    if limit and st.st_size >= limit and rotate(log_file, st.st_ino, limit):
+        spawn_compressor(log_file)
+
+
+def segment_name(log_file):
+    from datetime import datetime
+    from pathlib import Path
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S.%f")
+    candidate = Path(f"{log_file}.{stamp}")
+    counter = 1
+    while candidate.exists() or candidate.with_name(candidate.name + ".gz").exists():
+        candidate = Path(f"{log_file}.{stamp}-{counter}")
+        counter += 1
+    return candidate
+
+
+def rotate(log_file, written_ino, limit):
+    """Rename the active log to a timestamped segment. Returns the segment path.
+
+    written_ino guards against double rotation: if another writer already
+    rotated, the path now names a fresh (small) file and nothing happens.
+    """
+    with locked(lock_path(log_file)):
+        try:
+            st = os.stat(log_file)
+        except FileNotFoundError:
+            return None
+        if st.st_ino != written_ino or st.st_size < limit:
+            return None
+        target = segment_name(log_file)
+        try:
+            os.rename(log_file, target)
+        except OSError as e:
+            print(f"audit_logger: failed to rotate log: {e}", file=sys.stderr)
+            return None
+    return target
+
+
+def list_segments(log_file, include_active=True):
+    """Return rotated segments oldest first, followed by the active log."""
+    from pathlib import Path
+
+    log_file = Path(log_file)
+    prefix = log_file.name + "."
+    segments = []
+    if log_file.parent.is_dir():
+        for entry in os.scandir(log_file.parent):
+            name = entry.name
+            if not name.startswith(prefix) or name.endswith((".lock", ".tmp")):
+                continue
+            segments.append(Path(entry.path))
+    # Timestamped names sort chronologically
+    segments.sort(key=lambda p: p.name.removesuffix(".gz"))
+    if include_active and log_file.exists():
+        segments.append(log_file)
+    return segments
+
+
+def compress_segments(log_file, grace=COMPRESS_GRACE):
+    """Gzip rotated, uncompressed segments that have been idle for grace seconds."""
+    import gzip
+    import shutil
+    import time
+
+    compressed = []
+    with locked(f"{log_file}.compress.lock", blocking=False) as acquired:
+        if not acquired:
+            return compressed  # Another compressor is running
+        for segment in list_segments(log_file, include_active=False):
+            if segment.suffix == ".gz":
+                continue
+            try:
+                if time.time() - segment.stat().st_mtime < grace:
+                    continue
+                tmp = segment.with_name(segment.name + ".gz.tmp")
+                with open(segment, "rb") as src, gzip.open(tmp, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(tmp, segment.with_name(segment.name + ".gz"))
+                os.unlink(segment)
+                compressed.append(segment)
+            except OSError as e:
+                print(f"audit_logger: failed to compress {segment}: {e}", file=sys.stderr)
+    return compressed
+
+
+def spawn_compressor(log_file):
+    """Compress rotated segments in a detached background process."""
+    import subprocess
+
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.realpath(__file__), "compress", str(log_file)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print(f"audit_logger: failed to start compressor: {e}", file=sys.stderr)
+
+
+# =============================================================================
+# Reading entries back (text and JSONL formats)
+# =============================================================================
+
+TEXT_SEPARATOR = b"---\n"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+HEADER_PATTERN = (
+    r"^\[(?P<timestamp>[^\]]+)\] SESSION:(?P<session>\S*) HOST:(?P<host>\S*) USER:(?P<user>\S*)$"
+)
+CONTEXT_PATTERN = (
+    r"^CWD: (?P<cwd>.*) REPO: (?P<repo>\S+) BRANCH: (?P<branch>.*?)"
+    r"(?:@(?P<commit>[0-9a-f]{4,40}))?(?P<dirty> \[dirty\??\])?$"
+)
+EVENT_PATTERN = r"^EVENT: (?P<event>\S*) TOOL: (?P<tool>\S*)$"
+
+_text_patterns = None
+
+
+def text_patterns():
+    """Compiled (header, context, event) patterns, compiled on first use."""
+    global _text_patterns
+    if _text_patterns is None:
+        import re
+
+        _text_patterns = tuple(
+            re.compile(p) for p in (HEADER_PATTERN, CONTEXT_PATTERN, EVENT_PATTERN)
+        )
+    return _text_patterns
+
+
+def open_segment(path):
+    """Open a log segment for binary reading, decompressing .gz transparently."""
+    if str(path).endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def segment_format(path):
+    """Log format of a segment, derived from its base file name."""
+    return "jsonl" if ".jsonl" in os.path.basename(path) else "text"
+
+
+def normalize_timestamp(value):
+    """Return value as local "YYYY-MM-DD HH:MM:SS.mmm" (the text log's format)."""
+    if not value:
+        return None
+    if "T" not in value:
+        return value
+    from datetime import datetime
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)[:-3]
+
+
+def _known(value):
+    return None if value in (None, "", "unknown") else value
+
+
+def parse_text_entry(lines):
+    """Parse one text record (lines without the "---" separator) into a dict."""
+    if len(lines) < 5:
+        return None
+    header_re, context_re, event_re = text_patterns()
+    header = header_re.match(lines[0])
+    context = context_re.match(lines[1])
+    event = event_re.match(lines[-1])
+    if not (header and context and event and lines[2].startswith("COMMAND: ")):
+        return None
+
+    # Commands may span lines; the description starts at the last DESCRIPTION line
+    desc_index = max(
+        (i for i in range(3, len(lines) - 1) if lines[i].startswith("DESCRIPTION: ")),
+        default=None,
+    )
+    if desc_index is None:
+        return None
+    command = "\n".join(lines[2:desc_index])[len("COMMAND: "):]
+    description = "\n".join(lines[desc_index:-1])[len("DESCRIPTION: "):]
+
+    return {
+        "timestamp": header["timestamp"],
+        "session": _known(header["session"]),
+        "host": _known(header["host"]),
+        "user": _known(header["user"]),
+        "cwd": _known(context["cwd"]),
+        "repo": _known(context["repo"]),
+        "branch": _known(context["branch"]),
+        "commit": context["commit"],
+        "dirty": None if context["dirty"] == " [dirty?]" else bool(context["dirty"]),
+        "command": command,
+        "description": None if description == "No description" else description,
+        "event": _known(event["event"]),
+        "tool": _known(event["tool"]),
+    }
+
+
+def parse_json_entry(line):
+    """Parse one JSONL record, normalizing its timestamp."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    record["timestamp"] = normalize_timestamp(record.get("timestamp"))
+    return record
+
+
+def iter_entries(stream, fmt, offset=0):
+    """Yield (end_offset, entry) for each complete entry in a binary stream.
+
+    Reading starts at offset; a trailing partial entry (still being written)
+    is not yielded, so end_offset of the last entry is a safe resume point.
+    Malformed entries are skipped but still advance the offset.
+    """
+    if offset:
+        stream.seek(offset)
+    position = offset
+    pending = []
+    for raw in stream:
+        if not raw.endswith(b"\n"):
+            break  # Incomplete final line
+        position += len(raw)
+        if fmt == "jsonl":
+            entry = parse_json_entry(raw)
+            if entry is not None:
+                yield position, entry
+            continue
+        if raw == TEXT_SEPARATOR:
+            lines = [line.decode("utf-8", errors="replace").rstrip("\n") for line in pending]
+            pending = []
+            entry = parse_text_entry(lines)
+            if entry is not None:
+                yield position, entry
+        else:
+            pending.append(raw)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2 or args[0] != "compress":
+        print(__doc__.strip(), file=sys.stderr)
+        return 1
+    import time
+
+    # Give writers still holding the pre-rotation descriptor time to finish
+    time.sleep(COMPRESS_GRACE)
+    compress_segments(args[1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
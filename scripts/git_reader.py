@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Subprocess-free Git metadata reader.
+
+Resolves repository root, current branch, detached/tag state and short HEAD
+SHA by reading .git, HEAD, loose refs and packed-refs directly. Linked
+worktrees and submodules (where .git is a "gitdir:" file) are supported.
+
+Layouts this reader does not understand (reftable ref storage, GIT_DIR
+overrides, a loose tag whose object cannot be read, when looking for the
+tag of a detached HEAD) return None so callers can fall
+back to running git.
+
+The short SHA is core.abbrev characters long when the repository or
+global git config sets it to a number (the full SHA for "no"), else 7.
+Unlike `git rev-parse --short`, it is not lengthened for large
+repositories ("auto") or to keep the prefix unique: that needs the object
+database.
+
+Usage:
+    git_reader.py [--cwd DIR] [FIELD]
+
+    FIELD is one of root, repo, branch, tag, commit, detached. Without FIELD
+    all fields are printed as key=value lines. Exits 1 when cwd is not a
+    repository or the layout is unsupported.
+"""
+
+import os
+import sys
+
+SHORT_SHA_LENGTH = 7
+MAX_TAG_DEPTH = 5
+
+# Environment overrides that change where git looks for the repository
+GIT_ENV_OVERRIDES = ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR")
+
+
+def find_git_dir(cwd):
+    """Locate (worktree_root, git_dir) for cwd without running git.
+
+    Handles linked worktrees and submodules, where .git is a file
+    containing "gitdir: <path>". Returns (None, None) outside a repository.
+    """
+    path = os.path.abspath(cwd)
+    while True:
+        dotgit = os.path.join(path, ".git")
+        if os.path.isdir(dotgit):
+            return path, dotgit
+        if os.path.isfile(dotgit):
+            try:
+                with open(dotgit, encoding="utf-8") as f:
+                    content = f.read().strip()
+            except OSError:
+                return None, None
+            if not content.startswith("gitdir:"):
+                return None, None
+            git_dir = content[len("gitdir:"):].strip()
+            return path, os.path.normpath(os.path.join(path, git_dir))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None, None
+        path = parent
+
+
+def common_git_dir(git_dir):
+    """Return the directory holding shared refs (differs for linked worktrees)."""
+    try:
+        with open(os.path.join(git_dir, "commondir"), encoding="utf-8") as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def read_head(git_dir):
+    """Return the raw contents of HEAD ("ref: refs/heads/x" or a SHA), or None."""
+    try:
+        with open(os.path.join(git_dir, "HEAD"), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_packed_refs(common_dir):
+    """Parse packed-refs into ({ref: sha}, {ref: peeled_sha})."""
+    refs, peeled = {}, {}
+    try:
+        with open(os.path.join(common_dir, "packed-refs"), encoding="utf-8") as f:
+            last_ref = None
+            for line in f:
+                line = line.rstrip("\n")
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("^"):
+                    if last_ref:
+                        peeled[last_ref] = line[1:]
+                    continue
+                sha, _, ref = line.partition(" ")
+                refs[ref] = sha
+                last_ref = ref
+    except OSError:
+        pass
+    return refs, peeled
+
+
+def resolve_ref(git_dir, common_dir, ref, packed=None, depth=0):
+    """Resolve a ref name to a SHA via loose refs, then packed-refs."""
+    if depth > 5:
+        return None
+    # Per-worktree refs (HEAD-like pseudo refs) live in git_dir, shared refs in common_dir
+    for base in (common_dir, git_dir) if ref.startswith("refs/") else (git_dir,):
+        try:
+            with open(os.path.join(base, ref), encoding="utf-8") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.startswith("ref:"):
+            return resolve_ref(git_dir, common_dir, value[4:].strip(), packed, depth + 1)
+        return value or None
+    if packed is None:
+        packed, _ = read_packed_refs(common_dir)
+    return packed.get(ref)
+
+
+def config_abbrev(common_dir):
+    """Short SHA length from core.abbrev in the global and repository config
+    (include directives are not followed)."""
+    paths = [
+        os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config"),
+                     "git", "config"),
+        os.path.join(os.path.expanduser("~"), ".gitconfig"),
+        os.path.join(common_dir, "config"),
+    ]
+    value = None
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        section = None
+        for line in lines:
+            line = line.strip()
+            if line.startswith("["):
+                section = line[1:line.find("]")].strip().lower()
+                continue
+            key, sep, raw = line.partition("=")
+            if section == "core" and sep and key.strip().lower() == "abbrev":
+                value = raw.split("#")[0].split(";")[0].strip().strip('"').lower()
+    if value in ("no", "false", "off"):
+        return 40
+    if value and value.isdigit():
+        return min(max(int(value), 4), 40)
+    return SHORT_SHA_LENGTH
+
+
+# Pack entry type numbers; 6 (OFS_DELTA) and 7 (REF_DELTA) are deltas
+PACK_TYPES = {1: b"commit", 2: b"tree", 3: b"blob", 4: b"tag"}
+MAX_DELTA_DEPTH = 50
+
+
+def pack_offset(idx_path, sha):
+    """Offset of object sha in the pack of a version 2 .idx file, or None."""
+    import mmap
+    import struct
+
+    name = bytes.fromhex(sha)
+    size = len(name)
+    with open(idx_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as idx:
+        if idx[:8] != b"\377tOc\0\0\0\2":
+            return None
+        fanout = 8
+        total = struct.unpack_from(">I", idx, fanout + 4 * 255)[0]
+        lo = struct.unpack_from(">I", idx, fanout + 4 * (name[0] - 1))[0] if name[0] else 0
+        hi = struct.unpack_from(">I", idx, fanout + 4 * name[0])[0]
+        names = fanout + 4 * 256
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = idx[names + mid * size:names + (mid + 1) * size]
+            if entry < name:
+                lo = mid + 1
+            elif entry > name:
+                hi = mid
+            else:
+                offsets = names + total * size + total * 4  # After the CRC32 table
+                offset = struct.unpack_from(">I", idx, offsets + 4 * mid)[0]
+                if offset & 0x80000000:
+                    offset = struct.unpack_from(">Q", idx, offsets + total * 4 + 8 * (offset & 0x7FFFFFFF))[0]
+                return offset
+    return None
+
+
+def apply_delta(base, delta):
+    """Rebuild an object from its base and a git delta (copy/insert opcodes)."""
+    pos = 0
+    for _ in range(2):  # Skip the source and target size varints
+        while delta[pos] & 0x80:
+            pos += 1
+        pos += 1
+    out = bytearray()
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset:offset + (size or 0x10000)]
+        elif op:
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise ValueError("invalid delta opcode")
+    return bytes(out)
+
+
+def read_pack_entry(idx_path, offset, hash_size, depth=0):
+    """(type, data) of the pack entry at offset, resolving deltas within
+    the same pack; None when a delta base is not in it."""
+    import zlib
+
+    with open(idx_path[:-len(".idx")] + ".pack", "rb") as f:
+        f.seek(offset)
+        byte = f.read(1)[0]
+        kind, size, shift = (byte >> 4) & 7, byte & 15, 4
+        while byte & 0x80:
+            byte = f.read(1)[0]
+            size |= (byte & 0x7F) << shift
+            shift += 7
+        base_offset = None
+        if kind == 6:
+            byte = f.read(1)[0]
+            distance = byte & 0x7F
+            while byte & 0x80:
+                byte = f.read(1)[0]
+                distance = ((distance + 1) << 7) | (byte & 0x7F)
+            base_offset = offset - distance
+        elif kind == 7:
+            base_offset = pack_offset(idx_path, f.read(hash_size).hex())
+            if base_offset is None:
+                return None
+        elif kind not in PACK_TYPES:
+            return None
+        inflater = zlib.decompressobj()
+        data = b""
+        while len(data) < size and not inflater.eof:
+            chunk = f.read(4096)
+            if not chunk:
+                break
+            data += inflater.decompress(chunk)
+    if base_offset is None:
+        return PACK_TYPES[kind], data
+    if depth >= MAX_DELTA_DEPTH:
+        return None
+    base = read_pack_entry(idx_path, base_offset, hash_size, depth + 1)
+    if base is None:
+        return None
+    return base[0], apply_delta(base[1], data)
+
+
+def read_object(common_dir, sha):
+    """(type, data) of object sha from loose objects or packs, or None."""
+    import glob
+    import zlib
+
+    try:
+        with open(os.path.join(common_dir, "objects", sha[:2], sha[2:]), "rb") as f:
+            header, _, data = zlib.decompress(f.read()).partition(b"\0")
+        return header.split(b" ", 1)[0], data
+    except (OSError, zlib.error):
+        pass
+    for idx_path in glob.glob(os.path.join(common_dir, "objects", "pack", "*.idx")):
+        try:
+            offset = pack_offset(idx_path, sha)
+            if offset is not None:
+                return read_pack_entry(idx_path, offset, len(sha) // 2)
+        except (OSError, ValueError, IndexError, zlib.error):
+            return None
+    return None
+
+
+def peel_object(common_dir, sha):
+    """The SHA sha resolves to, tags followed to their target, or None when
+    an object on the way cannot be read."""
+    for _ in range(MAX_TAG_DEPTH):
+        try:
+            obj = read_object(common_dir, sha)
+        except ValueError:  # Not a hex SHA
+            return None
+        if obj is None:
+            return None
+        kind, data = obj
+        if kind != b"tag":
+            return sha
+        first = data.split(b"\n", 1)[0]
+        if not first.startswith(b"object "):
+            return None
+        sha = first[len(b"object "):].decode("ascii", "replace").strip()
+    return None
+
+
+def find_exact_tag(common_dir, sha):
+    """Return (tag, complete) for a tag pointing exactly at sha.
+
+    Loose tags are peeled by reading the objects they point at, loose or
+    packed. complete is False when such an object cannot be read (missing,
+    or a delta against a base in another pack); the caller should ask git
+    instead.
+    """
+    packed, peeled = read_packed_refs(common_dir)
+    candidates = []
+    unresolved = False
+
+    tags_dir = os.path.join(common_dir, "refs", "tags")
+    loose = {}
+    for dirpath, _, filenames in os.walk(tags_dir):
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            ref = os.path.relpath(full, common_dir).replace(os.sep, "/")
+            try:
+                with open(full, encoding="utf-8") as f:
+                    loose[ref] = f.read().strip()
+            except OSError:
+                unresolved = True
+
+    for ref, target in {**packed, **loose}.items():
+        if not ref.startswith("refs/tags/"):
+            continue
+        if target == sha or (ref not in loose and peeled.get(ref) == sha):
+            candidates.append(ref[len("refs/tags/"):])
+        elif ref in loose:
+            # A tag of another commit, or an annotated tag of this one
+            target = peel_object(common_dir, target)
+            if target is None:
+                unresolved = True
+            elif target == sha:
+                candidates.append(ref[len("refs/tags/"):])
+
+    if candidates:
+        return min(candidates), True
+    return None, not unresolved
+
+
+def read_git_info(cwd, abbrev=None):
+    """Read repository metadata for cwd without starting git.
+
+    Returns a dict with root, repo, branch, tag, commit and detached keys,
+    {} outside a repository, or None for layouts that need a git fallback.
+    """
+    if any(os.environ.get(var) for var in GIT_ENV_OVERRIDES):
+        return None
+    root, git_dir = find_git_dir(cwd)
+    if not git_dir:
+        return {}
+    common_dir = common_git_dir(git_dir)
+    if os.path.isdir(os.path.join(common_dir, "reftable")):
+        return None
+    head = read_head(git_dir)
+    if not head:
+        return None
+
+    info = {
+        "root": root,
+        "repo": os.path.basename(root),
+        "branch": None,
+        "tag": None,
+        "commit": None,
+        "detached": False,
+    }
+    if head.startswith("ref:"):
+        ref = head[len("ref:"):].strip()
+        if ref.startswith("refs/heads/"):
+            info["branch"] = ref[len("refs/heads/"):]
+        sha = resolve_ref(git_dir, common_dir, ref)
+    else:
+        info["detached"] = True
+        sha = head
+
+    if abbrev is None:
+        abbrev = config_abbrev(common_dir)
+    if sha and len(sha) >= abbrev:
+        info["commit"] = sha[:abbrev]
+    if info["detached"] and sha:
+        tag, complete = find_exact_tag(common_dir, sha)
+        if not complete:
+            return None
+        info["tag"] = tag
+    return info
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    cwd = os.getcwd()
+    if len(args) >= 2 and args[0] == "--cwd":
+        cwd = args[1]
+        args = args[2:]
+
+    info = read_git_info(cwd)
+    if not info:
+        return 1
+    if args:
+        value = info.get(args[0])
+        if value is None or value is False:
+            return 1
+        print("true" if value is True else value)
+        return 0
+    for key, value in info.items():
+        print(f"{key}={'' if value is None else value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Warm formatter server for post_edit.py (CLAUDE_HOOK_FORMAT_SERVER=1).
+
+Listens on ~/.claude/run/format-server.sock and keeps one Node worker
+(format_worker.js) per project root with that project's prettier and eslint
+already loaded, so an edit costs one request instead of a Node start and a
+config load per tool. A worker is restarted when a config file in its root
+changes (package.json, .prettierrc*, .eslintrc*, eslint.config.*, ...).
+
+Clients get an error reply, and run the tools themselves, whenever the
+server cannot serve a request: no node, a crashed or hung worker.
+
+Only one server runs per user: a lock file is held for the server's
+lifetime and extra instances exit immediately.
+
+Usage:
+    format_server.py           # Run in the foreground
+    format_server.py --stop    # Ask a running server to exit
+
+Environment variables:
+    CLAUDE_FORMAT_SERVER_IDLE  - Seconds without requests before exiting (default 600)
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import select
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import post_edit
+import result_cache
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / "format_worker.js"
+MAX_MESSAGE = 1024 * 1024
+MAX_WORKERS = 8
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def parse_idle_timeout(value):
+    try:
+        parsed = float(value) if value is not None else DEFAULT_IDLE_TIMEOUT
+    except ValueError:
+        return DEFAULT_IDLE_TIMEOUT
+    return parsed if parsed > 0 else DEFAULT_IDLE_TIMEOUT
+
+
+def config_signature(root):
+    """(name, mtime, size) of every formatter/linter config file in root."""
+    signature = []
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if result_cache.matches(entry.name, post_edit.NODE_CONFIG_FILES):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    signature.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        pass
+    return tuple(sorted(signature))
+
+
+class WorkerError(Exception):
+    """The Node worker died, hung or answered garbage."""
+
+
+class NodeWorker:
+    """A format_worker.js process for one project root."""
+
+    def __init__(self, root, node):
+        self.root = root
+        self.signature = config_signature(root)
+        self.lock = threading.Lock()
+        self._next_id = 0
+        self._buffer = b""
+        self.process = subprocess.Popen(
+            [node, str(WORKER_SCRIPT), root],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=root,
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, file, tools, timeout):
+        """Run tools on file. Returns the worker's result list."""
+        with self.lock:
+            self._next_id += 1
+            request_id = self._next_id
+            message = json.dumps({"id": request_id, "file": file, "tools": tools})
+            try:
+                self.process.stdin.write(message.encode("utf-8") + b"\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                self.stop()
+                raise WorkerError(f"worker not accepting requests: {e}") from None
+
+            deadline = time.monotonic() + timeout
+            while True:
+                line = self._read_line(deadline)
+                try:
+                    response = json.loads(line)
+                except ValueError:
+                    continue  # Stray output from a tool
+                if isinstance(response, dict) and response.get("id") == request_id:
+                    return response.get("results", [])
+
+    def _read_line(self, deadline):
+        stdout = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                # A hung request would block every later one: start over
+                self.stop()
+                raise WorkerError("worker timed out")
+            chunk = os.read(stdout, 65536)
+            if not chunk:
+                self.stop()
+                raise WorkerError("worker exited")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+
+    def stop(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class WorkerPool:
+    """Workers by project root, restarted on config changes, least recent evicted."""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+
+    def get(self, root):
+        node = shutil.which("node")
+        if node is None:
+            raise WorkerError("node not found")
+        with self._lock:
+            worker = self._workers.pop(root, None)
+            if worker is not None and (not worker.alive() or worker.signature != config_signature(root)):
+                self._stop_later(worker)
+                worker = None
+            if worker is None:
+                if len(self._workers) >= self._max_workers:
+                    self._stop_later(self._workers.pop(next(iter(self._workers))))
+                worker = NodeWorker(root, node)
+            self._workers[root] = worker  # Most recently used last
+            return worker
+
+    def _stop_later(self, worker):
+        # Wait for an in-flight request on the old worker before killing it
+        def stop():
+            with worker.lock:
+                worker.stop()
+
+        threading.Thread(target=stop, daemon=True).start()
+
+    def stop_all(self):
+        with self._lock:
+            for worker in self._workers.values():
+                worker.stop()
+            self._workers.clear()
+
+
+class FormatRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.last_activity = time.monotonic()
+        try:
+            payload = json.loads(self.rfile.read(MAX_MESSAGE))
+        except ValueError:
+            self.reply({"error": "invalid request"})
+            return
+
+        if payload.get("control") == "stop":
+            self.reply({"ok": True})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return
+
+        root, file = payload.get("root"), payload.get("file")
+        tools = [tool for tool in payload.get("tools", []) if isinstance(tool, str)]
+        if not (root and file and os.path.isdir(root)):
+            self.reply({"error": "root and file required"})
+            return
+        timeout = payload.get("timeout") or post_edit.hook_timeout()
+        try:
+            results = server.workers.get(os.path.realpath(root)).request(file, tools, timeout)
+        except (WorkerError, OSError) as e:
+            self.reply({"error": str(e)})
+            return
+        self.reply({"results": results})
+
+    def reply(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8"))
+
+
+class FormatServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, sock_path):
+        super().__init__(str(sock_path), FormatRequestHandler)
+        self.workers = WorkerPool()
+        self.last_activity = time.monotonic()
+
+
+@contextlib.contextmanager
+def server_lock(sock_path):
+    """Hold an exclusive lock on the socket's lock file while the server runs.
+    Yields False if another server holds it."""
+    with open(f"{sock_path}.lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        yield True
+
+
+def watch_idle(server, idle_timeout):
+    while True:
+        time.sleep(min(idle_timeout, 5))
+        if time.monotonic() - server.last_activity >= idle_timeout:
+            server.shutdown()
+            return
+
+
+def serve(sock_path=None, idle_timeout=None):
+    """Run the server until idle or stopped. Returns a process exit code."""
+    sock_path = Path(sock_path or post_edit.format_server_socket())
+    if idle_timeout is None:
+        idle_timeout = parse_idle_timeout(os.environ.get("CLAUDE_FORMAT_SERVER_IDLE"))
+
+    sock_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    with server_lock(sock_path) as acquired:
+        if not acquired:
+            return 0  # Another server is already running
+
+        # Holding the lock means any existing socket file is stale
+        try:
+            os.unlink(sock_path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o077)
+        try:
+            server = FormatServer(sock_path)
+        finally:
+            os.umask(old_umask)
+
+        threading.Thread(target=watch_idle, args=(server, idle_timeout), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            server.workers.stop_all()
+            try:
+                os.unlink(sock_path)
+            except FileNotFoundError:
+                pass
+    return 0
+
+
+def stop():
+    """Ask a running server to exit. Returns 0 if one acknowledged."""
+    reply = post_edit.request_format_server({"control": "stop"})
+    return 0 if reply and reply.get("ok") else 1
+
+
+def main():
+    if not hasattr(socket, "AF_UNIX"):
+        print("format_server: Unix sockets not supported on this platform", file=sys.stderr)
+        return 1
+    if "--stop" in sys.argv[1:]:
+        return stop()
+    return serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
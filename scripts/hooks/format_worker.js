@@ -0,0 +1,135 @@
+#!/usr/bin/env node
+// Warm prettier/eslint worker for one project root, started by format_server.py.
+//
+// Reads one JSON request per line on stdin, {"id", "file", "tools"}, and
+// writes one response per line on stdout, {"id", "results": [{"tool",
+// "status", "output", "changed"}]}. status is "ok", "failed", or "missing"
+// when the tool is not installed for this project (the client then resolves
+// it itself); changed tells whether the tool rewrote the file. Tools are
+// loaded from the project's node_modules once and reused.
+"use strict";
+
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+
+const root = path.resolve(process.argv[2] || ".");
+const modules = {};
+
+// Keep stdout for the protocol; tools that log go to stderr
+console.log = console.info = console.warn = console.error;
+
+function load(name) {
+  if (!(name in modules)) {
+    try {
+      modules[name] = require(require.resolve(name, { paths: [root] }));
+    } catch (e) {
+      modules[name] = null;
+    }
+  }
+  return modules[name];
+}
+
+// Atomically replace file's content, unless it changed since source was read
+function replaceIfUnchanged(file, source, formatted) {
+  const target = fs.realpathSync(file);
+  if (fs.readFileSync(target, "utf8") !== source) {
+    throw new Error("file changed while formatting; left as is");
+  }
+  const tmp = path.join(path.dirname(target), `.${path.basename(target)}.${process.pid}.tmp`);
+  try {
+    fs.writeFileSync(tmp, formatted);
+    fs.chmodSync(tmp, fs.statSync(target).mode & 0o7777);
+    fs.renameSync(tmp, target);
+  } catch (e) {
+    fs.rmSync(tmp, { force: true });
+    throw e;
+  }
+}
+
+async function runPrettier(file) {
+  const prettier = load("prettier");
+  if (!prettier) return { status: "missing", output: "" };
+
+  const info = await prettier.getFileInfo(file, {
+    ignorePath: path.join(root, ".prettierignore"),
+    resolveConfig: true,
+  });
+  if (info.ignored) return { status: "ok", output: "", changed: false };
+  if (!info.inferredParser) {
+    return { status: "failed", output: `No parser could be inferred for file "${file}".` };
+  }
+  const options = (await prettier.resolveConfig(file, { editorconfig: true })) || {};
+  const source = fs.readFileSync(file, "utf8");
+  const formatted = await prettier.format(source, { ...options, filepath: file });
+  // Unchanged files keep their mtime, so watchers and incremental builds stay quiet
+  if (formatted === source) return { status: "ok", output: "", changed: false };
+  replaceIfUnchanged(file, source, formatted);
+  return { status: "ok", output: "", changed: true };
+}
+
+let eslint = null;
+
+async function loadESLint() {
+  if (!eslint) {
+    const module = load("eslint");
+    if (!module) return null;
+    // loadESLint picks flat or eslintrc config like the CLI does (ESLint >= 8.57)
+    const ESLint = module.loadESLint ? await module.loadESLint({ cwd: root }) : module.ESLint;
+    eslint = { ESLint, instance: new ESLint({ cwd: root, fix: true }) };
+  }
+  return eslint;
+}
+
+async function runEslint(file) {
+  const linter = await loadESLint();
+  if (!linter) return { status: "missing", output: "" };
+
+  const results = await linter.instance.lintFiles([file]);
+  await linter.ESLint.outputFixes(results);
+  const changed = results.some((result) => result.output !== undefined);
+  const lines = [];
+  let errors = 0;
+  for (const result of results) {
+    errors += result.errorCount + (result.fatalErrorCount || 0);
+    for (const message of result.messages) {
+      const severity = message.severity === 2 ? "error" : "warning";
+      const rule = message.ruleId ? ` (${message.ruleId})` : "";
+      lines.push(
+        `${path.relative(root, result.filePath)}:${message.line || 0}:${message.column || 0} ` +
+          `${severity} ${message.message}${rule}`
+      );
+    }
+  }
+  return { status: errors ? "failed" : "ok", output: lines.join("\n"), changed };
+}
+
+const TOOLS = { prettier: runPrettier, eslint: runEslint };
+
+async function handle(line) {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    return;
+  }
+  const results = [];
+  for (const tool of request.tools || []) {
+    const run = TOOLS[tool];
+    try {
+      results.push({ tool, ...(run ? await run(request.file) : { status: "missing", output: "" }) });
+    } catch (e) {
+      results.push({ tool, status: "failed", output: String((e && e.message) || e) });
+    }
+  }
+  process.stdout.write(JSON.stringify({ id: request.id, results }) + "\n");
+}
+
+// Requests are handled one at a time, in order
+let pending = Promise.resolve();
+readline
+  .createInterface({ input: process.stdin })
+  .on("line", (line) => {
+    pending = pending.then(() => handle(line));
+  })
+  .on("close", () => pending.then(() => process.exit(0)));
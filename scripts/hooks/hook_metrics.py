@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Subprocess timing metrics for the hooks (CLAUDE_HOOK_METRICS=1).
+
+post_edit.py, pre_commit.py and audit_logger.py pass every command they run
+to record(), which appends one JSON line to ~/.claude/hook-metrics.jsonl:
+
+    {"ts": 1767225600.123, "hook": "post_edit", "handler": "handle_python",
+     "tool": "ruff format", "runner": "local", "ms": 41.7, "exit": 0,
+     "timeout": false, "cwd": "/path/to/project"}
+
+runner is how the tool was resolved: "local" (the project's .venv/bin or
+node_modules/.bin), "direct" (PATH) or the "uvx"/"npx" fallback. exit is
+None when the command could not start. Each record is a single O_APPEND
+write, so concurrent hooks never interleave lines; the file is rotated to
+hook-metrics.jsonl.1 once it passes CLAUDE_HOOK_METRICS_MAX_BYTES.
+
+Usage:
+    hook_metrics.py [--since 7d] [--hook post_edit] [--by hook,handler,tool,runner] [--json]
+
+prints p50/p95/p99 wall time per group, slowest p95 first.
+"""
+
+import os
+import re
+import sys
+import time
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+FIELDS = ("hook", "handler", "tool", "runner", "cwd")
+DEFAULT_GROUP = ("hook", "handler", "tool", "runner")
+RUNNERS = ("uvx", "npx")
+LOCAL_BIN_DIRS = (os.path.join(".venv", "bin"), os.path.join("node_modules", ".bin"))
+SUBCOMMAND_RE = re.compile(r"[a-z][a-z0-9-]*")
+RELATIVE_TIME_RE = re.compile(r"(\d+)([mhdw])")
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def enabled():
+    return os.environ.get("CLAUDE_HOOK_METRICS") == "1"
+
+
+def metrics_path():
+    return os.path.join(os.path.expanduser("~"), ".claude", "hook-metrics.jsonl")
+
+
+def max_bytes():
+    try:
+        parsed = int(os.environ.get("CLAUDE_HOOK_METRICS_MAX_BYTES", ""))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+    return parsed if parsed > 0 else DEFAULT_MAX_BYTES
+
+
+def describe(cmd):
+    """(tool, runner) for a command list: the tool with its subcommand
+    ("ruff check", "cargo clippy") and how it was resolved."""
+    if not cmd:
+        return "", "direct"
+    program = os.path.basename(cmd[0])
+    args = cmd[1:]
+    if program in RUNNERS and args:
+        runner = program
+        program, args = os.path.basename(args[0]), args[1:]
+    elif any(os.sep + bin_dir + os.sep in cmd[0] for bin_dir in LOCAL_BIN_DIRS):
+        runner = "local"
+    else:
+        runner = "direct"
+    if args and SUBCOMMAND_RE.fullmatch(args[0]):
+        program = f"{program} {args[0]}"
+    return program, runner
+
+
+def record(hook, handler, cmd, seconds, returncode, timed_out=False, cwd=None):
+    """Append one command's timing; a no-op unless CLAUDE_HOOK_METRICS=1."""
+    if not enabled():
+        return
+    import json
+
+    tool, runner = describe(cmd)
+    line = json.dumps({
+        "ts": round(time.time(), 3),
+        "hook": hook,
+        "handler": handler or hook,
+        "tool": tool,
+        "runner": runner,
+        "ms": round(seconds * 1000, 1),
+        "exit": returncode,
+        "timeout": timed_out,
+        "cwd": cwd or os.getcwd(),
+    })
+    path = metrics_path()
+    try:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, (line + "\n").encode("utf-8", "surrogateescape"))
+            full = os.fstat(fd).st_size >= max_bytes()
+        finally:
+            os.close(fd)
+        if full:
+            os.replace(path, path + ".1")
+    except OSError as e:
+        print(f"hook_metrics: failed to write {path}: {e}", file=sys.stderr)
+
+
+def read_records(paths, since=None):
+    """Records from paths (oldest file first), skipping malformed lines."""
+    import json
+
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.readlines()  # Bounded by the max_bytes() rotation
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or not isinstance(entry.get("ms"), (int, float)):
+                continue
+            if since is not None and entry.get("ts", 0) < since:
+                continue
+            yield entry
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list."""
+    import math
+
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(records, group=DEFAULT_GROUP):
+    """Rows of per-group timing stats, slowest p95 first."""
+    groups = {}
+    for entry in records:
+        key = tuple(str(entry.get(field, "")) for field in group)
+        groups.setdefault(key, []).append(entry)
+
+    rows = []
+    for key, entries in groups.items():
+        times = sorted(entry["ms"] for entry in entries)
+        rows.append({
+            **dict(zip(group, key)),
+            "count": len(times),
+            "p50": percentile(times, 50),
+            "p95": percentile(times, 95),
+            "p99": percentile(times, 99),
+            "max": times[-1],
+            "failures": sum(1 for entry in entries if entry.get("exit") != 0),
+            "timeouts": sum(1 for entry in entries if entry.get("timeout")),
+        })
+    rows.sort(key=lambda row: (-row["p95"], -row["count"]))
+    return rows
+
+
+def format_rows(rows, group):
+    if not rows:
+        return "No metrics recorded (set CLAUDE_HOOK_METRICS=1)"
+    columns = [*group, "count", "p50", "p95", "p99", "max", "failures", "timeouts"]
+    cells = [[str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    numeric = len(group)
+    lines = []
+    for line in [columns, *cells]:
+        lines.append("  ".join(
+            cell.rjust(width) if i >= numeric else cell.ljust(width)
+            for i, (cell, width) in enumerate(zip(line, widths))
+        ).rstrip())
+    return "\n".join(lines)
+
+
+def parse_since(value, now=None):
+    """Epoch seconds for "30m"/"12h"/"7d"/"2w" ago."""
+    match = RELATIVE_TIME_RE.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"invalid time: {value} (expected e.g. 30m, 12h, 7d, 2w)")
+    return (now if now is not None else time.time()) - int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="hook_metrics.py", description="Summarize hook subprocess timings (ms)."
+    )
+    parser.add_argument("--since", help="Only records newer than this: 30m, 12h, 7d, 2w")
+    parser.add_argument("--hook", help="Only records of this hook (post_edit, pre_commit, audit_logger)")
+    parser.add_argument(
+        "--by", default=",".join(DEFAULT_GROUP),
+        help=f"Comma-separated fields to group by, from {', '.join(FIELDS)} (default {','.join(DEFAULT_GROUP)})",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the rows as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    group = tuple(field.strip() for field in args.by.split(",") if field.strip())
+    unknown = [field for field in group if field not in FIELDS]
+    if unknown or not group:
+        print(f"hook_metrics: unknown field(s) {', '.join(unknown) or '(none)'}; choose from {', '.join(FIELDS)}",
+              file=sys.stderr)
+        return 1
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError as e:
+        print(f"hook_metrics: {e}", file=sys.stderr)
+        return 1
+
+    path = metrics_path()
+    records = read_records([path + ".1", path], since)
+    if args.hook:
+        records = (entry for entry in records if entry.get("hook") == args.hook)
+    rows = summarize(records, group)
+    if args.json:
+        import json
+
+        print(json.dumps(rows, ensure_ascii=False))
+    else:
+        print(format_rows(rows, group))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Debounced background lint queue for post_edit.py (CLAUDE_HOOK_LINT_QUEUE=1).
+
+In this mode post_edit formats synchronously and hands the edited file to
+this server over ~/.claude/run/lint-queue.sock. A file is linted once it
+has gone CLAUDE_LINT_QUEUE_DELAY seconds without another edit, so a burst
+of edits to one file costs one lint run. Files of a project that are due
+together are linted in one batch, without autofixes (the files may still
+be open for editing), by at most CLAUDE_LINT_QUEUE_WORKERS runs at a time.
+
+Results are handed to the next post_edit run in the same project, which
+prints them, and the latest result per file is kept in
+~/.claude/run/lint-status/<project hash>.json.
+
+Only one server runs per user: a lock file is held for the server's
+lifetime and extra instances exit immediately.
+
+Usage:
+    lint_queue.py           # Run in the foreground
+    lint_queue.py --stop    # Ask a running server to exit
+
+Environment variables:
+    CLAUDE_LINT_QUEUE_DELAY    - Quiet seconds before a file is linted (default 1.5)
+    CLAUDE_LINT_QUEUE_WORKERS  - Maximum concurrent lint runs (default 2)
+    CLAUDE_LINT_QUEUE_IDLE     - Seconds without requests before exiting (default 600)
+"""
+
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import post_edit
+from format_server import server_lock
+
+MAX_MESSAGE = 1024 * 1024
+DEFAULT_DELAY = 1.5
+DEFAULT_WORKERS = 2
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def parse_positive(value, default, kind=float):
+    try:
+        parsed = kind(value) if value is not None else default
+    except ValueError:
+        return default
+    return parsed if parsed > 0 else default
+
+
+def project_root(path):
+    return post_edit.find_project_root(path) or os.path.dirname(path)
+
+
+def status_path(root):
+    digest = hashlib.sha256(root.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return os.path.join(os.path.expanduser("~"), ".claude", "run", "lint-status", f"{digest}.json")
+
+
+def write_status(root, files):
+    """Write the latest result of each file in root to its status file."""
+    path = status_path(root)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"root": root, "files": files}, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"lint_queue: failed to write {path}: {e}", file=sys.stderr)
+
+
+def lint_files(handler, files):
+    """Lint files without fixing them: {file: report lines}."""
+    existing = [path for path in files if os.path.exists(path)]
+    if not existing:
+        return {}
+    return post_edit.run_group(handler, existing, steps=(post_edit.CHECK,))
+
+
+class LintQueue:
+    """Files waiting to be linted, each linted once its edits settle."""
+
+    def __init__(self, delay=DEFAULT_DELAY, workers=DEFAULT_WORKERS, lint=lint_files):
+        self.delay = delay
+        self.workers = workers
+        self._lint = lint
+        self._cond = threading.Condition()
+        self._due = {}  # path -> monotonic time it may be linted
+        self._running = set()
+        self._active = 0
+        self._unseen = {}  # project root -> {path: report lines} not yet handed out
+        self._status = {}  # project root -> {path: latest result}
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        threading.Thread(target=self._schedule, daemon=True).start()
+
+    def submit(self, paths):
+        """Queue paths, pushing back the lint of any already waiting."""
+        with self._cond:
+            due = time.monotonic() + self.delay
+            for path in paths:
+                self._due[path] = due
+                # The file changed again: its last result is stale
+                self._unseen.get(project_root(path), {}).pop(path, None)
+            self._cond.notify_all()
+
+    def take(self, root):
+        """Results finished in root since the last take, oldest first."""
+        with self._cond:
+            results = self._unseen.pop(root, {})
+        return [{"file": path, "lines": lines} for path, lines in results.items()]
+
+    def idle(self):
+        with self._cond:
+            return not self._due and not self._running
+
+    def _schedule(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                waiting = {path: due for path, due in self._due.items() if path not in self._running}
+                ready = [path for path, due in waiting.items() if due <= now]
+                if ready and self._active < self.workers:
+                    self._dispatch(ready)
+                    continue
+                timeout = None
+                if self._active < self.workers and waiting:
+                    timeout = max(0, min(waiting.values()) - now)
+                self._cond.wait(timeout)
+
+    def _dispatch(self, ready):
+        # Called with the lock held: start one batch per free worker
+        groups = {}
+        for path in ready:
+            handler = post_edit.HANDLERS.get(os.path.splitext(path)[1].lower())
+            if handler not in post_edit.BATCH_HANDLERS:
+                del self._due[path]
+                continue
+            groups.setdefault((handler, project_root(path)), []).append(path)
+        for (handler, root), files in groups.items():
+            if self._active >= self.workers:
+                break
+            for path in files:
+                del self._due[path]
+            self._running.update(files)
+            self._active += 1
+            self._pool.submit(self._run, handler, root, files)
+
+    def _run(self, handler, root, files):
+        results = {}
+        try:
+            results = self._lint(handler, files)
+        except (OSError, ValueError) as e:
+            results = {path: [f"  ⚠️  lint failed: {e}"] for path in files}
+        finally:
+            # Free the worker even if the handler crashed
+            self._finish(root, files, results)
+
+    def _finish(self, root, files, results):
+        with self._cond:
+            self._active -= 1
+            self._running.difference_update(files)
+            status = self._status.setdefault(root, {})
+            for path in files:
+                if path not in results:
+                    status.pop(path, None)  # Deleted before it was linted
+                    continue
+                status[path] = {"lines": results[path], "finished": time.time()}
+                if path not in self._due:  # Not edited again while linting
+                    self._unseen.setdefault(root, {})[path] = results[path]
+            snapshot = dict(status)
+            self._cond.notify_all()
+        write_status(root, snapshot)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LintRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.last_activity = time.monotonic()
+        try:
+            payload = json.loads(self.rfile.read(MAX_MESSAGE))
+        except ValueError:
+            self.reply({"error": "invalid request"})
+            return
+
+        if payload.get("control") == "stop":
+            self.reply({"ok": True})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+            return
+        if isinstance(payload.get("take"), str):
+            self.reply({"results": server.queue.take(payload["take"])})
+            return
+
+        files = [path for path in payload.get("files", []) if isinstance(path, str) and os.path.isabs(path)]
+        if not files:
+            self.reply({"error": "files required"})
+            return
+        server.queue.submit(files)
+        self.reply({"ok": True, "queued": len(files)})
+
+    def reply(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8"))
+
+
+class LintServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, sock_path, queue):
+        super().__init__(str(sock_path), LintRequestHandler)
+        self.queue = queue
+        self.last_activity = time.monotonic()
+
+
+def watch_idle(server, idle_timeout):
+    while True:
+        time.sleep(min(idle_timeout, 5))
+        if time.monotonic() - server.last_activity >= idle_timeout and server.queue.idle():
+            server.shutdown()
+            return
+
+
+def serve(sock_path=None, idle_timeout=None, delay=None, workers=None):
+    """Run the server until idle or stopped. Returns a process exit code."""
+    sock_path = Path(sock_path or post_edit.lint_queue_socket())
+    if idle_timeout is None:
+        idle_timeout = parse_positive(os.environ.get("CLAUDE_LINT_QUEUE_IDLE"), DEFAULT_IDLE_TIMEOUT)
+    if delay is None:
+        delay = parse_positive(os.environ.get("CLAUDE_LINT_QUEUE_DELAY"), DEFAULT_DELAY)
+    if workers is None:
+        workers = parse_positive(os.environ.get("CLAUDE_LINT_QUEUE_WORKERS"), DEFAULT_WORKERS, int)
+
+    sock_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    with server_lock(sock_path) as acquired:
+        if not acquired:
+            return 0  # Another server is already running
+
+        # Holding the lock means any existing socket file is stale
+        try:
+            os.unlink(sock_path)
+        except FileNotFoundError:
+            pass
+        queue = LintQueue(delay=delay, workers=workers)
+        old_umask = os.umask(0o077)
+        try:
+            server = LintServer(sock_path, queue)
+        finally:
+            os.umask(old_umask)
+
+        threading.Thread(target=watch_idle, args=(server, idle_timeout), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            queue.shutdown()
+            try:
+                os.unlink(sock_path)
+            except FileNotFoundError:
+                pass
+    return 0
+
+
+def stop():
+    """Ask a running server to exit. Returns 0 if one acknowledged."""
+    reply = post_edit.request_socket(post_edit.lint_queue_socket(), {"control": "stop"})
+    return 0 if reply and reply.get("ok") else 1
+
+
+def main():
+    if not hasattr(socket, "AF_UNIX"):
+        print("lint_queue: Unix sockets not supported on this platform", file=sys.stderr)
+        return 1
+    if "--stop" in sys.argv[1:]:
+        return stop()
+    return serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Persistent mypy daemon (dmypy) for pre_commit.py's type check
+(CLAUDE_PRE_COMMIT_DMYPY=1).
+
+One daemon runs per project root. The first check starts it (`dmypy run`)
+and later commits and sessions reuse it: its status file lives in
+~/.claude/run/dmypy/<root hash>.json rather than in the project. The
+daemon exits after CLAUDE_DMYPY_IDLE seconds without a check (default
+1800, dmypy's --timeout).
+
+A daemon keeps the configuration and Python environment it started with,
+so both are recorded next to its status file: a hash of the mypy config
+files in the root, and the identity of the dmypy executable and of its
+environment's site-packages (whose mtime changes when packages are
+installed). When either changes the daemon is stopped and a new one
+started.
+
+The daemon keeps its state in memory (dmypy only reads a cache with
+--use-fine-grained-cache, which trusts it to hold every error). Cold runs
+in this mode use --cache-dir ~/.claude/cache/mypy/<repository hash>, keyed
+by the git common directory, so the worktrees of a repository share one
+incremental cache.
+
+check() returns None when the daemon cannot be used (dmypy is not
+installed, or it failed without reporting type errors); pre_commit then
+runs mypy cold.
+"""
+
+import hashlib
+import os
+import shutil
+
+CONFIG_FILES = ("mypy.ini", ".mypy.ini", "pyproject.toml", "setup.cfg")
+DEFAULT_IDLE = 1800
+STOP_TIMEOUT = 15
+
+
+def enabled():
+    return os.environ.get("CLAUDE_PRE_COMMIT_DMYPY") == "1"
+
+
+def idle_timeout():
+    try:
+        parsed = int(os.environ.get("CLAUDE_DMYPY_IDLE", DEFAULT_IDLE))
+    except ValueError:
+        return DEFAULT_IDLE
+    return parsed if parsed > 0 else DEFAULT_IDLE
+
+
+def digest(text):
+    return hashlib.sha256(text.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+
+
+def status_file(root):
+    """dmypy status file of the daemon for root."""
+    return os.path.join(os.path.expanduser("~"), ".claude", "run", "dmypy", f"{digest(root)}.json")
+
+
+def find_dmypy(root):
+    """The project's .venv dmypy, else the one on PATH, else None."""
+    local = os.path.join(root, ".venv", "bin", "dmypy")
+    if os.access(local, os.X_OK):
+        return local
+    return shutil.which("dmypy")
+
+
+def environment_identity(dmypy):
+    """Changes when dmypy is replaced or its environment's packages change."""
+    import glob
+
+    prefix = os.path.dirname(os.path.dirname(os.path.abspath(dmypy)))
+    parts = []
+    paths = [os.path.realpath(dmypy), os.path.join(prefix, "pyvenv.cfg")]
+    paths += sorted(glob.glob(os.path.join(prefix, "lib", "python*", "site-packages")))
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            parts.append((path, None))
+            continue
+        parts.append((path, st.st_mtime_ns, st.st_size))
+    return digest(repr(parts))
+
+
+def config_digest(root):
+    """Hash of the mypy config files in root."""
+    contents = hashlib.sha256()
+    for name in CONFIG_FILES:
+        try:
+            with open(os.path.join(root, name), "rb") as f:
+                contents.update(name.encode() + b"\0" + f.read() + b"\0")
+        except OSError:
+            continue
+    return contents.hexdigest()[:16]
+
+
+def cache_dir(root, run_command):
+    """mypy cache directory shared by the worktrees of root's repository."""
+    ok, output, _ = run_command(["git", "rev-parse", "--git-common-dir"], cwd=root)
+    common = os.path.realpath(os.path.join(root, output.strip())) if ok and output.strip() else root
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "mypy", digest(common))
+
+
+def strip_status(output):
+    """output without dmypy's own "Daemon started"/"Restarting: ..." lines."""
+    lines = output.splitlines(keepends=True)
+    return "".join(line for line in lines if not line.startswith(("Daemon ", "Restarting: ")))
+
+
+def reported(output):
+    """Whether mypy output is a verdict (type errors found) rather than a
+    daemon failure."""
+    return ": error:" in output or ": note:" in output or output.startswith("Found ")
+
+
+def check(root, targets, run_command, timeout=60):
+    """(success, stdout, stderr) of a daemon type check of targets in root,
+    or None when the daemon cannot be used."""
+    dmypy = find_dmypy(root)
+    if dmypy is None:
+        return None
+
+    status = status_file(root)
+    identity_path = os.path.splitext(status)[0] + ".identity"
+    identity = f"{config_digest(root)}:{environment_identity(dmypy)}"
+    try:
+        with open(identity_path, encoding="utf-8") as f:
+            recorded = f.read()
+    except OSError:
+        recorded = None
+    if recorded != identity:
+        if os.path.exists(status):
+            ok, _, _ = run_command([dmypy, "--status-file", status, "stop"], timeout=STOP_TIMEOUT, cwd=root)
+            if not ok:
+                run_command([dmypy, "--status-file", status, "kill"], timeout=STOP_TIMEOUT, cwd=root)
+        try:
+            os.makedirs(os.path.dirname(status), exist_ok=True)
+            with open(identity_path, "w", encoding="utf-8") as f:
+                f.write(identity)
+        except OSError:
+            return None
+
+    log_file = os.path.splitext(status)[0] + ".log"
+    success, output, error = run_command(
+        [dmypy, "--status-file", status, "run", "--timeout", str(idle_timeout()), "--log-file", log_file, "--", *targets],
+        timeout=timeout,
+        cwd=root,
+    )
+    output = strip_status(output)
+    if success or reported(output) or error == "Command timed out":
+        return success, output, error
+    # A stale or broken status file would fail every check: start afresh
+    try:
+        os.remove(status)
+    except OSError:
+        pass
+    return None
@@ -10,25 +10,59 @@ Automatically formats and checks files based on extension.
 Supported:
   - Python (.py, .pyi): ruff format + check
   - TypeScript/JavaScript (.ts, .tsx, .js, .jsx, .mjs, .mts): prettier + eslint
-  - Rust (.rs): cargo fmt + clippy
+  - Rust (.rs): rustfmt + clippy
   - Go (.go): gofmt + golangci-lint
 
+Formatters read the file on stdin and it is replaced (atomically) only when
+the formatted bytes differ, so already formatted files keep their mtime.
+
 Usage: Configured in hooks/hooks.json PostToolUse section (via plugin)
+       post_edit.py --batch [FILE ...]   # Many files at once; without FILE
+                                         # arguments, paths come from stdin (a
+                                         # hook payload, JSON list, or one per line)
 Environment variables (from Claude Code):
   - TOOL_USE: The tool that was used (Edit, Write, MultiEdit)
   - FILE_PATH: Path to the edited file
+
+Optional:
+  - CLAUDE_HOOK_TIMEOUT: Per-command timeout in seconds (default 60)
+  - CLAUDE_HOOK_FORMAT_SERVER=1: Run prettier/eslint through the warm
+    formatter server (format_server.py), starting it on demand
+  - CLAUDE_HOOK_CACHE=0: Always run handlers, even when the file, tools and
+    configs match the last run (result_cache.py)
+  - CLAUDE_HOOK_CACHE_SIZE: Maximum cached results (default 1000)
+  - CLAUDE_HOOK_LINT_QUEUE=1: Format synchronously and lint in the background
+    lint queue (lint_queue.py), which lints a file once its edits settle;
+    finished results are printed by the next run in the same project
+  - CLAUDE_HOOK_CARGO_TARGET_DIR: Target directory for clippy (default: one
+    per repository under ~/.claude/cache/cargo-target, shared by worktrees;
+    0 to use cargo's own). An explicit CARGO_TARGET_DIR always wins.
+  - CLAUDE_HOOK_METRICS=1: Record the wall time and exit status of every
+    command to ~/.claude/hook-metrics.jsonl (hook_metrics.py)
 """
 
+from __future__ import annotations
+
+# Runs as a fresh interpreter on every edit: only os/sys load up front so the
+# early exits in main() stay cheap; heavier modules are imported where used.
 import os
 import sys
-import subprocess
-import shutil
-import shlex
-import traceback
-from pathlib import Path
-from typing import Tuple, List, Union, Optional, Callable
-
-def parse_timeout(value: Optional[str], default: int = 60) -> int:
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable
+
+# Threads whose commands timed out or could not start: their results are not cached
+_incomplete: set[int] = set()
+
+# Thread -> name of the handler it is running, for hook_metrics records
+_handlers: dict[int, str] = {}
+
+# Whether this process already launched the formatter server
+_format_server_started = False
+
+
+def parse_timeout(value: str | None, default: int = 60) -> int:
     if value is None:
         return default
     try:
@@ -39,177 +73,788 @@ def parse_timeout(value: Optional[str], default: int = 60) -> int:
         return default
 
 
-TIMEOUT = parse_timeout(os.environ.get("CLAUDE_HOOK_TIMEOUT"), 60)
+def hook_timeout() -> int:
+    """Default command timeout from CLAUDE_HOOK_TIMEOUT."""
+    return parse_timeout(os.environ.get("CLAUDE_HOOK_TIMEOUT"), 60)
 
 
 def run_command(
-    cmd: Union[str, List[str]],
-    timeout: int = TIMEOUT,
-    cwd: Optional[str] = None,
-) -> Tuple[bool, str]:
-    """Run a command. Returns (success, output)."""
+    cmd: str | list[str],
+    timeout: int | None = None,
+    cwd: str | None = None,
+    env: dict[str, str] | None = None,
+    input: str | None = None,
+) -> tuple[bool, str]:
+    """Run a command, with env added to the environment. Returns (success, output).
+
+    With input, it is fed to the command's stdin and the output of a
+    successful run is its stdout exactly as printed (formatters reading
+    stdin print the formatted source there).
+    """
+    import shlex
+    import subprocess
+    import time
+
+    if timeout is None:
+        timeout = hook_timeout()
     cmd_list = shlex.split(cmd) if isinstance(cmd, str) else cmd
+    started = time.perf_counter()
+    returncode = None
+    timed_out = False
     try:
         result = subprocess.run(
             cmd_list,
             shell=False,
             capture_output=True,
-            text=True,
+            text=input is None,
+            input=None if input is None else input.encode("utf-8", "surrogateescape"),
             timeout=timeout,
             cwd=cwd,
+            env={**os.environ, **env} if env else None,
             check=False,
         )
-        output = result.stdout or result.stderr or ""
-        return result.returncode == 0, output.strip()
+        returncode = result.returncode
+        if input is not None:
+            # Bytes, so line endings and undecodable bytes come back unchanged
+            stdout = result.stdout.decode("utf-8", "surrogateescape")
+            if result.returncode == 0:
+                return True, stdout
+            parts = (part.decode("utf-8", "replace").strip() for part in (result.stdout, result.stderr))
+            return False, "\n".join(part for part in parts if part)
+        # Both streams: batch runs report some files on each (prettier lists
+        # formatted files on stdout and syntax errors on stderr)
+        output = "\n".join(part.strip() for part in (result.stdout, result.stderr) if part and part.strip())
+        return result.returncode == 0, output
     except subprocess.TimeoutExpired:
+        timed_out = True
+        _mark_incomplete()
         return False, "Command timed out"
     except FileNotFoundError:
+        _mark_incomplete()
         return False, f"Command not found: {cmd_list[0]}"
     except OSError as e:
+        _mark_incomplete()
         return False, f"OS error: {e}"
+    finally:
+        record_metric(cmd_list, time.perf_counter() - started, returncode, timed_out, cwd)
+
+
+def record_metric(
+    cmd: list[str], seconds: float, returncode: int | None, timed_out: bool, cwd: str | None
+) -> None:
+    # Checked before the import: hook_metrics compiles regexes when loaded
+    if os.environ.get("CLAUDE_HOOK_METRICS") != "1":
+        return
+    import threading
+
+    import hook_metrics
+
+    handler = _handlers.get(threading.get_ident())
+    hook_metrics.record("post_edit", handler, cmd, seconds, returncode, timed_out, cwd)
+
+
+def _mark_incomplete() -> None:
+    import threading
+
+    _incomplete.add(threading.get_ident())
+
+
+def find_tool(tool: str) -> str | None:
+    import shutil
+
+    return shutil.which(tool)
 
 
 def has_tool(tool: str) -> bool:
-    return shutil.which(tool) is not None
+    return find_tool(tool) is not None
+
+
+def resolve_cached(tool: str, root: str | None, bin_dir: str, fallback: str) -> list[str]:
+    """Resolve tool to an absolute command, cached in the project's profile (project_index.py).
+
+    Prefers the project's own bin_dir (nearest first, like npx), then PATH,
+    then the fallback runner (uvx/npx).
+    """
+    import project_index
+
+    cached = project_index.lookup(root, tool)
+    if cached is not None:
+        return cached
+
+    local = []
+    directory = os.path.abspath(root) if root else None
+    while directory:
+        local.append(os.path.join(directory, bin_dir, tool))
+        parent = os.path.dirname(directory)
+        directory = parent if parent != directory else None
 
+    command = next(([path] for path in local if os.access(path, os.X_OK)), [])
+    if not command and (path := find_tool(tool)):
+        command = [path]
+    if not command and (runner := find_tool(fallback)):
+        command = [runner, tool]
+    if command:
+        project_index.store(root, tool, command, [command[0], *local, *project_index.lockfiles(root)])
+    return command
 
-def resolve_tool(tool: str) -> List[str]:
-    """Resolve tool, falling back to uvx if available."""
-    if has_tool(tool):
-        return [tool]
-    if has_tool("uvx"):
-        return ["uvx", tool]
-    return []
 
+def resolve_tool(tool: str, root: str | None = None) -> list[str]:
+    """Resolve tool from the project's .venv or PATH, falling back to uvx if available."""
+    return resolve_cached(tool, root, os.path.join(".venv", "bin"), "uvx")
 
-def resolve_npm_tool(tool: str) -> List[str]:
-    """Resolve npm tool, falling back to npx."""
-    if has_tool(tool):
-        return [tool]
-    if has_tool("npx"):
-        return ["npx", tool]
-    return []
 
+def resolve_npm_tool(tool: str, root: str | None = None) -> list[str]:
+    """Resolve npm tool from node_modules/.bin or PATH, falling back to npx."""
+    return resolve_cached(tool, root, os.path.join("node_modules", ".bin"), "npx")
 
-def find_project_root(start: str) -> Optional[str]:
-    """Find project root by looking for common markers."""
-    markers = [".git", "pyproject.toml", "package.json", "Cargo.toml", "go.mod"]
-    path = Path(start).resolve()
-    for parent in [path] + list(path.parents):
-        if any((parent / marker).exists() for marker in markers):
-            return str(parent)
-    return None
+
+def run_npm_tool(
+    tool: str, args: list[str], timeout: int | None = None, root: str | None = None
+) -> tuple[bool, str] | None:
+    """Run an npm tool as a new process. Returns None when it is not installed."""
+    cmd = resolve_npm_tool(tool, root)
+    if not cmd:
+        return None
+    return run_command([*cmd, *args], timeout=timeout)
 
 
 # =============================================================================
-# Language handlers
+# Warm formatter server client (format_server.py)
 # =============================================================================
 
 
-def handle_python(filepath: str) -> None:
-    """Handle Python files with ruff."""
-    ruff = resolve_tool("ruff")
-    if not ruff:
-        print("  ⚠️  ruff not found")
+def format_server_enabled() -> bool:
+    return os.environ.get("CLAUDE_HOOK_FORMAT_SERVER") == "1"
+
+
+def format_server_socket() -> str:
+    """Unix socket the warm formatter server listens on."""
+    return os.path.join(os.path.expanduser("~"), ".claude", "run", "format-server.sock")
+
+
+def request_format_server(payload: dict, timeout: float = 5) -> dict | None:
+    """Send one request to the formatter server. Returns None if unreachable."""
+    return request_socket(format_server_socket(), payload, timeout)
+
+
+def request_socket(sock_path: str, payload: dict, timeout: float = 5) -> dict | None:
+    """Send one JSON request to a resident server. Returns None if unreachable."""
+    import json
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(sock_path)
+            sock.sendall(json.dumps(payload).encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        reply = json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+    return reply if isinstance(reply, dict) else None
+
+
+def start_format_server() -> None:
+    """Launch the formatter server in the background, at most once per
+    process (it is not up for the rest of a batch anyway); duplicates
+    started by other processes exit on their own."""
+    global _format_server_started
+    if _format_server_started:
         return
+    _format_server_started = True
+    start_server("format_server.py")
+
+
+def start_server(script: str) -> None:
+    """Launch a resident server script from this directory in the background."""
+    import subprocess
+
+    server = os.path.join(os.path.dirname(os.path.realpath(__file__)), script)
+    try:
+        subprocess.Popen(
+            [sys.executable, server],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print(f"post_edit: failed to start {script}: {e}", file=sys.stderr)
+
+
+def find_node_root(filepath: str) -> str:
+    """Nearest directory with a package.json, else the project root."""
+    path = os.path.dirname(os.path.abspath(filepath))
+    while True:
+        if os.path.exists(os.path.join(path, "package.json")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return find_project_root(filepath) or os.path.dirname(os.path.abspath(filepath))
+        path = parent
+
+
+def run_on_format_server(filepath: str, tools: list[str]) -> dict[str, tuple[bool, str, bool]]:
+    """Run node tools through the warm server: {tool: (success, output, changed)},
+    changed telling whether the tool rewrote the file.
+
+    Tools missing from the result (server unavailable, or the tool is not
+    installed in the project) are for the caller to run as processes.
+    """
+    if not format_server_enabled():
+        return {}
+    timeout = hook_timeout()
+    payload = {
+        "root": find_node_root(filepath),
+        "file": os.path.abspath(filepath),
+        "tools": tools,
+        "timeout": timeout,
+    }
+    reply = request_format_server(payload, timeout=timeout + 5)
+    if reply is None:
+        start_format_server()  # Ready for the next edit; this one falls back
+        return {}
+    return {
+        result["tool"]: (result.get("status") == "ok", result.get("output", ""), bool(result.get("changed")))
+        for result in reply.get("results", [])
+        if result.get("status") in ("ok", "failed")
+    }
+
 
-    ok, out = run_command([*ruff, "format", filepath])
+# =============================================================================
+# Background lint queue client (lint_queue.py)
+# =============================================================================
+
+
+def lint_queue_enabled() -> bool:
+    return os.environ.get("CLAUDE_HOOK_LINT_QUEUE") == "1"
+
+
+def lint_queue_socket() -> str:
+    """Unix socket the background lint queue listens on."""
+    return os.path.join(os.path.expanduser("~"), ".claude", "run", "lint-queue.sock")
+
+
+def queue_lint(files: list[str]) -> bool:
+    """Hand files to the background lint queue. False if it is unreachable."""
+    reply = request_socket(lint_queue_socket(), {"files": [os.path.abspath(path) for path in files]})
+    if reply is None or not reply.get("ok"):
+        start_server("lint_queue.py")  # Ready for the next edit; this one lints now
+        return False
+    return True
+
+
+def print_lint_results(files: list[str]) -> None:
+    """Print background lint results finished since the last hook run in
+    the projects of files."""
+    roots = dict.fromkeys(find_project_root(path) or os.path.dirname(os.path.abspath(path)) for path in files)
+    for root in roots:
+        reply = request_socket(lint_queue_socket(), {"take": root})
+        for result in (reply or {}).get("results", []):
+            print(f"\n🔍 {os.path.relpath(result['file'])} (background lint)")
+            print_report(result.get("lines") or ["  ✓ no lint issues"])
+
+
+def find_project_root(start: str) -> str | None:
+    """Find project root by looking for common markers (indexed by project_index.py)."""
+    import project_index
+
+    path = os.path.realpath(start)
+    return project_index.find_root(path if os.path.isdir(path) else os.path.dirname(path))
+
+
+def project_markers(root: str | None) -> list[str]:
+    """Project markers (Cargo.toml, go.mod, ...) present at root."""
+    if not root:
+        return []
+    import project_index
+
+    return project_index.profile(root)["markers"]
+
+
+# =============================================================================
+# Batch output helpers
+# =============================================================================
+
+
+def path_names(path: str, cwd: str | None = None) -> str:
+    """Regex alternation of the ways a tool may print path: as given,
+    absolute, or relative to its working directory."""
+    import re
+
+    absolute = os.path.abspath(path)
+    names = {path, absolute, os.path.relpath(absolute, cwd or os.getcwd())}
+    return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+def split_output(output: str, files: list[str], cwd: str | None = None) -> dict[str | None, list[str]]:
+    """Group output lines of a command run on files by the file they name.
+
+    Tools report a file as given, absolute, or relative to their working
+    directory, followed by ":" (a.py:3:1: ..., [error] a.ts: ...). Lines
+    naming none of the files are under None.
+    """
+    import re
+
+    patterns = [(path, re.compile(rf"(?<![\w./-])(?:{path_names(path, cwd)}):")) for path in files]
+
+    by_file: dict[str | None, list[str]] = {path: [] for path in files}
+    by_file[None] = []
+    for line in output.splitlines() if output else []:
+        owner = next((path for path, pattern in patterns if pattern.search(line)), None)
+        by_file[owner].append(line)
+    return by_file
+
+
+def failures(ok: bool, output: str, files: list[str], cwd: str | None = None) -> dict[str, list[str] | None]:
+    """Per-file failure output of a command run on files, None where it passed.
+
+    A failure naming none of the files (bad config, crash) fails all of them.
+    """
     if ok:
-        print("  ✓ formatted")
-    else:
-        print(f"  ⚠️  format failed: {out[:80] if out else 'Unknown error'}")
+        return dict.fromkeys(files)
+    lines = output.splitlines() if output else []
+    if len(files) == 1:
+        return {files[0]: lines}
+    by_file = split_output(output, files, cwd)
+    if not any(by_file[path] for path in files):
+        return {path: lines for path in files}
+    return {path: by_file[path] or None for path in files}
+
+
+def mentioned(output: str, files: list[str], cwd: str | None = None) -> set[str]:
+    """Files named anywhere in output (file lists, "Would reformat: a.py", "Diff in a.rs:1:")."""
+    import re
+
+    if not output:
+        return set()
+    return {path for path in files if re.search(rf"(?<![\w./-])(?:{path_names(path, cwd)})(?![\w/-])", output)}
+
+
+def replace_if_changed(path: str, original: str, formatted: str) -> bool:
+    """Atomically replace path's content (read as original) with formatted,
+    only if the bytes differ. Returns whether the file was rewritten.
+
+    Unchanged files keep their mtime, so incremental builds and file
+    watchers do not see an edit. Raises ValueError when the file changed
+    since original was read.
+    """
+    import tempfile
+
+    data = formatted.encode("utf-8", "surrogateescape")
+    if data == original.encode("utf-8", "surrogateescape"):
+        return False
+    target = os.path.realpath(path)  # Replace a symlink's target, not the link
+    with open(target, "rb") as f:
+        if f.read() != original.encode("utf-8", "surrogateescape"):
+            raise ValueError("file changed while formatting; left as is")
+    mode = os.stat(target).st_mode & 0o7777
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, mode)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return True
 
-    ok, out = run_command([*ruff, "check", "--fix", "--quiet", filepath])
+
+def format_via_stdin(
+    path: str, cmd: list[str], cwd: str | None = None, timeout: int | None = None
+) -> bool | list[str]:
+    """Pipe path through cmd, which prints the formatted source, and write the
+    result back only if it differs: True if rewritten, False if already
+    formatted, else the failure output."""
+    try:
+        with open(path, "rb") as f:
+            original = f.read().decode("utf-8", "surrogateescape")
+    except OSError as e:
+        return [f"cannot read file: {e}"]
+    ok, out = run_command(cmd, timeout=timeout, cwd=cwd, input=original)
     if not ok:
-        lines = out.strip().split("\n") if out else ["Linting failed"]
-        print(f"  ⚠️  Linting failed:")
-        for line in lines[:3]:
-            print(f"      {line}")
+        return out.splitlines()
+    if not out and original.strip():
+        return ["formatter printed nothing"]  # Never blank a file
+    try:
+        return replace_if_changed(path, original, out)
+    except (OSError, ValueError) as e:
+        return [str(e)]
 
 
-def handle_typescript(filepath: str) -> None:
+def format_files(
+    files: list[str],
+    check: list[str],
+    command: Callable[[str], list[str]],
+    cwd: str | None = None,
+    timeout: int | None = None,
+) -> dict[str, bool | list[str]]:
+    """Format files in place, rewriting only those whose formatted source
+    differs (format_via_stdin with command(path)).
+
+    For several files, check (a command listing the files it would change)
+    runs on all of them first, so only those it names are piped through
+    the formatter. Values as for format_via_stdin.
+    """
+    candidates = files
+    if len(files) > 1:
+        ok, out = run_command([*check, *files], timeout=timeout, cwd=cwd)
+        named = mentioned(out, files, cwd)
+        if not ok and not named:
+            # A failure naming no file (bad config, crash) fails all of them
+            return {path: out.splitlines() for path in files}
+        candidates = [path for path in files if path in named]
+    results: dict[str, bool | list[str]] = dict.fromkeys(files, False)
+    for path in candidates:
+        results[path] = format_via_stdin(path, command(path), cwd=cwd, timeout=timeout)
+    return results
+
+
+def format_line(outcome: bool | list[str], changed: str, unchanged: str, failed: str) -> str:
+    """Report line for a format_files outcome."""
+    if outcome is True:
+        return f"  ✓ {changed}"
+    if outcome is False:
+        return f"  ✓ {unchanged}"
+    return f"  ⚠️  {failed}: {first(outcome)}"
+
+
+def first(lines: list[str], width: int = 80) -> str:
+    return "\n".join(lines)[:width] or "Unknown error"
+
+
+def print_report(lines: list[str]) -> None:
+    for line in lines:
+        print(line)
+
+
+# =============================================================================
+# Language handlers
+#
+# Each *_batch function runs its tools once on files sharing a project root
+# and returns the report lines for every file; handle_* is the single-file form.
+# =============================================================================
+
+# Handler steps: formatting, linting with autofixes, and read-only linting
+# (for the background lint queue, which must not rewrite files being edited)
+FORMAT, LINT, CHECK = "format", "lint", "check"
+ALL_STEPS = (FORMAT, LINT)
+
+
+def python_batch(files: list[str], steps: tuple[str, ...] = ALL_STEPS) -> dict[str, list[str]]:
+    """Handle Python files with ruff."""
+    ruff = resolve_tool("ruff", find_project_root(files[0]))
+    if not ruff:
+        return {path: ["  ⚠️  ruff not found"] for path in files}
+    report: dict[str, list[str]] = {path: [] for path in files}
+
+    if FORMAT in steps:
+        formatted = format_files(
+            files, [*ruff, "format", "--check"], lambda path: [*ruff, "format", "--stdin-filename", path, "-"]
+        )
+        for path, outcome in formatted.items():
+            report[path].append(format_line(outcome, "formatted", "already formatted", "format failed"))
+
+    if LINT in steps or CHECK in steps:
+        fix = ["--fix"] if LINT in steps else []
+        # One diagnostic per line so each can be attributed to its file
+        concise = ["--output-format", "concise"] if len(files) > 1 else []
+        ok, out = run_command([*ruff, "check", *fix, "--quiet", *concise, *files])
+        for path, lines in failures(ok, out, files).items():
+            if lines is not None:
+                report[path].append("  ⚠️  Linting failed:")
+                report[path].extend(f"      {line}" for line in (lines or ["Linting failed"])[:3])
+    return report
+
+
+def typescript_batch(files: list[str], steps: tuple[str, ...] = ALL_STEPS) -> dict[str, list[str]]:
     """Handle TypeScript/JavaScript with prettier + eslint."""
-    prettier = resolve_npm_tool("prettier")
-    if prettier:
-        ok, out = run_command([*prettier, "--write", filepath], timeout=15)
-        if ok:
-            print("  ✓ prettier")
-        else:
-            print(
-                f"  ⚠️  prettier failed: {out.strip().splitlines()[0] if out else 'Unknown error'}"
-            )
-    else:
-        print("  ⚠️  prettier not found")
+    eslint_args = ["--fix"] if LINT in steps else [] if CHECK in steps else None
+    # The warm server always writes fixes, so read-only checks run as processes
+    served_tools = ["prettier"] if FORMAT in steps else []
+    if eslint_args:
+        served_tools.append("eslint")
+    served = {path: run_on_format_server(path, served_tools) if served_tools else {} for path in files}
+    report: dict[str, list[str]] = {path: [] for path in files}
+
+    if FORMAT in steps:
+        # path -> True if rewritten, False if already formatted, else failure output
+        formatted: dict[str, bool | list[str]] = {}
+        for path in files:
+            if "prettier" in served[path]:
+                ok, out, changed = served[path]["prettier"]
+                formatted[path] = changed if ok else out.strip().splitlines()
+        pending = [path for path in files if path not in formatted]
+        prettier = resolve_npm_tool("prettier", find_node_root(pending[0])) if pending else []
+        if prettier:
+            formatted.update(format_files(
+                pending, [*prettier, "--list-different"], lambda path: [*prettier, "--stdin-filepath", path], timeout=15
+            ))
+        for path in files:
+            if path not in formatted:
+                report[path].append("  ⚠️  prettier not found")
+            else:
+                report[path].append(format_line(formatted[path], "prettier", "prettier (already formatted)", "prettier failed"))
+
+    if eslint_args is None:
+        return report
+    # path -> None if eslint passed, else its failure output
+    outcome: dict[str, list[str] | None] = {}
+    for path in files:
+        if "eslint" in served[path]:
+            ok, out, _ = served[path]["eslint"]
+            outcome[path] = None if ok else out.strip().splitlines()
+    pending = [path for path in files if path not in outcome]
+    args = eslint_args
+    if len(pending) > 1:
+        # One problem per line (path:line:col: message) so each can be attributed
+        args = [*args, "--format", "unix"]
+    root = find_node_root(pending[0]) if pending else None
+    result = run_npm_tool("eslint", [*args, *pending], root=root) if pending else None
+    if result is not None:
+        outcome.update(failures(*result, pending))
 
-    eslint = resolve_npm_tool("eslint")
-    if eslint:
-        ok, out = run_command([*eslint, "--fix", filepath])
-        if ok:
-            print("  ✓ eslint")
+    for path in files:
+        if path not in outcome:
+            report[path].append("  ⚠️  eslint not found")
+        elif outcome[path] is None:
+            report[path].append("  ✓ eslint")
         else:
-            print(f"  ⚠️  eslint failed:")
-            lines = out.strip().split("\n") if out else ["Unknown error"]
-            for line in lines[:3]:
-                print(f"      {line}")
+            report[path].append("  ⚠️  eslint failed:")
+            report[path].extend(f"      {line}" for line in (outcome[path] or ["Unknown error"])[:3])
+    return report
+
+
+def git_checkout(path: str) -> tuple[str, str] | None:
+    """(worktree root, common git dir) of the repository containing path.
+
+    Linked worktrees share the common git dir with the main checkout.
+    """
+    scripts_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    if scripts_dir not in sys.path:
+        sys.path.append(scripts_dir)
+    from git_reader import common_git_dir, find_git_dir
+
+    root, git_dir = find_git_dir(path)
+    if not git_dir:
+        return None
+    return root, common_git_dir(git_dir)
+
+
+def cargo_target_dir(workspace_root: str) -> str | None:
+    """Target directory for clippy, shared by every worktree of the repository.
+
+    None leaves cargo's own choice: CARGO_TARGET_DIR is set, or
+    CLAUDE_HOOK_CARGO_TARGET_DIR=0.
+    """
+    configured = os.environ.get("CLAUDE_HOOK_CARGO_TARGET_DIR")
+    if configured == "0" or os.environ.get("CARGO_TARGET_DIR"):
+        return None
+    if configured:
+        return configured
+
+    import hashlib
+
+    workspace_root = os.path.realpath(workspace_root)
+    checkout = git_checkout(workspace_root)
+    if checkout:
+        worktree, common_dir = checkout
+        identity = f"{common_dir}\0{os.path.relpath(workspace_root, worktree)}"
     else:
-        print("  ⚠️  eslint not found")
+        identity = workspace_root
+    digest = hashlib.sha256(identity.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "cargo-target", digest)
 
 
-def handle_rust(filepath: str) -> None:
-    """Handle Rust files with cargo fmt + clippy."""
-    project_root = find_project_root(filepath)
-    if not project_root or not Path(project_root, "Cargo.toml").exists():
-        print("  ⚠️  No Cargo.toml found")
-        return
+def cargo_workspace(project_root: str) -> dict | None:
+    """{"root", "packages": [{"name", "dir", "edition"}]} from cargo metadata, cached
+    until a manifest changes."""
+    import json
+
+    import project_index
+
+    cached = project_index.lookup(project_root, "cargo-workspace")
+    if cached is not None:
+        return cached
+
+    ok, out = run_command(["cargo", "metadata", "--format-version", "1", "--no-deps"], cwd=project_root)
+    try:
+        metadata = json.loads(out.splitlines()[0]) if ok and out else None
+    except ValueError:
+        metadata = None
+    if not isinstance(metadata, dict) or "workspace_root" not in metadata:
+        return None
+
+    manifests = [package["manifest_path"] for package in metadata.get("packages", [])]
+    workspace = {
+        "root": metadata["workspace_root"],
+        "packages": [
+            {
+                "name": package["name"],
+                "dir": os.path.dirname(package["manifest_path"]),
+                "edition": package.get("edition", "2015"),
+            }
+            for package in metadata.get("packages", [])
+        ],
+    }
+    watched = [os.path.join(workspace["root"], "Cargo.toml"), *manifests]
+    project_index.store(project_root, "cargo-workspace", workspace, watched)
+    return workspace
+
+
+def owning_package(workspace: dict, filepath: str) -> dict | None:
+    """Workspace member whose directory most closely contains filepath."""
+    path = os.path.realpath(filepath)
+    owners = [
+        package for package in workspace["packages"]
+        if path.startswith(os.path.realpath(package["dir"]) + os.sep)
+    ]
+    return max(owners, key=lambda package: len(package["dir"]), default=None)
+
+
+def clippy_diagnostics(output: str, workspace_root: str) -> list[tuple[str, str, str]]:
+    """(absolute path, level, path:line:col: level: message) of each
+    diagnostic's primary span in clippy --message-format=json output."""
+    import json
+
+    diagnostics = []
+    for line in output.splitlines() if output else []:
+        if not line.startswith("{"):
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("reason") != "compiler-message":
+            continue
+        message = record.get("message") or {}
+        span = next((span for span in message.get("spans", []) if span.get("is_primary")), None)
+        if span is None:
+            continue
+        level = message.get("level", "warning")
+        diagnostics.append((
+            os.path.realpath(os.path.join(workspace_root, span["file_name"])),
+            level,
+            f"{span['file_name']}:{span['line_start']}:{span['column_start']}: {level}: {message.get('message', '')}",
+        ))
+    return diagnostics
+
+
+def rust_batch(files: list[str], steps: tuple[str, ...] = ALL_STEPS) -> dict[str, list[str]]:
+    """Handle Rust files with rustfmt + clippy on the crates that own them."""
+    project_root = find_project_root(files[0])
+    if "Cargo.toml" not in project_markers(project_root):
+        return {path: ["  ⚠️  No Cargo.toml found"] for path in files}
     if not has_tool("cargo"):
-        print("  ⚠️  cargo not found")
-        return
+        return {path: ["  ⚠️  cargo not found"] for path in files}
+    report: dict[str, list[str]] = {path: [] for path in files}
 
-    ok, out = run_command(["cargo", "fmt", "--", filepath], cwd=project_root)
-    if ok:
-        print("  ✓ cargo fmt")
-    else:
-        print(f"  ⚠️  fmt failed: {out[:80] if out else 'Unknown error'}")
+    workspace = cargo_workspace(project_root)
+    if FORMAT in steps and not has_tool("rustfmt"):
+        for path in files:
+            report[path].append("  ⚠️  rustfmt not found")
+    elif FORMAT in steps:
+        # rustfmt on just the edited files (cargo fmt would format whole crates),
+        # with the edition of the crate owning each
+        editions: dict[str, list[str]] = {}
+        for path in files:
+            owner = owning_package(workspace, path) if workspace else None
+            editions.setdefault(owner["edition"] if owner else "2015", []).append(path)
+        for edition, group in editions.items():
+            rustfmt = ["rustfmt", "--edition", edition, "--color", "never"]
+            formatted = format_files(group, [*rustfmt, "--check"], lambda path, rustfmt=rustfmt: [*rustfmt, "--emit", "stdout"], cwd=project_root)
+            for path, outcome in formatted.items():
+                report[path].append(format_line(outcome, "rustfmt", "rustfmt (already formatted)", "rustfmt failed"))
+    if LINT not in steps and CHECK not in steps:
+        return report
 
+    workspace_root = workspace["root"] if workspace else project_root
+    cmd = ["cargo", "clippy", "--message-format=json", "-q"]
+    owners = [owning_package(workspace, path) for path in files] if workspace else [None]
+    if None not in owners:
+        # Only the crates owning the files; tests/examples/benches need all targets
+        for name in dict.fromkeys(package["name"] for package in owners):
+            cmd += ["-p", name]
+        sources = [os.path.join(os.path.realpath(package["dir"]), "src") + os.sep for package in owners]
+        if not all(os.path.realpath(path).startswith(src) for path, src in zip(files, sources)):
+            cmd.append("--all-targets")
+    target_dir = cargo_target_dir(workspace_root)
     ok, out = run_command(
-        ["cargo", "clippy", "--message-format=short", "-q"],
+        cmd,
         cwd=project_root,
         timeout=60,
+        env={"CARGO_TARGET_DIR": target_dir} if target_dir else None,
     )
-    relevant = [l for l in out.split("\n") if filepath in l] if out else []
-    if relevant:
-        print(f"  ⚠️  {relevant[0]}")
-    elif not ok:
-        lines = out.strip().split("\n") if out else ["clippy failed"]
-        print(f"  ⚠️  {lines[0]}")
 
+    diagnostics = clippy_diagnostics(out, workspace_root)
+    for path in files:
+        real = os.path.realpath(path)
+        relevant = [text for owner, _, text in diagnostics if owner == real]
+        if relevant:
+            more = f" (+{len(relevant) - 1} more)" if len(relevant) > 1 else ""
+            report[path].append(f"  ⚠️  {relevant[0]}{more}")
+        elif not ok:
+            errors = [text for _, level, text in diagnostics if level == "error"]
+            other = [line for line in out.splitlines() if not line.startswith("{")] if out else []
+            report[path].append(f"  ⚠️  {(errors or other or ['clippy failed'])[0]}")
+    return report
 
-def handle_go(filepath: str) -> None:
+
+def go_batch(files: list[str], steps: tuple[str, ...] = ALL_STEPS) -> dict[str, list[str]]:
     """Handle Go files with gofmt + golangci-lint."""
-    if has_tool("gofmt"):
-        ok, out = run_command(["gofmt", "-w", filepath])
-        if ok:
-            print("  ✓ gofmt")
-        else:
-            print(f"  ⚠️  gofmt failed: {out[:80] if out else 'Unknown error'}")
-    elif has_tool("go"):
-        ok, out = run_command(["go", "fmt", filepath])
-        if ok:
-            print("  ✓ go fmt")
+    report: dict[str, list[str]] = {path: [] for path in files}
+    if FORMAT in steps:
+        if has_tool("gofmt"):
+            for path, outcome in format_files(files, ["gofmt", "-l"], lambda path: ["gofmt"]).items():
+                report[path].append(format_line(outcome, "gofmt", "gofmt (already formatted)", "gofmt failed"))
+        elif has_tool("go"):
+            # go fmt rewrites only the files it lists
+            ok, out = run_command(["go", "fmt", *files])
+            changed = mentioned(out, files)
+            for path, lines in failures(ok, out, files).items():
+                outcome = (path in changed) if lines is None else lines
+                report[path].append(format_line(outcome, "go fmt", "go fmt (already formatted)", "go fmt failed"))
         else:
-            print(f"  ⚠️  go fmt failed: {out[:80] if out else 'Unknown error'}")
-    else:
-        print("  ⚠️  gofmt/go not found")
+            for path in files:
+                report[path].append("  ⚠️  gofmt/go not found")
 
-    if has_tool("golangci-lint"):
-        project_root = find_project_root(filepath)
-        if project_root and Path(project_root, "go.mod").exists():
-            ok, out = run_command(
-                ["golangci-lint", "run", "--fast", filepath], cwd=project_root
-            )
-            if not ok:
-                lines = out.strip().split("\n") if out else ["golangci-lint failed"]
-                print(f"  ⚠️  {lines[0]}")
+    if (LINT in steps or CHECK in steps) and has_tool("golangci-lint"):
+        project_root = find_project_root(files[0])
+        if "go.mod" in project_markers(project_root):
+            ok, out = run_command(["golangci-lint", "run", "--fast", *files], cwd=project_root)
+            for path, lines in failures(ok, out, files, cwd=project_root).items():
+                if lines is not None:
+                    report[path].append(f"  ⚠️  {(lines or ['golangci-lint failed'])[0]}")
+    return report
+
+
+def handle_python(filepath: str) -> None:
+    """Handle Python files with ruff."""
+    print_report(python_batch([filepath])[filepath])
+
+
+def handle_typescript(filepath: str) -> None:
+    """Handle TypeScript/JavaScript with prettier + eslint."""
+    print_report(typescript_batch([filepath])[filepath])
+
+
+def handle_rust(filepath: str) -> None:
+    """Handle Rust files with rustfmt + clippy."""
+    print_report(rust_batch([filepath])[filepath])
+
+
+def handle_go(filepath: str) -> None:
+    """Handle Go files with gofmt + golangci-lint."""
+    print_report(go_batch([filepath])[filepath])
 
 
 # =============================================================================
@@ -229,31 +874,233 @@ HANDLERS: dict[str, Callable[[str], None]] = {
     ".go": handle_go,
 }
 
+# Handler -> its batch form
+BATCH_HANDLERS: dict[Callable[[str], None], Callable[[list[str]], dict[str, list[str]]]] = {
+    handle_python: python_batch,
+    handle_typescript: typescript_batch,
+    handle_rust: rust_batch,
+    handle_go: go_batch,
+}
 
-def main() -> None:
-    tool_use = os.environ.get("TOOL_USE", "")
-    file_path = os.environ.get("FILE_PATH", "")
 
-    # Warn on missing env vars (suggests misconfigured hook)
-    if not tool_use:
-        print("post_edit: WARNING - TOOL_USE not set", file=sys.stderr)
-        return
-    if tool_use not in ("Edit", "Write", "MultiEdit"):
-        return
-    if not file_path:
-        print("post_edit: WARNING - FILE_PATH not set", file=sys.stderr)
+# Config files that change handler results ("prefix*" matches by prefix)
+NODE_CONFIG_FILES = (
+    "package.json",
+    "tsconfig.json",
+    ".editorconfig",
+    ".prettierignore",
+    ".eslintignore",
+    ".prettierrc*",
+    "prettier.config.*",
+    ".eslintrc*",
+    "eslint.config.*",
+)
+
+# Handler -> (tools, config files) that its result depends on
+CACHE_INPUTS: dict[Callable[[str], None], tuple[tuple[str, ...], tuple[str, ...]]] = {
+    handle_python: (("ruff", "uvx"), ("pyproject.toml", "ruff.toml", ".ruff.toml")),
+    handle_typescript: (("prettier", "eslint", "npx", "node"), NODE_CONFIG_FILES),
+    handle_rust: (
+        ("cargo", "rustfmt", "cargo-clippy"),
+        ("Cargo.toml", "Cargo.lock", "rustfmt.toml", ".rustfmt.toml", "clippy.toml", ".clippy.toml"),
+    ),
+    handle_go: (("gofmt", "go", "golangci-lint"), ("go.mod", ".golangci*")),
+}
+
+# Handlers whose checks cover the whole project, not just the edited file
+PROJECT_WIDE: dict[Callable[[str], None], str] = {handle_rust: ".rs"}
+
+EDIT_TOOLS = ("Edit", "Write", "MultiEdit")
+
+
+def result_cache_enabled() -> bool:
+    return os.environ.get("CLAUDE_HOOK_CACHE") != "0"
+
+
+def run_group(
+    handler: Callable[[str], None], files: list[str], steps: tuple[str, ...] = ALL_STEPS
+) -> dict[str, list[str]]:
+    """Run steps of handler's batch form on files sharing a project root,
+    replaying the last report of files whose inputs did not change:
+    {file: report lines}."""
+    import threading
+
+    batch = BATCH_HANDLERS[handler]
+    _handlers[threading.get_ident()] = handler.__name__
+    inputs = CACHE_INPUTS.get(handler)
+    if inputs is None or not result_cache_enabled():
+        return batch(files, steps)
+
+    import sqlite3
+
+    import result_cache
+
+    tools, configs = inputs
+    root = find_project_root(files[0])
+    identity = result_cache.tool_identity(tools, root)
+    name = handler.__name__ if steps == ALL_STEPS else f"{handler.__name__}:{'+'.join(steps)}"
+
+    def cache_key(path: str, trees: dict) -> str:
+        context = identity + result_cache.config_digest(path, configs, root)
+        if handler in PROJECT_WIDE and root:
+            context += result_cache.tree_signature(root, PROJECT_WIDE[handler], exclude=path, memo=trees)
+        return result_cache.make_key(name, path, result_cache.file_digest(path), context)
+
+    try:
+        conn = result_cache.connect()
+        # One tree walk per phase: the run below changes the tree's mtimes
+        trees: dict = {}
+        cached = {path: result_cache.lookup(conn, cache_key(path, trees)) for path in files}
+    except sqlite3.Error as e:
+        print(f"post_edit: result cache unavailable: {e}", file=sys.stderr)
+        return batch(files, steps)
+
+    try:
+        report = {
+            path: [*output.splitlines(), "  ✓ unchanged since last run (cached)"]
+            for path, output in cached.items()
+            if output is not None
+        }
+        misses = [path for path in files if path not in report]
+        if not misses:
+            return report
+
+        thread = threading.get_ident()
+        _incomplete.discard(thread)
+        results = batch(misses, steps)
+        report.update(results)
+        if thread in _incomplete:
+            return report
+        try:
+            trees = {}
+            for path in misses:
+                output = "".join(f"{line}\n" for line in results[path])
+                result_cache.store(conn, cache_key(path, trees), path, output, handler=name)
+        except sqlite3.Error as e:
+            print(f"post_edit: failed to cache result: {e}", file=sys.stderr)
+        return report
+    finally:
+        conn.close()
+
+
+def run_files(handler: Callable[[str], None], files: list[str]) -> dict[str, list[str]]:
+    """run_group, leaving linting to the background queue when enabled
+    (CLAUDE_HOOK_LINT_QUEUE=1) so only formatting blocks the edit."""
+    if not lint_queue_enabled():
+        return run_group(handler, files)
+    report = run_group(handler, files, steps=(FORMAT,))
+    if queue_lint(files):
+        for path in files:
+            report[path].append("  ⏳ lint queued")
+    else:
+        for path, lines in run_group(handler, files, steps=(LINT,)).items():
+            report[path].extend(lines)
+    return report
+
+
+def run_handler(handler: Callable[[str], None], filepath: str) -> None:
+    """Run handler, replaying its last output if nothing it depends on changed."""
+    if handler not in BATCH_HANDLERS:
+        handler(filepath)
         return
-    if not os.path.exists(file_path):
-        return  # File may have been deleted, this is expected
+    print_report(run_files(handler, [filepath])[filepath])
+    if lint_queue_enabled():
+        print_lint_results([filepath])
+
+
+def run_batch(paths: list[str]) -> None:
+    """Format and check many files at once.
 
-    ext = Path(file_path).suffix.lower()
-    handler = HANDLERS.get(ext)
-    if not handler:
+    Files are grouped by handler and project root; each group runs its tools
+    once for all its files (ruff format a.py b.py ...), groups run in
+    parallel, and every file still gets its own report.
+    """
+    groups: dict[tuple[Callable[[str], None], str | None], list[str]] = {}
+    for path in dict.fromkeys(paths):
+        handler = HANDLERS.get(os.path.splitext(path)[1].lower())
+        if handler in BATCH_HANDLERS and os.path.exists(path):
+            groups.setdefault((handler, find_project_root(path)), []).append(path)
+    if not groups:
         return
 
-    print(f"\n🔧 {Path(file_path).name}")
+    from concurrent.futures import ThreadPoolExecutor
+
+    reports: dict[str, list[str]] = {}
+    with ThreadPoolExecutor(max_workers=min(len(groups), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(run_files, handler, files) for (handler, _), files in groups.items()]
+        for future in futures:
+            reports.update(future.result())
+
+    for path in dict.fromkeys(paths):
+        if path in reports:
+            print(f"\n🔧 {os.path.relpath(path)}")
+            print_report(reports[path])
+    if lint_queue_enabled():
+        print_lint_results(list(reports))
+    print()
+
+
+def paths_from_input(text: str) -> list[str]:
+    """Paths to batch from stdin: a hook payload, a JSON list, or one per line."""
+    import json
+
     try:
-        handler(file_path)
+        payload = json.loads(text)
+    except ValueError:
+        payload = None
+    if isinstance(payload, list):
+        return [path for path in payload if isinstance(path, str)]
+    if not isinstance(payload, dict):
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+    if payload.get("tool_name", "Edit") not in EDIT_TOOLS:
+        return []
+    paths = []
+    tool_input = payload.get("tool_input")
+    for source in (payload, tool_input if isinstance(tool_input, dict) else {}):
+        if isinstance(source.get("file_path"), str):
+            paths.append(source["file_path"])
+        if isinstance(source.get("file_paths"), list):
+            paths.extend(path for path in source["file_paths"] if isinstance(path, str))
+    return paths
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = argv or []
+    batch = None
+    if argv[:1] == ["--batch"]:
+        batch = argv[1:] or paths_from_input(sys.stdin.read())
+        if not batch:
+            return
+    else:
+        tool_use = os.environ.get("TOOL_USE", "")
+        file_path = os.environ.get("FILE_PATH", "")
+
+        # Warn on missing env vars (suggests misconfigured hook)
+        if not tool_use:
+            print("post_edit: WARNING - TOOL_USE not set", file=sys.stderr)
+            return
+        if tool_use not in EDIT_TOOLS:
+            return
+        if not file_path:
+            print("post_edit: WARNING - FILE_PATH not set", file=sys.stderr)
+            return
+        if not os.path.exists(file_path):
+            return  # File may have been deleted, this is expected
+
+        ext = os.path.splitext(file_path)[1].lower()
+        handler = HANDLERS.get(ext)
+        if not handler:
+            return
+
+    import subprocess
+
+    try:
+        if batch is not None:
+            run_batch(batch)
+            return
+        print(f"\n🔧 {os.path.basename(file_path)}")
+        run_handler(handler, file_path)
     except OSError as e:
         # File system error - don't block operations (exit code 2)
         print(f"  ⚠️  File system error: {e}", file=sys.stderr)
@@ -267,9 +1114,11 @@ def main() -> None:
 
 if __name__ == "__main__":
     try:
-        main()
+        main(sys.argv[1:])
     except Exception as e:
         # Catch-all for unexpected errors - don't block operations (exit code 2)
+        import traceback
+
         print(f"post_edit: Unexpected error ({type(e).__name__}): {e}", file=sys.stderr)
         print(f"post_edit: {traceback.format_exc()}", file=sys.stderr)
         sys.exit(2)
@@ -8,39 +8,131 @@ Pre-commit hook for Python projects.
 Ensures code quality before committing.
 
 Usage:
-  - As git pre-commit hook
+  - As git pre-commit hook, installed as a symlink (not a copy: it imports
+    post_edit.py, project_index.py, hook_metrics.py, secret_scan.py and
+    mypy_daemon.py from its own directory, and exits with instructions when
+    they are missing):
+      ln -sf /path/to/scripts/hooks/pre_commit.py .git/hooks/pre-commit
+
   - As Claude Code PreToolUse hook (matcher: "Bash" with git commit)
+
+Staged-only mode (pre_commit.py --staged, or CLAUDE_PRE_COMMIT_STAGED=1 for
+the git hook) checks just the Python files staged for commit: ruff and the
+secret scan read their staged content (checked out of the index into a
+temporary tree, with the project's config files), so results match what
+gets committed. mypy checks the staged paths in the working tree, where
+the modules they import live.
+
+The checks run concurrently, at most --jobs (CLAUDE_PRE_COMMIT_JOBS,
+default: CPUs) at a time. Each check's output is buffered and printed in
+the usual order. With --fail-fast (CLAUDE_PRE_COMMIT_FAIL_FAST=1), the
+first failing check cancels the rest: checks not yet started are skipped
+and the commands of running ones are killed.
+
+CLAUDE_PRE_COMMIT_DMYPY=1 checks types through a per-project mypy daemon,
+falling back to a cold mypy run (mypy_daemon.py).
+
+CLAUDE_HOOK_METRICS=1 records the timing of every command it runs
+(hook_metrics.py).
 """
 
+from __future__ import annotations
+
+# Runs as a fresh interpreter on every commit: modules only some checks need
+# (re, shlex, pathlib) are imported inside those checks.
 import os
-import re
 import sys
 import subprocess
 import shutil
-import shlex
-from pathlib import Path
-from typing import Tuple, List, Union
+import threading
+
+# Name of the check being run, for hook_metrics records: per check thread,
+# falling back to current_check
+current_check: str | None = None
+check_names: dict[int, str] = {}
+
+# Set by fail-fast once a check has failed: running commands are killed and
+# new ones are not started
+cancelled = threading.Event()
+_processes: set[subprocess.Popen] = set()
+_processes_lock = threading.Lock()
+
+# Staged-only mode, set by main: {"top": repository root, "tree": temporary
+# directory holding the staged content, "files": staged Python paths
+# relative to both, "blobs": {path: staged blob SHA}}
+staged: dict | None = None
 
+PYTHON_SUFFIXES = (".py", ".pyi")
+# Config files the checks read, checked out next to the staged files
+CONFIG_NAMES = ("pyproject.toml", "ruff.toml", ".ruff.toml", "setup.cfg", "mypy.ini", ".mypy.ini")
 
-def run_command(cmd: Union[str, List[str]], timeout: int = 30) -> Tuple[bool, str, str]:
+
+def run_command(
+    cmd: str | list[str], timeout: int = 30, cwd: str | None = None, input: str | None = None
+) -> tuple[bool, str, str]:
     """Run a command and return (success, stdout, stderr)."""
+    import shlex
+    import time
+
     cmd_list = shlex.split(cmd) if isinstance(cmd, str) else cmd
+    if cancelled.is_set():
+        return False, "", "Cancelled"
+    handler = check_names.get(threading.get_ident(), current_check)
+    started = time.perf_counter()
+    returncode = None
+    timed_out = False
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             cmd_list,
-            shell=False,
-            capture_output=True,
+            stdin=subprocess.PIPE if input is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout,
-            check=False,
+            cwd=cwd,
         )
-        return result.returncode == 0, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return False, "", "Command timed out"
+        with _processes_lock:
+            _processes.add(process)
+            if cancelled.is_set():
+                process.kill()
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            timed_out = True
+            return False, "", "Command timed out"
+        finally:
+            with _processes_lock:
+                _processes.discard(process)
+        returncode = process.returncode
+        if returncode != 0 and cancelled.is_set():
+            return False, "", "Cancelled"
+        return returncode == 0, stdout, stderr
     except FileNotFoundError:
         return False, "", f"Command not found: {cmd_list[0]}"
     except OSError as e:
         return False, "", f"OS error: {e}"
+    finally:
+        record_metric(handler, cmd_list, time.perf_counter() - started, returncode, timed_out, cwd)
+
+
+def record_metric(
+    handler: str | None, cmd: list[str], seconds: float, returncode: int | None, timed_out: bool, cwd: str | None
+) -> None:
+    # Checked before the import: hook_metrics compiles regexes when loaded
+    if os.environ.get("CLAUDE_HOOK_METRICS") != "1":
+        return
+    import hook_metrics
+
+    hook_metrics.record("pre_commit", handler, cmd, seconds, returncode, timed_out, cwd)
+
+
+def cancel_checks() -> None:
+    """Stop the running checks' commands, and any they would start."""
+    with _processes_lock:
+        cancelled.set()
+        for process in _processes:
+            process.kill()
 
 
 def check_tool(tool: str) -> bool:
@@ -48,23 +140,109 @@ def check_tool(tool: str) -> bool:
     return shutil.which(tool) is not None
 
 
-def resolve_tool(tool: str) -> List[str]:
-    """Resolve tool to command, falling back to uvx."""
-    if check_tool(tool):
-        return [tool]
-    if shutil.which("uvx"):
-        return ["uvx", tool]
-    return [tool]
+def project_profile() -> dict:
+    """Profile of the project being committed (project_index.py)."""
+    import project_index
+
+    cwd = os.getcwd()
+    return project_index.profile(project_index.find_root(cwd) or cwd)
+
+
+def resolve_tool(tool: str) -> list[str]:
+    """Resolve tool like post_edit does (project .venv, PATH, then uvx),
+    sharing its cached commands."""
+    import post_edit
+
+    return post_edit.resolve_tool(tool, project_profile()["root"]) or [tool]
+
+
+def positive_int(value: str | None, default: int) -> int:
+    try:
+        parsed = int(value) if value is not None else default
+    except ValueError:
+        return default
+    return parsed if parsed > 0 else default
+
+
+def parse_args(argv: list[str]):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="pre_commit.py", description="Python pre-commit checks.")
+    parser.add_argument("--staged", action="store_true", help="Check only the staged Python files")
+    parser.add_argument("--jobs", type=int, help="Checks run at once (default: CPUs)")
+    parser.add_argument("--fail-fast", action="store_true", help="Cancel the other checks once one fails")
+    args = parser.parse_args(argv)
+    args.staged = args.staged or os.environ.get("CLAUDE_PRE_COMMIT_STAGED") == "1"
+    args.fail_fast = args.fail_fast or os.environ.get("CLAUDE_PRE_COMMIT_FAIL_FAST") == "1"
+    if args.jobs is None or args.jobs < 1:
+        args.jobs = positive_int(os.environ.get("CLAUDE_PRE_COMMIT_JOBS"), os.cpu_count() or 1)
+    return args
+
+
+def split_z(output: str) -> list[str]:
+    return [path for path in output.split("\0") if path]
+
+
+def prepare_staged(tree: str) -> dict | None:
+    """Check the staged Python files and config files out of the index into
+    tree. Returns the staged-mode state, or None outside a repository."""
+    ok, top, error = run_command(["git", "rev-parse", "--show-toplevel"])
+    if not ok:
+        print(f"⚠️  Not a git repository, checking the whole tree: {error.strip()}")
+        return None
+    top = top.strip()
+
+    # Deleted files have nothing left to check. --raw: ":<old mode> <new
+    # mode> <old sha> <new sha> <status>", then the path
+    ok, output, error = run_command(
+        ["git", "diff", "--cached", "--raw", "--no-renames", "--no-abbrev", "-z", "--diff-filter=ACMR"], cwd=top
+    )
+    if not ok:
+        print(f"⚠️  Cannot list staged files, checking the whole tree: {error.strip()}")
+        return None
+    fields = split_z(output)
+    blobs = {
+        path: status.split()[3]
+        for status, path in zip(fields[::2], fields[1::2])
+        if path.endswith(PYTHON_SUFFIXES)
+    }
+    files = list(blobs)
+    if not files:
+        return {"top": top, "tree": tree, "files": [], "blobs": {}}
+
+    _, output, _ = run_command(["git", "ls-files", "-z", "--", *(f"*{name}" for name in CONFIG_NAMES)], cwd=top)
+    configs = [path for path in split_z(output) if os.path.basename(path) in CONFIG_NAMES]
+    paths = "\0".join([*files, *configs]) + "\0"
+    prefix = os.path.join(tree, "")
+    ok, _, error = run_command(["git", "checkout-index", "-z", "--stdin", f"--prefix={prefix}"], cwd=top, input=paths)
+    if not ok:
+        print(f"⚠️  Cannot read staged content, checking the whole tree: {error.strip()}")
+        return None
+    return {"top": top, "tree": tree, "files": files, "blobs": blobs}
+
+
+def ruff_targets() -> tuple[list[str], str | None]:
+    """(path arguments, working directory) for ruff: the staged content, or
+    the whole tree. Named files are only excluded with --force-exclude."""
+    if staged is not None:
+        return ["--force-exclude", *staged["files"]], staged["tree"]
+    return ["."], None
 
 
 def check_formatting() -> bool:
     """Check if all Python files are formatted."""
     print("🎨 Checking formatting...")
     ruff = resolve_tool("ruff")
-    success, output, _ = run_command([*ruff, "format", "--check", "."])
+    targets, cwd = ruff_targets()
+    success, output, _ = run_command([*ruff, "format", "--check", *targets], cwd=cwd)
 
     if not success:
-        print("❌ Formatting issues. Run: ruff format .")
+        if staged is not None:
+            print("❌ Formatting issues:")
+            print("\n".join(output.splitlines()[:20]))
+            print("\nRun: ruff format on these files and stage them again")
+        else:
+            print("❌ Formatting issues. Run: ruff format .")
         return False
 
     print("✅ Formatting OK")
@@ -75,12 +253,13 @@ def check_linting() -> bool:
     """Check for linting issues."""
     print("🔍 Running linter...")
     ruff = resolve_tool("ruff")
-    success, output, error = run_command([*ruff, "check", "."])
+    targets, cwd = ruff_targets()
+    success, output, error = run_command([*ruff, "check", *targets], cwd=cwd)
 
     if not success:
         print("❌ Linting issues:")
         print("\n".join((output or error).splitlines()[:20]))
-        print("\nRun: ruff check --fix .")
+        print("\nRun: ruff check --fix " + ("<files>, then stage them again" if staged is not None else "."))
         return False
 
     print("✅ Linting OK")
@@ -88,24 +267,41 @@ def check_linting() -> bool:
 
 
 def check_types() -> bool:
-    """Run type checking with mypy (optional)."""
-    if not check_tool("mypy"):
+    """Run type checking with mypy (optional), through the per-project
+    dmypy daemon with CLAUDE_PRE_COMMIT_DMYPY=1 (mypy_daemon.py)."""
+    import mypy_daemon
+
+    root = staged["top"] if staged is not None else os.getcwd()
+    daemon = mypy_daemon.enabled()
+    if not check_tool("mypy") and not (daemon and mypy_daemon.find_dmypy(root)):
         return True  # Skip if not available
 
     # Check if mypy is configured
-    has_config = any(
-        [
-            Path("mypy.ini").exists(),
-            Path("pyproject.toml").exists(),
-            Path("setup.cfg").exists(),
-        ]
+    profile = project_profile()
+    has_config = "pyproject.toml" in profile["markers"] or any(
+        name in profile["configs"] for name in ("mypy.ini", ".mypy.ini", "setup.cfg")
     )
 
     if not has_config:
         return True  # Skip if not configured
 
     print("📝 Checking types...")
-    success, output, error = run_command(["mypy", "."], timeout=60)
+    # Staged mode checks the working tree, where the modules the staged
+    # files import are
+    targets = staged["files"] if staged is not None else ["."]
+    cwd = staged["top"] if staged is not None else None
+    result = mypy_daemon.check(root, targets, run_command, timeout=60) if daemon else None
+    if result is not None:
+        success, output, error = result
+    elif daemon:
+        # Cold run with the cache shared across worktrees (and the daemon's
+        # mypy, when only the project's .venv has one)
+        dmypy = mypy_daemon.find_dmypy(root)
+        mypy = "mypy" if check_tool("mypy") or dmypy is None else os.path.join(os.path.dirname(dmypy), "mypy")
+        cache = ["--cache-dir", mypy_daemon.cache_dir(root, run_command)]
+        success, output, error = run_command([mypy, *cache, *targets], timeout=60, cwd=cwd)
+    else:
+        success, output, error = run_command(["mypy", *targets], timeout=60, cwd=cwd)
 
     if not success:
         # Ignore missing stubs
@@ -121,59 +317,75 @@ def check_types() -> bool:
     return True
 
 
+def git_python_files() -> list[tuple[str, str | None]] | None:
+    """(path, blob SHA) of the Python files git sees under the working
+    directory: tracked ones plus untracked ones not ignored. The SHA is the
+    index's unless the working copy differs (None: hash it when read).
+    None outside a repository."""
+    ok, output, _ = run_command(["git", "ls-files", "-s", "-z", "--", "*.py"])
+    if not ok:
+        return None
+    # "C" modified, "R" deleted (also listed as modified), "?" untracked
+    ok, changes, _ = run_command(
+        ["git", "ls-files", "-z", "-t", "--modified", "--deleted", "--others", "--exclude-standard", "--", "*.py"]
+    )
+    if not ok:
+        return None
+    changed = {}
+    for entry in split_z(changes):
+        tag, _, path = entry.partition(" ")
+        changed[path] = "deleted" if tag == "R" or changed.get(path) == "deleted" else tag
+
+    files = {}
+    for entry in split_z(output):
+        info, _, path = entry.partition("\t")
+        mode, sha, stage = info.split()
+        # Submodules and symlinks have no content of their own to scan;
+        # unmerged paths have one entry per stage
+        if mode not in ("100644", "100755"):
+            continue
+        files[path] = sha if stage == "0" and path not in changed else None
+    for path, tag in changed.items():
+        if tag == "deleted":
+            files.pop(path, None)
+        elif tag == "?":
+            files[path] = None
+    return list(files.items())
+
+
 def check_security() -> bool:
-    """Basic security checks for hardcoded secrets."""
+    """Basic security checks for hardcoded secrets (secret_scan.py)."""
+    from pathlib import Path
+
+    import secret_scan
+
     print("🔒 Security check...")
 
-    # Patterns to search for
-    patterns = [
-        (
-            re.compile(r"\b(api_key|apikey)\b\s*=\s*['\"][^'\"]+['\"]", re.IGNORECASE),
-            "API key",
-        ),
-        (
-            re.compile(r"\bpassword\b\s*=\s*['\"][^'\"]+['\"]", re.IGNORECASE),
-            "Password",
-        ),
-        (re.compile(r"\bsecret\b\s*=\s*['\"][^'\"]+['\"]", re.IGNORECASE), "Secret"),
-        (re.compile(r"\btoken\b\s*=\s*['\"][^'\"]+['\"]", re.IGNORECASE), "Token"),
-    ]
     ignore_dirs = {".git", ".venv", "venv", "node_modules", "dist", "build"}
-    safe_markers = {"example", "dummy", "fake", "mock", "sample"}
 
-    def is_safe_path(path: Path) -> bool:
-        parts = {part.lower() for part in path.parts}
-        if parts & {"tests", "test", "examples", "example", "fixtures"}:
-            return True
-        name = path.name.lower()
-        return name.startswith("test_") or name.endswith("_test.py")
+    def python_files():
+        """(path to report, path to read, blob SHA or None) of each file to scan."""
+        if staged is not None:
+            for name in staged["files"]:
+                if name.endswith(".py"):
+                    yield name, os.path.join(staged["tree"], name), staged["blobs"].get(name)
+            return
+        listed = git_python_files()
+        if listed is not None:
+            for name, sha in listed:
+                yield name, name, sha
+            return
+        for path in Path(".").rglob("*.py"):
+            if not any(part in ignore_dirs for part in path.parts):
+                yield str(path), str(path), None
 
     found_issues = []
 
-    for path in Path(".").rglob("*.py"):
-        if any(part in ignore_dirs for part in path.parts):
+    for path, _, hits, _, error in secret_scan.scan_cached(python_files()):
+        if error:
+            print(f"⚠️  Skipping unreadable file: {path} ({error})")
             continue
-        try:
-            content = path.read_text(encoding="utf-8", errors="ignore")
-        except OSError as e:
-            print(f"⚠️  Skipping unreadable file: {path} ({e})")
-            continue
-
-        lines = content.splitlines()
-        for pattern, _ in patterns:
-            hits = 0
-            for match in pattern.finditer(content):
-                line_no = content.count("\n", 0, match.start())
-                if line_no >= len(lines):
-                    continue
-                line = lines[line_no].strip()
-                lower = line.lower()
-                if is_safe_path(path) and any(marker in lower for marker in safe_markers):
-                    continue
-                found_issues.append(f"{path}:{line_no + 1}: {line[:100]}")
-                hits += 1
-                if hits >= 2:
-                    break
+        found_issues.extend(secret_scan.findings(path, hits))
 
     if found_issues:
         print("⚠️  Potential hardcoded secrets:")
@@ -187,9 +399,81 @@ def check_security() -> bool:
     return True
 
 
-def main() -> int:
+# Modules pre_commit imports from its own directory
+SIBLING_MODULES = ("post_edit", "project_index", "hook_metrics", "secret_scan", "mypy_daemon")
+
+
+def missing_siblings() -> list[str]:
+    """The sibling modules that cannot be found (pre_commit.py was copied)."""
+    from importlib.util import find_spec
+
+    return [name for name in SIBLING_MODULES if find_spec(name) is None]
+
+
+def main(argv: list[str] | None = None) -> int:
     """Main pre-commit hook."""
-    print("\n🐍 Python Pre-commit Check\n")
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    missing = missing_siblings()
+    if missing:
+        print(
+            f"pre_commit.py: cannot find {', '.join(f'{name}.py' for name in missing)} next to it. "
+            "Install the hook as a symlink to scripts/hooks/pre_commit.py, not a copy:\n"
+            "  ln -sf /path/to/scripts/hooks/pre_commit.py .git/hooks/pre-commit",
+            file=sys.stderr,
+        )
+        return 1
+    if not args.staged:
+        return run_checks(args.jobs, args.fail_fast)
+
+    import tempfile
+
+    global staged
+    with tempfile.TemporaryDirectory(prefix="pre-commit-staged-") as tree:
+        staged = prepare_staged(tree)
+        try:
+            if staged is not None and not staged["files"]:
+                print("\n🐍 Python Pre-commit Check\n")
+                print("✅ No staged Python files")
+                return 0
+            return run_checks(args.jobs, args.fail_fast)
+        finally:
+            staged = None
+
+
+class ThreadOutput:
+    """sys.stdout stand-in sending what each check thread prints to that
+    thread's buffer, and everything else to the real stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def write(self, text):
+        buffer = self.buffers.get(threading.get_ident())
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def run_check(name: str, check_func) -> bool:
+    """Run one check, counting an error as a failure."""
+    check_names[threading.get_ident()] = check_func.__name__
+    try:
+        return check_func()
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️  {name} error: {e}")
+        return False
+    finally:
+        del check_names[threading.get_ident()]
+
+
+def run_checks(jobs: int = 1, fail_fast: bool = False) -> int:
+    """Run every check, reporting the ones that failed."""
+    print("\n🐍 Python Pre-commit Check" + (" (staged files)" if staged is not None else "") + "\n")
 
     checks = [
         ("Formatting", check_formatting),
@@ -198,19 +482,29 @@ def main() -> int:
         ("Security", check_security),
     ]
 
-    failed = []
-    for name, check_func in checks:
-        try:
-            if not check_func():
-                failed.append(name)
-        except (OSError, subprocess.SubprocessError) as e:
-            print(f"⚠️  {name} error: {e}")
-            failed.append(name)
+    cancelled.clear()
+    try:
+        if jobs > 1:
+            outcomes = run_concurrently(checks, min(jobs, len(checks)), fail_fast)
+        else:
+            outcomes = []
+            for name, check_func in checks:
+                ok = None if cancelled.is_set() else run_check(name, check_func)
+                if ok is False and fail_fast:
+                    cancelled.set()
+                outcomes.append(ok)
+    finally:
+        cancelled.clear()
+
+    failed = [name for (name, _), ok in zip(checks, outcomes) if ok is False]
+    skipped = [name for (name, _), ok in zip(checks, outcomes) if ok is None]
 
     print("\n" + "=" * 40)
 
     if failed:
         print(f"❌ Failed: {', '.join(failed)}")
+        if skipped:
+            print(f"⏭️  Cancelled (fail-fast): {', '.join(skipped)}")
         print("Fix the issues and try again.")
         return 1
 
@@ -218,5 +512,48 @@ def main() -> int:
     return 0
 
 
+def run_concurrently(checks, jobs: int, fail_fast: bool) -> list[bool | None]:
+    """Run checks on jobs threads, printing each one's output in order as
+    soon as it and the checks before it are done. Returns each check's
+    result: None when fail-fast cancelled it."""
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+
+    output = ThreadOutput(sys.stdout)
+    lock = threading.Lock()
+
+    def task(name, check_func):
+        if cancelled.is_set():
+            return None, ""
+        buffer = io.StringIO()
+        output.buffers[threading.get_ident()] = buffer
+        try:
+            ok = run_check(name, check_func)
+        finally:
+            del output.buffers[threading.get_ident()]
+        if not ok:
+            with lock:
+                if cancelled.is_set():
+                    # Its commands were killed: the output is not a verdict
+                    return None, ""
+                if fail_fast:
+                    cancel_checks()
+        return ok, buffer.getvalue()
+
+    outcomes = []
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(task, name, check_func) for name, check_func in checks]
+            for future in futures:
+                ok, text = future.result()
+                output.stream.write(text)
+                output.stream.flush()
+                outcomes.append(ok)
+    finally:
+        sys.stdout = output.stream
+    return outcomes
+
+
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,278 @@
+"""
+Persistent project profiles for post_edit and pre_commit.
+
+~/.claude/cache/projects.json answers, with one file read:
+  - for a directory, its project root: the nearest directory holding one
+    of MARKERS. Valid while the mtimes of the directories from it up to
+    the root are unchanged (creating or removing a marker changes its
+    directory's mtime).
+  - for a project root, its profile: the markers and config files present,
+    with their (mtime, size), and the toolchains they imply. Refreshed when
+    any of those files appears, disappears or changes.
+  - values resolved for a project that cost a PATH search or a process to
+    learn: tool commands (prefers the project's node_modules/.bin and
+    .venv/bin, then PATH, then npx/uvx) and the crates of a cargo
+    workspace. Each is keyed by a hash of PATH and stored with the
+    (mtime, size) of the files it depended on (the binary, candidate
+    project-local binaries, lockfiles, manifests), and used only while
+    they are unchanged.
+
+Both maps are bounded (MAX_DIRS, MAX_PROJECTS), dropping the least
+recently refreshed entries first. Writers re-read the index and apply
+their change under an flock on projects.json.lock, so parallel sessions
+don't lose each other's updates.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+MARKERS = (".git", "pyproject.toml", "package.json", "Cargo.toml", "go.mod")
+
+# Config files recorded in a project's profile
+CONFIG_FILES = (
+    "setup.py",
+    "setup.cfg",
+    "requirements.txt",
+    "ruff.toml",
+    ".ruff.toml",
+    "mypy.ini",
+    ".mypy.ini",
+    "tsconfig.json",
+    "Cargo.lock",
+    "rustfmt.toml",
+    ".rustfmt.toml",
+    "clippy.toml",
+    ".clippy.toml",
+    ".golangci.yml",
+    ".golangci.yaml",
+    ".golangci.toml",
+)
+
+# Toolchain -> files at the project root that mean it is used
+TOOLCHAINS = {
+    "python": ("pyproject.toml", "setup.py", "setup.cfg", "requirements.txt"),
+    "node": ("package.json",),
+    "rust": ("Cargo.toml",),
+    "go": ("go.mod",),
+}
+
+LOCKFILES = (
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "pnpm-lock.yaml",
+    "yarn.lock",
+    "bun.lock",
+    "bun.lockb",
+    "uv.lock",
+    "poetry.lock",
+    "Pipfile.lock",
+    "pdm.lock",
+)
+
+MAX_DIRS = 2000
+MAX_PROJECTS = 500
+
+_lock = threading.Lock()
+_loaded = (None, None)  # (stamp of the index file, its contents)
+
+
+def cache_path():
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "projects.json")
+
+
+def stamp(paths):
+    """[path, mtime_ns, size] of each path, with None for missing ones."""
+    stamps = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            stamps.append([path, None, None])
+            continue
+        stamps.append([path, st.st_mtime_ns, st.st_size])
+    return stamps
+
+
+def fresh(entry):
+    return isinstance(entry, dict) and isinstance(entry.get("stamps"), list) and (
+        stamp(path for path, _, _ in entry["stamps"]) == entry["stamps"]
+    )
+
+
+def load():
+    """The index, re-read only when another process has rewritten it."""
+    global _loaded
+    path = cache_path()
+    signature = stamp([path])
+    if _loaded[0] == signature:
+        return _loaded[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+    if not isinstance(index, dict):
+        index = {}
+    index.setdefault("dirs", {})
+    index.setdefault("projects", {})
+    _loaded = (signature, index)
+    return index
+
+
+def save(index):
+    global _loaded
+    path = cache_path()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return
+    _loaded = (stamp([path]), index)
+
+
+@contextlib.contextmanager
+def _file_lock():
+    """Serialise read-modify-write of the index file between processes."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(f"{path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+    except OSError:
+        yield
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+
+def _put(entries, key, entry, limit):
+    """Set entries[key] as the most recently refreshed entry, evicting the
+    oldest beyond limit."""
+    entries.pop(key, None)
+    entries[key] = entry
+    while len(entries) > limit:
+        del entries[next(iter(entries))]
+
+
+def find_root(directory):
+    """Nearest directory from directory upwards holding a marker, or None."""
+    directory = os.path.abspath(directory)
+    with _lock:
+        index = load()
+        entry = index["dirs"].get(directory)
+        if fresh(entry):
+            return entry["root"]
+
+        walked = []
+        root = None
+        path = directory
+        while True:
+            walked.append(path)
+            if any(os.path.exists(os.path.join(path, marker)) for marker in MARKERS):
+                root = path
+                break
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+
+        entry = {"root": root, "stamps": stamp(walked)}
+        with _file_lock():
+            index = load()
+            _put(index["dirs"], directory, entry, MAX_DIRS)
+            save(index)
+        return root
+
+
+def _project(index, root):
+    """The index record for root, and whether its profile was refreshed
+    (the caller saves it then)."""
+    project = index["projects"].get(root or "")
+    if project is not None and (not root or fresh(project)):
+        return project, False
+
+    names = (*MARKERS, *CONFIG_FILES)
+    stamps = stamp(os.path.join(root, name) for name in names) if root else []
+    present = {os.path.basename(path): [mtime, size] for path, mtime, size in stamps if mtime is not None}
+    project = {
+        "markers": [name for name in MARKERS if name in present],
+        "configs": {name: present[name] for name in CONFIG_FILES if name in present},
+        "toolchains": [name for name, files in TOOLCHAINS.items() if any(f in present for f in files)],
+        "stamps": stamps,
+        # Values resolved with the old profile may no longer hold
+        "values": {},
+    }
+    return project, True
+
+
+def _save_project(root, project):
+    with _file_lock():
+        index = load()
+        _put(index["projects"], root or "", project, MAX_PROJECTS)
+        save(index)
+
+
+def profile(root):
+    """{"root", "markers", "configs", "toolchains"} of the project at root."""
+    with _lock:
+        index = load()
+        project, changed = _project(index, root)
+        if changed:
+            _save_project(root, project)
+    return {
+        "root": root,
+        "markers": project["markers"],
+        "configs": project["configs"],
+        "toolchains": project["toolchains"],
+    }
+
+
+def value_key(name):
+    path_hash = hashlib.sha256(os.environ.get("PATH", "").encode("utf-8", "surrogateescape")).hexdigest()
+    return f"{name}\0{path_hash[:16]}"
+
+
+def lockfiles(root):
+    return [os.path.join(root, name) for name in LOCKFILES] if root else []
+
+
+def lookup(root, name):
+    """Value cached for name in the project at root, or None if absent or stale."""
+    with _lock:
+        index = load()
+        project, changed = _project(index, root)
+        if changed:
+            _save_project(root, project)
+            return None
+        entry = project["values"].get(value_key(name))
+        return entry.get("value") if fresh(entry) else None
+
+
+def store(root, name, value, watched):
+    """Cache value for name in the project at root, valid while the watched
+    files are unchanged."""
+    entry = {"value": value, "stamps": stamp(watched)}
+    with _lock, _file_lock():
+        index = load()
+        project, changed = _project(index, root)
+        project["values"][value_key(name)] = entry
+        if changed:
+            _put(index["projects"], root or "", project, MAX_PROJECTS)
+        save(index)
@@ -0,0 +1,204 @@
+"""
+Persistent cache of post_edit results keyed by file content.
+
+After a handler runs, the file's content hash is stored together with the
+output the handler printed. When the file is edited again and ends up with
+exactly that content (an identical rewrite, or an edit to a file that was
+already formatted and lint-clean), post_edit replays the stored output
+instead of running the formatter and linter again.
+
+Keys also cover everything else the result depends on:
+  - the handler,
+  - the identity (resolved path, mtime, size) of each tool executable,
+    project .venv binary and project-installed npm package, which changes whenever a tool is
+    upgraded, without running `tool --version`,
+  - a hash of the config files from the file's directory up to its
+    project root,
+  - for project-wide checks, a signature of the project's other sources.
+
+Entries live in ~/.claude/cache/post-edit.sqlite, one per file and handler
+(steps run on their own, such as the lint queue's check, count as their own
+handler), and the least recently used ones are evicted beyond
+CLAUDE_HOOK_CACHE_SIZE entries (default 1000).
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+
+DEFAULT_MAX_ENTRIES = 1000
+
+# Bumped when the table changes; older tables are dropped (it is a cache)
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    handler TEXT NOT NULL,
+    output TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used);
+CREATE INDEX IF NOT EXISTS idx_results_path ON results(path, handler);
+"""
+
+
+def cache_path():
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "post-edit.sqlite")
+
+
+def max_entries():
+    try:
+        parsed = int(os.environ.get("CLAUDE_HOOK_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+    except ValueError:
+        return DEFAULT_MAX_ENTRIES
+    return parsed if parsed > 0 else DEFAULT_MAX_ENTRIES
+
+
+def connect(path=None):
+    path = path or cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript(
+            f"BEGIN IMMEDIATE; DROP TABLE IF EXISTS results; {SCHEMA}"
+            f"PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+        )
+    return conn
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def matches(name, patterns):
+    """Whether name is one of patterns ("name", or "prefix*" to match a prefix)."""
+    return any(name.startswith(p[:-1]) if p.endswith("*") else name == p for p in patterns)
+
+
+def config_digest(filepath, patterns, root=None):
+    """Hash of config files matching patterns ("name" or "prefix*") from the
+    file's directory up to root (or the filesystem root)."""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(filepath))
+    root = os.path.abspath(root) if root else None
+    while True:
+        try:
+            names = sorted(entry.name for entry in os.scandir(directory) if matches(entry.name, patterns))
+        except OSError:
+            names = []
+        for name in names:
+            config = os.path.join(directory, name)
+            try:
+                digest.update(f"{config}\0{file_digest(config)}\0".encode())
+            except OSError:
+                continue
+        parent = os.path.dirname(directory)
+        if directory == root or parent == directory:
+            return digest.hexdigest()
+        directory = parent
+
+
+def tool_identity(tools, root=None):
+    """(path, mtime, size) of each tool executable and project npm package."""
+    identity = []
+    for tool in tools:
+        candidates = [shutil.which(tool)]
+        if root:
+            candidates.append(os.path.join(root, ".venv", "bin", tool))
+            candidates.append(os.path.join(root, "node_modules", tool, "package.json"))
+        for candidate in candidates:
+            try:
+                real = os.path.realpath(candidate)
+                st = os.stat(real)
+            except (TypeError, OSError):
+                identity.append((tool, None))
+                continue
+            identity.append((tool, real, st.st_mtime_ns, st.st_size))
+    return repr(identity)
+
+
+def tree_mtimes(root, extension, skip_dirs):
+    """({path: mtime} of files with extension under root, the two newest
+    (path, mtime) pairs)."""
+    import heapq
+
+    mtimes = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in skip_dirs]
+        for name in filenames:
+            if not name.endswith(extension):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+    return mtimes, heapq.nlargest(2, mtimes.items(), key=lambda item: item[1])
+
+
+def tree_signature(root, extension, exclude=None, skip_dirs=("target", ".git", "node_modules"), memo=None):
+    """(count, newest mtime) of files with extension under root, except exclude.
+
+    Stands in for the rest of the project when a handler's result depends on
+    more than the edited file (clippy checks the whole crate). Pass the same
+    memo dict for the files of a batch to walk each tree once.
+    """
+    exclude = os.path.abspath(exclude) if exclude else None
+    key = (root, extension, skip_dirs)
+    snapshot = memo.get(key) if memo is not None else None
+    if snapshot is None:
+        snapshot = tree_mtimes(root, extension, skip_dirs)
+        if memo is not None:
+            memo[key] = snapshot
+    mtimes, newest = snapshot
+    count = len(mtimes) - (exclude in mtimes)
+    return f"{count}:{next((mtime for path, mtime in newest if path != exclude), 0)}"
+
+
+def make_key(handler_name, filepath, content_digest, context):
+    """Cache key for a handler run on filepath with the given content."""
+    raw = "\0".join((handler_name, os.path.abspath(filepath), content_digest, context))
+    return hashlib.sha256(raw.encode("utf-8", errors="surrogateescape")).hexdigest()
+
+
+def lookup(conn, key):
+    """Return the stored output for key (refreshing its LRU position), or None."""
+    row = conn.execute("SELECT output FROM results WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+    return row[0]
+
+
+def store(conn, key, filepath, output, limit=None, handler=""):
+    """Store output under key as the file's latest result for handler (the
+    name its key was made with), evicting least recently used entries over
+    limit."""
+    limit = limit or max_entries()
+    path = os.path.abspath(filepath)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Only the last outcome per file and handler can match again; other
+        # handlers (e.g. the format step vs. the queued lint) keep theirs
+        conn.execute("DELETE FROM results WHERE path = ? AND handler = ?", (path, handler))
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, path, handler, output, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, path, handler, output, time.time()),
+        )
+        conn.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (limit,),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Hardcoded secret scanner for pre_commit.py's security check.
+
+Every rule is one alternative of a single combined regex, so a file is
+scanned in one pass whatever the number of rules. Match offsets are turned
+into line numbers by bisecting a newline index, built only for files with
+a match. Files are scanned as bytes: read whole when small, through mmap
+from MMAP_THRESHOLD up, so large files are never copied into memory.
+Binary files (a NUL byte near the start) and minified files (average line
+length over MINIFIED_LINE_LENGTH near the start) are skipped.
+
+scan_paths() spreads files over a process pool once there are more than
+PARALLEL_THRESHOLD of them and more than one CPU.
+
+scan_cached() puts a persistent cache in front of it: results are stored
+in ~/.claude/cache/secret-scan.sqlite keyed by the file's git blob SHA and
+a hash of the ruleset, so a file is scanned once per content. Callers pass
+the SHAs git already knows (`git ls-files -s`); other files are hashed as
+they are read. The oldest entries are evicted beyond
+CLAUDE_SECRET_SCAN_CACHE_SIZE (default 500000); CLAUDE_HOOK_CACHE=0
+disables the cache.
+
+Usage:
+    secret_scan.py [--workers N] PATH...   # Print findings, exit 1 if any
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+# (name, pattern): name=value assignments of a quoted literal
+RULES = (
+    ("API key", r"\b(?:api_key|apikey)\b\s*=\s*['\"][^'\"]+['\"]"),
+    ("Password", r"\bpassword\b\s*=\s*['\"][^'\"]+['\"]"),
+    ("Secret", r"\bsecret\b\s*=\s*['\"][^'\"]+['\"]"),
+    ("Token", r"\btoken\b\s*=\s*['\"][^'\"]+['\"]"),
+)
+
+SAFE_DIRS = {"tests", "test", "examples", "example", "fixtures"}
+SAFE_MARKERS = ("example", "dummy", "fake", "mock", "sample")
+# Findings reported per rule and file
+MAX_HITS_PER_RULE = 2
+
+SNIFF_BYTES = 8192
+MINIFIED_LINE_LENGTH = 500
+MMAP_THRESHOLD = 1024 * 1024
+PARALLEL_THRESHOLD = 2000
+BATCH_SIZE = 256
+DEFAULT_CACHE_ENTRIES = 500000
+# SQLite's default limit on host parameters per statement
+QUERY_CHUNK = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    blob TEXT NOT NULL,
+    ruleset TEXT NOT NULL,
+    result TEXT NOT NULL,
+    scanned REAL NOT NULL,
+    PRIMARY KEY (blob, ruleset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scans_scanned ON scans(scanned);
+"""
+
+_pattern = None
+
+
+def combined_pattern():
+    """All RULES as one bytes regex, one named group (r<index>) per rule."""
+    global _pattern
+    if _pattern is None:
+        _pattern = re.compile(
+            "|".join(f"(?P<r{i}>{pattern})" for i, (_, pattern) in enumerate(RULES)).encode(),
+            re.IGNORECASE,
+        )
+    return _pattern
+
+
+def skip_reason(data):
+    """"binary" or "minified" for content not worth scanning, else None."""
+    sample = data[:SNIFF_BYTES]
+    if b"\0" in sample:
+        return "binary"
+    if len(sample) == SNIFF_BYTES and len(sample) / (sample.count(b"\n") + 1) > MINIFIED_LINE_LENGTH:
+        return "minified"
+    return None
+
+
+def scan_bytes(data):
+    """[(line number, rule name, stripped line)] of every match in data."""
+    import bisect
+
+    newlines = None
+    hits = []
+    for match in combined_pattern().finditer(data):
+        if newlines is None:
+            newlines = [m.start() for m in re.finditer(b"\n", data)]
+        line_no = bisect.bisect_left(newlines, match.start())
+        start = newlines[line_no - 1] + 1 if line_no else 0
+        end = newlines[line_no] if line_no < len(newlines) else len(data)
+        line = bytes(data[start:end]).decode("utf-8", "ignore").strip()
+        hits.append((line_no + 1, RULES[int(match.lastgroup[1:])][0], line))
+    return hits
+
+
+def blob_sha(data):
+    """The git blob SHA-1 of data, as `git hash-object` computes it."""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def scan_file(path, sha=None):
+    """(hits, skip reason, blob SHA) of one file, hashing it unless sha is
+    given; raises OSError when unreadable."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return [], None, sha or blob_sha(b"")
+        if size < MMAP_THRESHOLD:
+            data = f.read()
+        else:
+            import mmap
+
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            sha = sha or blob_sha(data)
+            reason = skip_reason(data)
+            return ([], reason, sha) if reason else (scan_bytes(data), None, sha)
+        finally:
+            if not isinstance(data, bytes):
+                data.close()
+
+
+def scan_batch(items):
+    """[(key, blob SHA, hits, skip reason, error)] for (key, path, blob SHA
+    or None) items."""
+    results = []
+    for key, path, sha in items:
+        try:
+            hits, reason, sha = scan_file(path, sha)
+        except OSError as e:
+            results.append((key, sha, [], None, str(e)))
+        else:
+            results.append((key, sha, hits, reason, None))
+    return results
+
+
+def default_workers():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def scan_paths(items, workers=None):
+    """Scan (key, path, blob SHA or None) items, in a process pool when
+    there are many.
+
+    Yields scan_batch() results in input order.
+    """
+    items = list(items)
+    workers = workers or default_workers()
+    if workers < 2 or len(items) <= PARALLEL_THRESHOLD:
+        yield from scan_batch(items)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for results in pool.map(scan_batch, batches):
+            yield from results
+
+
+def cache_enabled():
+    return os.environ.get("CLAUDE_HOOK_CACHE") != "0"
+
+
+def cache_path():
+    return os.path.join(os.path.expanduser("~"), ".claude", "cache", "secret-scan.sqlite")
+
+
+def max_cache_entries():
+    try:
+        parsed = int(os.environ.get("CLAUDE_SECRET_SCAN_CACHE_SIZE", DEFAULT_CACHE_ENTRIES))
+    except ValueError:
+        return DEFAULT_CACHE_ENTRIES
+    return parsed if parsed > 0 else DEFAULT_CACHE_ENTRIES
+
+
+def ruleset_digest():
+    """Hash of everything besides the content that decides a file's hits."""
+    raw = repr((RULES, SNIFF_BYTES, MINIFIED_LINE_LENGTH))
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def connect(path=None):
+    import sqlite3
+
+    path = path or cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def cached_results(conn, ruleset, shas):
+    """{blob SHA: (hits, skip reason)} of the shas scanned before."""
+    import json
+
+    shas = list(shas)
+    found = {}
+    for i in range(0, len(shas), QUERY_CHUNK):
+        chunk = shas[i:i + QUERY_CHUNK]
+        rows = conn.execute(
+            f"SELECT blob, result FROM scans WHERE ruleset = ? AND blob IN ({','.join('?' * len(chunk))})",
+            (ruleset, *chunk),
+        )
+        for blob, result in rows:
+            if not result:
+                found[blob] = ([], None)
+                continue
+            hits, reason = json.loads(result)
+            found[blob] = ([tuple(hit) for hit in hits], reason)
+    return found
+
+
+def store_results(conn, ruleset, results, limit=None):
+    """Store {blob SHA: (hits, skip reason)}, evicting the oldest entries
+    over limit."""
+    import json
+    import time
+
+    if not results:
+        return
+    limit = limit or max_cache_entries()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO scans (blob, ruleset, result, scanned) VALUES (?, ?, ?, ?)",
+            # Most files are clean: stored as "" to skip decoding them
+            ((sha, ruleset, json.dumps(result) if result != ([], None) else "", now)
+             for sha, result in results.items()),
+        )
+        conn.execute(
+            "DELETE FROM scans WHERE (blob, ruleset) IN "
+            "(SELECT blob, ruleset FROM scans ORDER BY scanned DESC LIMIT -1 OFFSET ?)",
+            (limit,),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def scan_cached(items, workers=None):
+    """scan_paths() results for (key, path, blob SHA or None) items, in
+    input order, scanning only blobs missing from the cache."""
+    import sqlite3
+
+    items = list(items)
+    if not cache_enabled():
+        return list(scan_paths(items, workers))
+
+    ruleset = ruleset_digest()
+    try:
+        conn = connect()
+    except (OSError, sqlite3.Error) as e:
+        print(f"secret_scan: cache unavailable ({e}), scanning everything", file=sys.stderr)
+        return list(scan_paths(items, workers))
+    try:
+        known = cached_results(conn, ruleset, {sha for _, _, sha in items if sha})
+        results = {}
+        missing = []
+        for key, path, sha in items:
+            if sha in known:
+                hits, reason = known[sha]
+                results[key] = (key, sha, hits, reason, None)
+            else:
+                missing.append((key, path, sha))
+
+        scanned = {}
+        for result in scan_paths(missing, workers):
+            key, sha, hits, reason, error = result
+            results[key] = result
+            if error is None:
+                scanned[sha] = (hits, reason)
+        store_results(conn, ruleset, scanned)
+    except sqlite3.Error as e:
+        print(f"secret_scan: cache error ({e}), scanning everything", file=sys.stderr)
+        return list(scan_paths(items, workers))
+    finally:
+        conn.close()
+    return [results[key] for key, _, _ in items]
+
+
+def is_safe_path(path):
+    """Test and example files, where placeholders are expected."""
+    parts = [part.lower() for part in path.replace(os.sep, "/").split("/")]
+    if SAFE_DIRS.intersection(parts):
+        return True
+    name = parts[-1]
+    return name.startswith("test_") or name.endswith("_test.py")
+
+
+def findings(path, hits):
+    """Report lines ("path:line: text") for the hits in path: placeholders in
+    test and example files are dropped, and each rule reports at most
+    MAX_HITS_PER_RULE lines."""
+    safe = is_safe_path(path)
+    counts = {}
+    lines = []
+    for line_no, rule, line in hits:
+        if safe and any(marker in line.lower() for marker in SAFE_MARKERS):
+            continue
+        if counts.get(rule, 0) >= MAX_HITS_PER_RULE:
+            continue
+        counts[rule] = counts.get(rule, 0) + 1
+        lines.append(f"{path}:{line_no}: {line[:100]}")
+    return lines
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="secret_scan.py", description="Scan files for hardcoded secrets.")
+    parser.add_argument("--workers", type=int, help="Scanner processes (default: CPUs)")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    found = False
+    for path, _, hits, _, error in scan_cached(((p, p, None) for p in args.paths), args.workers):
+        if error:
+            print(f"{path}: {error}", file=sys.stderr)
+        for line in findings(path, hits):
+            print(line)
+            found = True
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: git_reader.read_git_info vs. the git subprocess path.
+
+Usage: python3 tests/benchmarks/bench_git_reader.py [REPO_DIR] [ITERATIONS]
+
+Defaults to this repository and 200 iterations. Prints mean per-call time
+for each path and the time saved per audit_logger invocation.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from audit_logger import run_command
+from git_reader import read_git_info
+
+
+def subprocess_git_info(cwd):
+    """The pre-reader get_git_info sequence: three git processes."""
+    root = run_command(["git", "rev-parse", "--show-toplevel"], cwd)
+    branch = run_command(["git", "branch", "--show-current"], cwd)
+    commit = run_command(["git", "rev-parse", "--short", "HEAD"], cwd)
+    return root, branch, commit
+
+
+def measure(func, cwd, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(cwd)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    cwd = sys.argv[1] if len(sys.argv) > 1 else str(REPO_ROOT)
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    if not read_git_info(cwd):
+        print(f"Not a supported git repository: {cwd}")
+        return 1
+
+    reader = measure(read_git_info, cwd, iterations)
+    spawn = measure(subprocess_git_info, cwd, max(1, iterations // 10))
+
+    print(f"Repository:        {cwd}")
+    print(f"git_reader:        {reader * 1000:8.3f} ms/call")
+    print(f"git subprocesses:  {spawn * 1000:8.3f} ms/call")
+    print(f"Saved per call:    {(spawn - reader) * 1000:8.3f} ms ({spawn / reader:.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
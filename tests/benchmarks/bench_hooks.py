@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end latency of the Python hooks as real processes.
+
+Usage: python3 tests/benchmarks/bench_hooks.py [--sizes 10,1000] [--runs 5]
+           [--delay TOOL=MS ...] [--check | --save-baseline] [--json]
+
+For each size, generates a repository of that many files (Python packages
+of 100 modules, plus one TypeScript and one Rust file, with pyproject.toml,
+package.json, Cargo.toml and a hand-written .git) and runs, each as a fresh
+interpreter with HOME in a scratch directory:
+
+    post_edit.py   - an Edit of a .py, a .ts and a .rs file
+    pre_commit.py  - the full check in the repository root
+    audit_logger.py - a PreToolUse Bash payload
+
+PATH holds only stub ruff/prettier/eslint/cargo/rustfmt/mypy/git scripts, each
+appending its command line to a log (the subprocess count) and sleeping
+for its --delay (default 0 ms), so timings measure the hooks, not the
+tools (formatters given stdin print it back; `git ls-files` lists every
+Python file as untracked, so the security check reads them all). "cold"
+is the median of --runs runs each with an empty HOME (no project index,
+result or git caches); "warm" is the median of --runs further runs in the
+last of those HOMEs, each after editing the file so the result cache misses.
+
+--save-baseline stores the results in tests/benchmarks/baseline.json and
+--check compares against it, exiting 1 on a regression: a higher
+subprocess count, or a latency over the baseline by more than --tolerance
+(default 50%) plus --slack-ms (default 30 ms). Baseline latencies are
+scaled by the ratio of this machine's bare interpreter start-up time to
+the one recorded with them, so a baseline saved elsewhere stays usable.
+100k-file repositories take a while to generate: --sizes 10,1000,100000.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+SCRIPTS = REPO_ROOT / "scripts"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+STUB_TOOLS = ("ruff", "prettier", "eslint", "cargo", "rustfmt", "mypy", "git")
+MODULES_PER_PACKAGE = 100
+
+STUB = """#!/bin/sh
+echo "${{0##*/}} $*" >> "$BENCH_STUB_LOG"
+{sleep}case " $* " in
+    # Formatting stdin: print it back unchanged
+    *" - "* | *" --stdin-filepath "* | *" --emit stdout "*) exec {cat} ;;
+esac
+case "${{0##*/}} $1" in
+    "cargo metadata")
+        printf '{{"packages":[{{"name":"bench","manifest_path":"%s/Cargo.toml"}}],"workspace_root":"%s"}}\\n' \\
+            "$PWD" "$PWD" ;;
+    "git rev-parse") pwd ;;
+    # Every Python file as untracked: the security check hashes and scans all
+    "git ls-files") case " $* " in *" --others "*)
+        {find} . -name '*.py' -not -path './.git/*' | {sed} 's|^\\./|? |' | {tr} '\\n' '\\0' ;; esac ;;
+esac
+exit 0
+"""
+
+
+def write_stubs(bin_dir, delays):
+    sleep = shutil.which("sleep") or "/bin/sleep"
+    utilities = {name: shutil.which(name) or f"/usr/bin/{name}" for name in ("cat", "find", "sed", "tr")}
+    bin_dir.mkdir(parents=True)
+    for tool in STUB_TOOLS:
+        delay = delays.get(tool, 0)
+        stub = bin_dir / tool
+        stub.write_text(STUB.format(sleep=f"{sleep} {delay / 1000:.3f}\n" if delay else "", **utilities))
+        stub.chmod(0o755)
+
+
+def generate_repo(root, size):
+    """A repository of size files; returns the files the edit scenarios touch."""
+    root.mkdir(parents=True)
+    (root / "pyproject.toml").write_text('[project]\nname = "bench"\n\n[tool.mypy]\n')
+    (root / "package.json").write_text('{"name": "bench", "private": true}\n')
+    (root / "Cargo.toml").write_text('[package]\nname = "bench"\nversion = "0.1.0"\nedition = "2021"\n')
+    git_dir = root / ".git"
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "objects").mkdir()
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "refs" / "heads" / "main").write_text("0123456789abcdef0123456789abcdef01234567\n")
+
+    rust = root / "src" / "lib.rs"
+    rust.parent.mkdir()
+    rust.write_text("pub fn answer() -> u32 {\n    42\n}\n")
+    typescript = root / "web" / "app.ts"
+    typescript.parent.mkdir()
+    typescript.write_text("export const answer = 42;\n")
+
+    for i in range(max(1, size - 2)):
+        package = root / "pkg" / f"p{i // MODULES_PER_PACKAGE:04d}"
+        if i % MODULES_PER_PACKAGE == 0:
+            package.mkdir(parents=True)
+        (package / f"mod_{i % MODULES_PER_PACKAGE}.py").write_text(f'"""Module {i}."""\n\nVALUE = {i}\n')
+    return {"py": root / "pkg" / "p0000" / "mod_0.py", "ts": typescript, "rs": rust}
+
+
+def scenarios(root, files):
+    """name -> (script, extra environment, stdin, file edited before each run)."""
+    payload = json.dumps({
+        "session_id": "bench",
+        "cwd": str(root),
+        "tool_name": "Bash",
+        "tool_input": {"command": "ls -la"},
+    })
+    edits = {
+        f"post_edit.{kind}": (SCRIPTS / "hooks" / "post_edit.py", {"TOOL_USE": "Edit", "FILE_PATH": str(path)}, "", path)
+        for kind, path in files.items()
+    }
+    return {
+        **edits,
+        "pre_commit": (SCRIPTS / "hooks" / "pre_commit.py", {}, "", None),
+        "audit_logger": (SCRIPTS / "audit_logger.py", {}, payload, None),
+    }
+
+
+def hook_env(home, bin_dir, log):
+    # Only the stubs on PATH, and none of the hooks' opt-in modes
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("CLAUDE_", "CARGO_"))}
+    env.update({"HOME": str(home), "PATH": str(bin_dir), "BENCH_STUB_LOG": str(log)})
+    return env
+
+
+def run_once(script, env, stdin, cwd, log):
+    """(wall ms, subprocesses started) of one hook run."""
+    log.write_text("")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(script)], input=stdin, env=env, cwd=cwd,
+        capture_output=True, text=True, timeout=600, check=False,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode not in (0, 1):
+        raise RuntimeError(f"{script.name} exited {result.returncode}: {result.stderr.strip()}")
+    return elapsed, len(log.read_text().splitlines())
+
+
+def measure(name, scenario, root, work, bin_dir, runs):
+    script, extra, stdin, edited = scenario
+    log = work / "stub.log"
+    cold = []
+    for i in range(runs):
+        home = work / f"home-{name}-{i}"
+        home.mkdir()
+        env = {**hook_env(home, bin_dir, log), **extra}
+        cold.append(run_once(script, env, stdin, root, log))
+
+    warm = []
+    for i in range(runs):
+        if edited is not None:
+            with open(edited, "a", encoding="utf-8") as f:
+                f.write(f"// {i}\n" if edited.suffix in (".ts", ".rs") else f"# {i}\n")
+        warm.append(run_once(script, env, stdin, root, log))
+    return {
+        "cold_ms": round(statistics.median(ms for ms, _ in cold), 1),
+        "warm_ms": round(statistics.median(ms for ms, _ in warm), 1),
+        "cold_subprocesses": max(procs for _, procs in cold),
+        "warm_subprocesses": max(procs for _, procs in warm),
+    }
+
+
+def interpreter_startup(runs=10):
+    """Median ms to start and exit a bare interpreter, for scaling baselines."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(times), 2)
+
+
+def run_benchmarks(sizes, runs, delays):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-hooks-") as tmp:
+        work = Path(tmp)
+        bin_dir = work / "bin"
+        write_stubs(bin_dir, delays)
+        for size in sizes:
+            root = work / f"repo-{size}"
+            files = generate_repo(root, size)
+            for name, scenario in scenarios(root, files).items():
+                results[f"{name}/{size}"] = measure(f"{name}-{size}", scenario, root, work, bin_dir, runs)
+    return results
+
+
+def regressions(results, baseline, startup, tolerance, slack_ms):
+    """Descriptions of results worse than the baseline."""
+    scale = startup / baseline["startup_ms"] if baseline.get("startup_ms") else 1.0
+    found = []
+    for key, result in results.items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        for phase in ("cold", "warm"):
+            procs, base_procs = result[f"{phase}_subprocesses"], base[f"{phase}_subprocesses"]
+            if procs > base_procs:
+                found.append(f"{key}: {phase} subprocesses {base_procs} -> {procs}")
+            limit = base[f"{phase}_ms"] * scale * (1 + tolerance) + slack_ms
+            if result[f"{phase}_ms"] > limit:
+                found.append(f"{key}: {phase} {result[f'{phase}_ms']:.1f} ms > {limit:.1f} ms "
+                             f"(baseline {base[f'{phase}_ms']:.1f} ms)")
+    return found
+
+
+def format_results(results):
+    lines = [f"{'scenario':<22} {'cold ms':>9} {'warm ms':>9} {'procs':>7}"]
+    for key, result in results.items():
+        procs = f"{result['cold_subprocesses']}/{result['warm_subprocesses']}"
+        lines.append(f"{key:<22} {result['cold_ms']:>9.1f} {result['warm_ms']:>9.1f} {procs:>7}")
+    return "\n".join(lines)
+
+
+def parse_delays(values):
+    delays = {}
+    for value in values:
+        tool, _, ms = value.partition("=")
+        if tool not in STUB_TOOLS or not ms.isdigit():
+            raise argparse.ArgumentTypeError(f"invalid --delay {value!r} (expected TOOL=MS, TOOL one of {STUB_TOOLS})")
+        delays[tool] = int(ms)
+    return delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end hook latency benchmark.")
+    parser.add_argument("--sizes", default="10,1000", help="Comma-separated repository sizes in files")
+    parser.add_argument("--runs", type=int, default=5, help="Warm runs per scenario (default 5)")
+    parser.add_argument("--delay", action="append", default=[], metavar="TOOL=MS", help="Stub tool delay")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="Exit 1 on a regression from the baseline")
+    mode.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE.name}")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown ratio (default 0.5)")
+    parser.add_argument("--slack-ms", type=float, default=30, help="Allowed slowdown in ms (default 30)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        delays = parse_delays(args.delay)
+        sizes = [int(size) for size in args.sizes.split(",")]
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    startup = interpreter_startup()
+    results = run_benchmarks(sizes, max(1, args.runs), delays)
+    if args.json:
+        print(json.dumps({"startup_ms": startup, "delays": delays, "results": results}, indent=2))
+    else:
+        print(f"Interpreter start-up: {startup:.1f} ms   (procs = subprocesses cold/warm)")
+        print(format_results(results))
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps({"startup_ms": startup, "delays": delays, "results": results}, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE}")
+    elif args.check:
+        try:
+            baseline = json.loads(BASELINE.read_text())
+        except (OSError, ValueError) as e:
+            print(f"No usable baseline ({e}); run with --save-baseline")
+            return 1
+        if baseline.get("delays", {}) != delays:
+            print("Baseline was recorded with different --delay values; not comparing")
+            return 1
+        found = regressions(results, baseline, startup, args.tolerance, args.slack_ms)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print("No regressions from baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
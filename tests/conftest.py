@@ -2,6 +2,7 @@
 
 import json
 import os
+import subprocess
 import sys
 from pathlib import Path
 
@@ -90,3 +91,40 @@ def go_file(tmp_path):
     go_file = go_dir / "main.go"
     go_file.write_text("package main\n")
     return go_file
+
+
+
+@pytest.fixture
+def git(tmp_path):
+    """Return a helper that runs git with a fixed identity (default cwd: repo)."""
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "Test",
+        "GIT_AUTHOR_EMAIL": "test@example.com",
+        "GIT_COMMITTER_NAME": "Test",
+        "GIT_COMMITTER_EMAIL": "test@example.com",
+    }
+
+    def run(*args, cwd=None):
+        return subprocess.run(
+            ["git", *args],
+            cwd=cwd or tmp_path / "repo",
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    return run
+
+
+@pytest.fixture
+def git_repo(tmp_path, git):
+    """Create a temporary git repository with one commit on 'main'."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git("init", "-q", "-b", "main")
+    (repo / "README.md").write_text("hello\n")
+    git("add", "README.md")
+    git("commit", "-q", "-m", "initial")
+    return repo
@@ -0,0 +1,9 @@
+"""Fixtures shared by the hook tests."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(temp_home):
+    """Keep caches, sockets and status files out of the real ~/.claude."""
+    return temp_home
@@ -0,0 +1,217 @@
+"""Tests for audit_daemon.py."""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def sock_path():
+    """Short socket path (AF_UNIX paths are limited to ~104 bytes)."""
+    run_dir = Path(tempfile.mkdtemp(prefix="audit-", dir="/tmp"))
+    yield run_dir / "audit.sock"
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon(sock_path, temp_claude_dir):
+    """Run the daemon in a background thread, pointing clients at it."""
+    import audit_daemon
+
+    log_file = temp_claude_dir / "command-audit.log"
+    with patch("audit_logger.daemon_socket_path", return_value=sock_path):
+        thread = threading.Thread(
+            target=audit_daemon.serve,
+            kwargs={"sock_path": sock_path, "log_dir": temp_claude_dir, "idle_timeout": 30},
+            daemon=True,
+        )
+        thread.start()
+        for _ in range(200):
+            if sock_path.exists():
+                break
+            time.sleep(0.01)
+        yield log_file
+        audit_daemon.stop()
+        thread.join(timeout=5)
+
+
+def payload(command, cwd="/tmp"):
+    return {
+        "hook": {
+            "hook_event_name": "PreToolUse",
+            "tool_name": "Bash",
+            "tool_input": {"command": command},
+            "session_id": "daemon-test",
+            "cwd": cwd,
+        },
+        "cwd": cwd,
+        "check_dirty": False,
+    }
+
+
+class TestDaemon:
+    """Tests for the daemon and its socket client."""
+
+    def test_entry_written_before_ack(self, daemon):
+        """Test an acknowledged entry is already in the log."""
+        from audit_logger import send_to_daemon
+
+        assert send_to_daemon(payload("echo one")) is True
+        assert "COMMAND: echo one" in daemon.read_text()
+
+    def test_concurrent_clients(self, daemon):
+        """Test entries from concurrent clients are all written intact."""
+        from audit_logger import send_to_daemon
+
+        results = []
+
+        def client(i):
+            results.append(send_to_daemon(payload(f"echo {i}")))
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(32)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert all(results) and len(results) == 32
+        content = daemon.read_text()
+        for i in range(32):
+            assert f"COMMAND: echo {i}\n" in content
+        assert content.count("---\n") == 32
+
+    def test_git_info_from_daemon(self, daemon, git_repo):
+        """Test the daemon resolves git metadata for the client's cwd."""
+        from audit_logger import send_to_daemon
+
+        assert send_to_daemon(payload("ls", cwd=str(git_repo)))
+        assert send_to_daemon(payload("ls", cwd=str(git_repo)))
+        assert daemon.read_text().count("REPO: repo BRANCH: main@") == 2
+
+    def test_jsonl_format(self, daemon):
+        """Test the daemon writes structured entries to the JSONL log."""
+        from audit_logger import send_to_daemon
+
+        message = payload("echo json")
+        message["format"] = "jsonl"
+        assert send_to_daemon(message)
+        record = json.loads((daemon.parent / "command-audit.jsonl").read_text())
+        assert record["command"] == "echo json"
+
+    def test_invalid_message(self, daemon, sock_path):
+        """Test malformed messages are rejected without crashing the daemon."""
+        import socket
+
+        from audit_logger import send_to_daemon
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(sock_path))
+            sock.sendall(b"not json")
+            sock.shutdown(socket.SHUT_WR)
+            assert sock.recv(16).strip() == b"error"
+        assert send_to_daemon(payload("still alive"))
+
+    def test_second_instance_exits(self, daemon, sock_path):
+        """Test a second daemon exits immediately while the lock is held."""
+        import audit_daemon
+
+        assert audit_daemon.serve(sock_path=sock_path, log_dir=daemon.parent, idle_timeout=30) == 0
+
+    def test_idle_timeout(self, sock_path, temp_claude_dir):
+        """Test the daemon exits and removes its socket when idle."""
+        import audit_daemon
+
+        with patch("audit_daemon.time.sleep", return_value=None):
+            code = audit_daemon.serve(
+                sock_path=sock_path,
+                log_dir=temp_claude_dir,
+                idle_timeout=0.01,
+            )
+        assert code == 0
+        assert not sock_path.exists()
+
+
+class TestBatchWriter:
+    """Tests for the daemon's write timeout."""
+
+    def test_shorter_than_client_timeout(self):
+        """Test the daemon gives up before its client does."""
+        import audit_daemon
+        import audit_logger
+
+        assert audit_daemon.WRITE_TIMEOUT < audit_logger.DAEMON_TIMEOUT
+
+    def test_timed_out_entry_never_written(self, temp_claude_dir):
+        """Test an entry reported as not written stays out of the log, so the
+        client's own write does not duplicate it."""
+        import audit_daemon
+        import audit_store
+
+        log_file = temp_claude_dir / "command-audit.log"
+        gate = threading.Event()
+        real_write = audit_store.write_entry
+
+        def slow_write(fd, data):
+            gate.wait(5)
+            return real_write(fd, data)
+
+        with patch("audit_store.write_entry", side_effect=slow_write):
+            writer = audit_daemon.BatchWriter(log_file)
+            first = []
+            thread = threading.Thread(target=lambda: first.append(writer.submit("first", timeout=5)))
+            thread.start()
+            time.sleep(0.1)  # The writer thread is now stuck on the first batch
+            assert writer.submit("second", timeout=0.1) is False
+            gate.set()
+            thread.join()
+            assert writer.submit("third", timeout=5) is True
+
+        assert first == [True]
+        assert log_file.read_text() == "first\nthird\n"
+
+
+class TestClientFallback:
+    """Tests for audit_logger's daemon client mode."""
+
+    def test_no_daemon_returns_false(self, sock_path):
+        """Test sending without a daemon reports failure."""
+        from audit_logger import send_to_daemon
+
+        with patch("audit_logger.daemon_socket_path", return_value=sock_path):
+            assert send_to_daemon(payload("ls")) is False
+
+    def test_main_falls_back_and_starts_daemon(
+        self, sock_path, temp_claude_dir, sample_hook_input
+    ):
+        """Test main writes directly and launches the daemon when it is absent."""
+        from audit_logger import main
+
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_DAEMON": "1"}), patch(
+            "audit_logger.daemon_socket_path", return_value=sock_path
+        ), patch("audit_logger.start_daemon") as mock_start, patch(
+            "sys.stdin", io.StringIO(json.dumps(sample_hook_input))
+        ):
+            main()
+
+        mock_start.assert_called_once()
+        assert "COMMAND: git status" in (temp_claude_dir / "command-audit.log").read_text()
+
+    def test_main_uses_daemon(self, daemon, sample_hook_input):
+        """Test main hands the entry to a running daemon."""
+        from audit_logger import main
+
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_DAEMON": "1"}), patch(
+            "audit_logger.write_log_entry"
+        ) as mock_write, patch("sys.stdin", io.StringIO(json.dumps(sample_hook_input))):
+            main()
+
+        mock_write.assert_not_called()
+        assert "COMMAND: git status" in daemon.read_text()
@@ -70,6 +70,180 @@ class TestGetGitInfo:
         assert info["branch"] == "unknown"
 
 
+class TestGitFallback:
+    """Tests for the git subprocess fallback of get_git_info."""
+
+    def test_find_git_dir(self, git_repo):
+        """Test repository root is found from a subdirectory."""
+        from audit_logger import find_git_dir
+
+        subdir = git_repo / "src"
+        subdir.mkdir()
+        root, git_dir = find_git_dir(str(subdir))
+        assert root == str(git_repo)
+        assert git_dir == str(git_repo / ".git")
+
+    def test_find_git_dir_worktree(self, git_repo, git, tmp_path):
+        """Test linked worktree resolves its gitdir pointer."""
+        from audit_logger import find_git_dir
+
+        wt = tmp_path / "wt"
+        git("worktree", "add", "-q", "-b", "feature", str(wt))
+        root, git_dir = find_git_dir(str(wt))
+        assert root == str(wt)
+        assert Path(git_dir, "HEAD").exists()
+
+    @pytest.fixture(autouse=True)
+    def force_fallback(self):
+        """Exercise the subprocess path instead of the direct reader."""
+        with patch("audit_logger.read_git_info", return_value=None):
+            yield
+
+    def test_new_commit(self, git_repo, git, temp_home):
+        """Test each call reports the commit git currently resolves."""
+        from audit_logger import get_git_info
+
+        before = get_git_info(str(git_repo))["commit"]
+        git("commit", "-q", "--allow-empty", "-m", "second")
+        after = get_git_info(str(git_repo))["commit"]
+        assert after != before
+        assert after == git("rev-parse", "--short", "HEAD")
+
+    def test_git_dir_override(self, git_repo, git, tmp_path, temp_home, monkeypatch):
+        """Test GIT_DIR pointing at another repository always runs git."""
+        from audit_logger import get_git_info
+
+        other = tmp_path / "other"
+        other.mkdir()
+        git("init", "-q", "-b", "main", cwd=other)
+        git("commit", "-q", "--allow-empty", "-m", "first", cwd=other)
+        monkeypatch.setenv("GIT_DIR", str(other / ".git"))
+
+        get_git_info(str(git_repo))
+        git("commit", "-q", "--allow-empty", "-m", "second", cwd=other)
+
+        assert get_git_info(str(git_repo))["commit"] == git("rev-parse", "--short", "HEAD", cwd=other)
+
+    def test_reftable_runs_git(self, git_repo, temp_home):
+        """Test reftable repositories, which the reader can't parse, run git."""
+        from audit_logger import get_git_info
+
+        (git_repo / ".git" / "reftable").mkdir()
+        get_git_info(str(git_repo))
+
+        with patch("audit_logger.run_command", return_value=None) as mock_run:
+            get_git_info(str(git_repo))
+        assert mock_run.called
+
+
+class TestGetGitInfoReader:
+    """Tests for get_git_info using the subprocess-free reader."""
+
+    def test_reads_without_subprocess(self, git_repo, git):
+        """Test branch and commit come from .git without running git."""
+        from audit_logger import get_git_info
+
+        with patch("audit_logger.run_command") as mock_run:
+            info = get_git_info(str(git_repo))
+            mock_run.assert_not_called()
+        assert info["repo"] == "repo"
+        assert info["branch"] == "main"
+        assert info["commit"] == git("rev-parse", "--short=7", "HEAD")
+
+    def test_detached_tag(self, git_repo, git):
+        """Test detached HEAD on a tag reports the tag name."""
+        from audit_logger import get_git_info
+
+        git("tag", "v1.0")
+        git("checkout", "-q", "--detach")
+        assert get_git_info(str(git_repo))["branch"] == "v1.0"
+
+    def test_unsupported_layout_falls_back(self, git_repo, temp_home):
+        """Test reader returning None falls back to git subprocesses."""
+        from audit_logger import get_git_info
+
+        with patch("audit_logger.read_git_info", return_value=None):
+            info = get_git_info(str(git_repo))
+        assert info["branch"] == "main"
+
+
+class TestDirtyState:
+    """Tests for the budgeted, cached dirty check."""
+
+    @pytest.fixture(autouse=True)
+    def no_snapshot_reuse(self, temp_home):
+        """Check the tree on every call unless a test opts back in."""
+        with patch("audit_logger.DIRTY_SNAPSHOT_TTL", 0):
+            yield
+
+    def test_clean_and_modified(self, git_repo):
+        """Test tracked modifications are detected."""
+        from audit_logger import get_dirty_state
+
+        assert get_dirty_state(str(git_repo)) is False
+        (git_repo / "README.md").write_text("changed\n")
+        assert get_dirty_state(str(git_repo)) is True
+
+    def test_untracked_ignored_by_default(self, git_repo):
+        """Test untracked files only count with CLAUDE_AUDIT_DIRTY_UNTRACKED=1."""
+        from audit_logger import get_dirty_state
+
+        (git_repo / "new.txt").write_text("new\n")
+        assert get_dirty_state(str(git_repo)) is False
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_DIRTY_UNTRACKED": "1"}):
+            assert get_dirty_state(str(git_repo)) is True
+
+    def test_snapshot_reused_while_index_unchanged(self, git_repo):
+        """Test a recent result is reused without running git again."""
+        from audit_logger import get_dirty_state
+
+        with patch("audit_logger.DIRTY_SNAPSHOT_TTL", 60):
+            assert get_dirty_state(str(git_repo)) is False
+            with patch("audit_logger.git_status_dirty") as mock_status:
+                assert get_dirty_state(str(git_repo)) is False
+                mock_status.assert_not_called()
+
+    def test_index_change_invalidates_snapshot(self, git_repo, git):
+        """Test staging a change invalidates the snapshot immediately."""
+        from audit_logger import get_dirty_state
+
+        with patch("audit_logger.DIRTY_SNAPSHOT_TTL", 60):
+            assert get_dirty_state(str(git_repo)) is False
+            (git_repo / "README.md").write_text("staged\n")
+            git("add", "README.md")
+            assert get_dirty_state(str(git_repo)) is True
+
+    def test_over_budget_reports_unknown_and_backs_off(self, git_repo):
+        """Test a timed-out check returns None and is not retried right away."""
+        import subprocess
+
+        from audit_logger import get_dirty_state
+
+        with patch(
+            "subprocess.run",
+            side_effect=subprocess.TimeoutExpired("git", 0.3),
+        ) as mock_run:
+            assert get_dirty_state(str(git_repo)) is None
+            assert get_dirty_state(str(git_repo)) is None
+            assert mock_run.call_count == 1
+
+    def test_budget_env(self):
+        """Test CLAUDE_AUDIT_DIRTY_BUDGET is parsed from milliseconds."""
+        from audit_logger import DEFAULT_DIRTY_BUDGET, parse_dirty_budget
+
+        assert parse_dirty_budget("1500") == 1.5
+        assert parse_dirty_budget("soon") == DEFAULT_DIRTY_BUDGET
+        assert parse_dirty_budget("0") == DEFAULT_DIRTY_BUDGET
+
+    def test_get_git_info_uses_dirty_state(self, git_repo):
+        """Test CLAUDE_AUDIT_GIT_STATUS=1 reports the dirty flag."""
+        from audit_logger import get_git_info
+
+        (git_repo / "README.md").write_text("changed\n")
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_GIT_STATUS": "1"}):
+            assert get_git_info(str(git_repo))["dirty"] is True
+
+
 class TestGetSystemInfo:
     """Tests for get_system_info function."""
 
@@ -126,6 +300,43 @@ class TestFormatLogEntry:
 
         assert "[dirty]" in entry
 
+    def test_format_marks_unknown_dirty_state(self, sample_hook_input):
+        """Test an over-budget dirty check is logged as [dirty?]."""
+        from audit_logger import format_log_entry
+
+        git_info = {"repo": "test-repo", "branch": "main", "commit": "abc123", "dirty": None}
+        system_info = {"hostname": "test-host", "username": "test-user"}
+
+        entry = format_log_entry(sample_hook_input, git_info, system_info)
+
+        assert "[dirty?]" in entry
+        assert "[dirty]" not in entry
+
+
+class TestFormatJsonEntry:
+    """Tests for format_json_entry function."""
+
+    def test_typed_fields(self, sample_hook_input):
+        """Test JSON record has typed fields and nulls for unknown values."""
+        from audit_logger import format_json_entry
+
+        git_info = {"repo": "test-repo", "branch": "main", "commit": "unknown", "dirty": True}
+        system_info = {"hostname": "test-host", "username": "test-user"}
+
+        entry = format_json_entry(sample_hook_input, git_info, system_info)
+        record = json.loads(entry)
+
+        assert "\n" not in entry
+        assert record["session"] == "test-session-12345678"
+        assert record["host"] == "test-host"
+        assert record["repo"] == "test-repo"
+        assert record["branch"] == "main"
+        assert record["commit"] is None
+        assert record["dirty"] is True
+        assert record["command"] == "git status"
+        assert record["event"] == "PreToolUse"
+        assert "T" in record["timestamp"]
+
 
 class TestMain:
     """Tests for main function."""
@@ -182,3 +393,27 @@ class TestMain:
 
         log_file = temp_claude_dir / "command-audit.log"
         assert log_file.exists()
+
+    def test_jsonl_format(self, temp_claude_dir, sample_hook_input):
+        """Test CLAUDE_AUDIT_FORMAT=jsonl writes one JSON record per line."""
+        from audit_logger import main
+
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_FORMAT": "jsonl"}):
+            for _ in range(2):
+                with patch("sys.stdin", io.StringIO(json.dumps(sample_hook_input))):
+                    main()
+
+        lines = (temp_claude_dir / "command-audit.jsonl").read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["command"] == "git status"
+        assert not (temp_claude_dir / "command-audit.log").exists()
+
+    def test_unknown_format_uses_text(self, temp_claude_dir, sample_hook_input):
+        """Test an unknown format falls back to the text log."""
+        from audit_logger import main
+
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_FORMAT": "xml"}), \
+                patch("sys.stdin", io.StringIO(json.dumps(sample_hook_input))):
+            main()
+
+        assert "COMMAND: git status" in (temp_claude_dir / "command-audit.log").read_text()
@@ -0,0 +1,193 @@
+"""Tests for audit_query.py (audit_logger.py query)."""
+
+import gzip
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+
+def make_entry(command, session="session-aaaa", repo="proj", branch="main", timestamp=None):
+    """Build a text-format entry as audit_logger writes it."""
+    from audit_logger import format_log_entry
+
+    hook = {
+        "hook_event_name": "PreToolUse",
+        "tool_name": "Bash",
+        "tool_input": {"command": command},
+        "session_id": session,
+        "cwd": "/work",
+    }
+    git_info = {"repo": repo, "branch": branch, "commit": "abc1234", "dirty": False}
+    entry = format_log_entry(hook, git_info, {"hostname": "host1", "username": "dev"})
+    if timestamp:
+        entry = f"[{timestamp}]" + entry.split("]", 1)[1]
+    return entry + "\n"
+
+
+@pytest.fixture
+def log_file(temp_claude_dir):
+    """Path of the text audit log inside the temporary ~/.claude."""
+    return temp_claude_dir / "command-audit.log"
+
+
+def run_query(log_file, *args):
+    """Run a query and return the matched commands."""
+    import audit_query
+
+    conn = audit_query.connect()
+    try:
+        audit_query.update_index(conn, [log_file, log_file.with_suffix(".jsonl")])
+        sql, params = audit_query.build_query(audit_query.build_parser().parse_args(list(args)))
+        return [row[audit_query.ENTRY_COLUMNS.index("command")] for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+class TestIndex:
+    """Tests for incremental index maintenance."""
+
+    def test_incremental_ingest(self, log_file):
+        """Test only new entries are ingested on later queries."""
+        log_file.write_text(make_entry("one") + make_entry("two"))
+        assert run_query(log_file) == ["one", "two"]
+
+        with open(log_file, "a") as f:
+            f.write(make_entry("three"))
+        assert run_query(log_file) == ["one", "two", "three"]
+
+    def test_partial_entry_picked_up_later(self, log_file):
+        """Test an entry written halfway is indexed once complete."""
+        entry = make_entry("slow")
+        log_file.write_text(make_entry("one") + entry[:30])
+        assert run_query(log_file) == ["one"]
+
+        with open(log_file, "a") as f:
+            f.write(entry[30:])
+        assert run_query(log_file) == ["one", "slow"]
+
+    def test_rotated_and_compressed_segments(self, log_file):
+        """Test rotation and compression neither lose nor duplicate entries."""
+        log_file.write_text(make_entry("one"))
+        assert run_query(log_file) == ["one"]
+
+        # Entry appended after indexing, then rotated and compressed
+        with open(log_file, "a") as f:
+            f.write(make_entry("two"))
+        segment = log_file.with_name(log_file.name + ".20260101-000000.000000")
+        os.rename(log_file, segment)
+        with open(segment, "rb") as src, gzip.open(f"{segment}.gz", "wb") as dst:
+            dst.write(src.read())
+        os.unlink(segment)
+        log_file.write_text(make_entry("three"))
+
+        assert run_query(log_file) == ["one", "two", "three"]
+        assert run_query(log_file) == ["one", "two", "three"]
+
+    def test_jsonl_log_indexed(self, log_file, sample_hook_input):
+        """Test entries from the JSONL log are indexed alongside text entries."""
+        from audit_logger import format_json_entry
+
+        git_info = {"repo": "proj", "branch": "main", "commit": "abc1234", "dirty": False}
+        line = format_json_entry(sample_hook_input, git_info, {"hostname": "h", "username": "u"})
+        log_file.with_suffix(".jsonl").write_text(line + "\n")
+
+        assert run_query(log_file, "--session", "test-session-12345678") == ["git status"]
+
+
+class TestFilters:
+    """Tests for query filters."""
+
+    @pytest.fixture(autouse=True)
+    def entries(self, log_file):
+        """Three entries across two sessions, repos and dates."""
+        log_file.write_text(
+            make_entry("make build", session="aaaa1111", repo="api", timestamp="2026-01-01 10:00:00.000")
+            + make_entry("pytest -q", session="aaaa1111", repo="web", timestamp="2026-01-05 10:00:00.000")
+            + make_entry("make test", session="bbbb2222", repo="api", branch="dev", timestamp="2026-01-09 10:00:00.000")
+        )
+
+    def test_session_prefix(self, log_file):
+        """Test full session ids match the truncated ids in text logs."""
+        assert run_query(log_file, "--session", "aaaa1111-full-session-id") == ["make build", "pytest -q"]
+
+    def test_session_short_prefix(self, log_file):
+        """Test a short session prefix matches longer stored ids."""
+        assert run_query(log_file, "--session", "bbbb") == ["make test"]
+
+    def test_repo_and_branch(self, log_file):
+        """Test repo and branch filters combine."""
+        assert run_query(log_file, "--repo", "api") == ["make build", "make test"]
+        assert run_query(log_file, "--repo", "api", "--branch", "dev") == ["make test"]
+
+    def test_time_range(self, log_file):
+        """Test --since is inclusive and --until exclusive."""
+        assert run_query(log_file, "--since", "2026-01-05", "--until", "2026-01-09 10:00") == ["pytest -q"]
+
+    def test_command_substring(self, log_file):
+        """Test command substring matching."""
+        assert run_query(log_file, "--command", "make") == ["make build", "make test"]
+
+    def test_limit(self, log_file):
+        """Test --limit caps the result count."""
+        assert run_query(log_file, "--limit", "1") == ["make build"]
+
+
+class TestParseTime:
+    """Tests for parse_time function."""
+
+    def test_relative(self):
+        """Test relative durations count back from now."""
+        from audit_query import parse_time
+
+        now = datetime(2026, 1, 8, 12, 0, 0)
+        assert parse_time("7d", now) == "2026-01-01 12:00:00.000"
+        assert parse_time("2h", now) == "2026-01-08 10:00:00.000"
+
+    def test_absolute(self):
+        """Test dates and date-times are normalized."""
+        from audit_query import parse_time
+
+        assert parse_time("2026-01-05") == "2026-01-05 00:00:00.000"
+        assert parse_time("2026-01-05 13:30") == "2026-01-05 13:30:00.000"
+
+    def test_invalid(self):
+        """Test invalid input raises ValueError."""
+        from audit_query import parse_time
+
+        with pytest.raises(ValueError):
+            parse_time("last tuesday")
+
+
+class TestCli:
+    """Tests for the audit_logger.py query entry point."""
+
+    def test_query_output(self, log_file, capsys):
+        """Test query prints one line per matching entry."""
+        from audit_logger import main
+
+        log_file.write_text(make_entry("ls -la", session="cccc3333", timestamp="2026-01-01 10:00:00.000"))
+        with pytest.raises(SystemExit) as exc_info:
+            main(["query", "--repo", "proj"])
+        assert exc_info.value.code == 0
+        assert capsys.readouterr().out.strip() == "2026-01-01 10:00:00.000 cccc3333 proj@main ls -la"
+
+    def test_query_json(self, log_file, capsys):
+        """Test --json prints structured records."""
+        from audit_logger import main
+
+        log_file.write_text(make_entry("ls"))
+        with pytest.raises(SystemExit):
+            main(["query", "--json"])
+        record = json.loads(capsys.readouterr().out)
+        assert record["command"] == "ls"
+        assert record["commit"] == "abc1234"
+
+    def test_unknown_subcommand(self, capsys):
+        """Test unknown subcommands exit with code 1."""
+        from audit_logger import main
+
+        with pytest.raises(SystemExit) as exc_info:
+            main(["frobnicate"])
+        assert exc_info.value.code == 1
@@ -0,0 +1,201 @@
+"""Tests for audit_stats.py (audit_logger.py stats)."""
+
+import gzip
+import json
+
+import pytest
+
+
+def make_entry(command, session="session-aaaa", repo="proj", timestamp="2026-01-01 10:00:00.000"):
+    """Build a text-format entry as audit_logger writes it."""
+    from audit_logger import format_log_entry
+
+    hook = {
+        "hook_event_name": "PreToolUse",
+        "tool_name": "Bash",
+        "tool_input": {"command": command},
+        "session_id": session,
+        "cwd": "/work",
+    }
+    git_info = {"repo": repo, "branch": "main", "commit": "abc1234", "dirty": False}
+    entry = format_log_entry(hook, git_info, {"hostname": "host1", "username": "dev"})
+    return f"[{timestamp}]" + entry.split("]", 1)[1] + "\n"
+
+
+@pytest.fixture
+def log_file(temp_claude_dir):
+    """Path of the text audit log inside the temporary ~/.claude."""
+    return temp_claude_dir / "command-audit.log"
+
+
+def collect(log_file, **kwargs):
+    from audit_stats import collect
+
+    return collect([log_file, log_file.with_suffix(".jsonl")], **kwargs).report()
+
+
+class TestCommandPrefix:
+    """Tests for command_prefix function."""
+
+    @pytest.mark.parametrize(
+        "command,expected",
+        [
+            ("git status", "git"),
+            ("/usr/bin/python3 -m pytest", "python3"),
+            ("FOO=1 BAR=two make test", "make"),
+            ("  ls", "ls"),
+            ("", ""),
+        ],
+    )
+    def test_prefixes(self, command, expected):
+        """Test program names are extracted from command lines."""
+        from audit_stats import command_prefix
+
+        assert command_prefix(command) == expected
+
+
+class TestBoundedCounter:
+    """Tests for BoundedCounter."""
+
+    def test_keeps_most_frequent(self):
+        """Test rare keys are dropped once the capacity is exceeded."""
+        from audit_stats import BoundedCounter
+
+        counter = BoundedCounter(capacity=2)
+        for key in ["a"] * 5 + ["b"] * 3 + ["c", "d", "e"]:
+            counter.add(key)
+
+        assert counter.most_common(2) == [("a", 5), ("b", 3)]
+        assert len(counter.counts) <= 4
+
+    def test_merge(self):
+        """Test merged counters add counts."""
+        from audit_stats import BoundedCounter
+
+        left, right = BoundedCounter(), BoundedCounter()
+        left.add("a", 2)
+        right.add("a")
+        right.add("b")
+        left.merge(right)
+
+        assert left.most_common(5) == [("a", 3), ("b", 1)]
+
+
+class TestReport:
+    """Tests for the streamed report."""
+
+    def test_counts(self, log_file):
+        """Test commands are counted per command, prefix, session, repo and hour."""
+        log_file.write_text(
+            make_entry("git status", session="s1", repo="api", timestamp="2026-01-01 09:00:00.000")
+            + make_entry("git status", session="s1", repo="api", timestamp="2026-01-01 09:30:00.000")
+            + make_entry("git log", session="s2", repo="web", timestamp="2026-01-01 14:00:00.000")
+            + make_entry("make test", session="s2", repo="web", timestamp="2026-01-01 14:05:00.000")
+        )
+
+        report = collect(log_file)
+
+        assert report["entries"] == 4
+        assert report["first"] == "2026-01-01 09:00:00.000"
+        assert report["last"] == "2026-01-01 14:05:00.000"
+        assert report["top_commands"][0] == ("git status", 2)
+        assert report["prefixes"] == [("git", 3), ("make", 1)]
+        assert report["distinct_prefixes"] == 2
+        assert report["sessions"] == [("s1", 2), ("s2", 2)]
+        assert report["repos"] == [("api", 2), ("web", 2)]
+        assert report["hours"][9] == 2 and report["hours"][14] == 2
+
+    def test_rotated_compressed_and_jsonl(self, log_file, sample_hook_input):
+        """Test rotated, gzipped and JSONL segments are all included."""
+        from audit_logger import format_json_entry
+
+        segment = log_file.with_name(log_file.name + ".20260101-000000.000000.gz")
+        with gzip.open(segment, "wb") as f:
+            f.write(make_entry("old command").encode())
+        log_file.write_text(make_entry("new command"))
+        git_info = {"repo": "proj", "branch": "main", "commit": "abc1234", "dirty": False}
+        log_file.with_suffix(".jsonl").write_text(
+            format_json_entry(sample_hook_input, git_info, {"hostname": "h", "username": "u"}) + "\n"
+        )
+
+        commands = {command for command, _ in collect(log_file)["top_commands"]}
+
+        assert commands == {"old command", "new command", "git status"}
+
+    def test_time_range(self, log_file):
+        """Test --since/--until bounds are applied while streaming."""
+        log_file.write_text(
+            make_entry("one", timestamp="2026-01-01 10:00:00.000")
+            + make_entry("two", timestamp="2026-01-05 10:00:00.000")
+        )
+
+        report = collect(log_file, since="2026-01-02 00:00:00.000")
+
+        assert report["top_commands"] == [("two", 1)]
+
+    def test_bursts(self, log_file):
+        """Test sessions running many commands within the window are flagged."""
+        burst = "".join(
+            make_entry(f"cmd {i}", session="busy", timestamp=f"2026-01-01 10:00:{i:02d}.000")
+            for i in range(12)
+        )
+        calm = "".join(
+            make_entry(f"cmd {i}", session="calm", timestamp=f"2026-01-01 1{i}:00:00.000")
+            for i in range(5)
+        )
+        log_file.write_text(burst + calm)
+
+        report = collect(log_file, burst_window=60, burst_threshold=10)
+
+        assert report["bursts"] == [
+            {"session": "busy", "commands": 12, "window": 60, "start": "2026-01-01 10:00:00.000"}
+        ]
+
+    def test_parallel_matches_serial(self, log_file):
+        """Test per-segment worker processes produce the serial result."""
+        for i in range(3):
+            segment = log_file.with_name(f"{log_file.name}.20260101-00000{i}.000000")
+            segment.write_text(
+                "".join(make_entry(f"echo {j % (i + 2)}", session=f"s{i}") for j in range(20))
+            )
+        log_file.write_text(make_entry("echo 0"))
+
+        assert collect(log_file, jobs=3) == collect(log_file)
+
+
+class TestCli:
+    """Tests for the audit_logger.py stats entry point."""
+
+    def test_text_report(self, log_file, capsys):
+        """Test the text report lists top commands."""
+        from audit_logger import main
+
+        log_file.write_text(make_entry("ls -la") + make_entry("ls -la"))
+        with pytest.raises(SystemExit) as exc_info:
+            main(["stats"])
+
+        assert exc_info.value.code == 0
+        out = capsys.readouterr().out
+        assert "Entries: 2" in out
+        assert "2  ls -la" in out
+
+    def test_json_report(self, log_file, capsys):
+        """Test --json prints the report as one JSON object."""
+        from audit_logger import main
+
+        log_file.write_text(make_entry("ls"))
+        with pytest.raises(SystemExit):
+            main(["stats", "--json"])
+
+        report = json.loads(capsys.readouterr().out)
+        assert report["top_commands"] == [["ls", 1]]
+
+    def test_invalid_since(self, log_file, capsys):
+        """Test an invalid --since exits with code 1."""
+        from audit_logger import main
+
+        with pytest.raises(SystemExit) as exc_info:
+            main(["stats", "--since", "yesterday-ish"])
+
+        assert exc_info.value.code == 1
+        assert "invalid time" in capsys.readouterr().err
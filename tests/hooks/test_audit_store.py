@@ -0,0 +1,319 @@
+"""Tests for audit_store.py."""
+
+import gzip
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+class TestParseMaxBytes:
+    """Tests for parse_max_bytes function."""
+
+    def test_valid_value(self):
+        """Test valid integer string."""
+        from audit_store import parse_max_bytes
+
+        assert parse_max_bytes("1024") == 1024
+
+    def test_none_returns_default(self):
+        """Test None returns default value."""
+        from audit_store import DEFAULT_MAX_BYTES, parse_max_bytes
+
+        assert parse_max_bytes(None) == DEFAULT_MAX_BYTES
+
+    def test_invalid_returns_default(self):
+        """Test invalid string returns default."""
+        from audit_store import DEFAULT_MAX_BYTES, parse_max_bytes
+
+        assert parse_max_bytes("big") == DEFAULT_MAX_BYTES
+
+    def test_zero_disables(self):
+        """Test zero disables rotation."""
+        from audit_store import parse_max_bytes
+
+        assert parse_max_bytes("0") == 0
+
+
+class TestRotation:
+    """Tests for append and rotate."""
+
+    @pytest.fixture(autouse=True)
+    def no_compressor(self):
+        """Keep rotation tests from spawning the background compressor."""
+        with patch("audit_store.spawn_compressor") as mock_spawn:
+            self.spawn = mock_spawn
+            yield
+
+    def test_no_rotation_below_limit(self, tmp_path):
+        """Test small logs are not rotated."""
+        from audit_store import append, list_segments
+
+        log = tmp_path / "audit.log"
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_MAX_BYTES": "1000"}):
+            append(log, "entry\n")
+        assert list_segments(log) == [log]
+        self.spawn.assert_not_called()
+
+    def test_rotates_above_limit(self, tmp_path):
+        """Test the active log is renamed once it reaches the limit."""
+        from audit_store import append, list_segments
+
+        log = tmp_path / "audit.log"
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_MAX_BYTES": "20"}):
+            append(log, "a" * 25 + "\n")
+            append(log, "second\n")
+
+        segments = list_segments(log)
+        assert len(segments) == 2
+        assert segments[-1] == log
+        assert segments[0].read_text() == "a" * 25 + "\n"
+        assert log.read_text() == "second\n"
+        self.spawn.assert_called_once_with(log)
+
+    def test_rotation_disabled(self, tmp_path):
+        """Test CLAUDE_AUDIT_MAX_BYTES=0 never rotates."""
+        from audit_store import append, list_segments
+
+        log = tmp_path / "audit.log"
+        with patch.dict(os.environ, {"CLAUDE_AUDIT_MAX_BYTES": "0"}):
+            append(log, "x" * 1000 + "\n")
+        assert list_segments(log) == [log]
+
+    def test_stale_inode_skips_rotation(self, tmp_path):
+        """Test a writer does not rotate a file another writer already replaced."""
+        from audit_store import rotate
+
+        log = tmp_path / "audit.log"
+        log.write_text("x" * 100)
+        assert rotate(log, log.stat().st_ino + 1, 10) is None
+        assert log.exists()
+
+    def test_segments_sorted_oldest_first(self, tmp_path):
+        """Test compressed and plain segments sort chronologically."""
+        from audit_store import list_segments
+
+        log = tmp_path / "audit.log"
+        (tmp_path / "audit.log.20260102-000000.000000").write_text("")
+        (tmp_path / "audit.log.20260101-000000.000000.gz").write_bytes(b"")
+        (tmp_path / "audit.log.lock").write_text("")
+        log.write_text("")
+        assert [p.name for p in list_segments(log)] == [
+            "audit.log.20260101-000000.000000.gz",
+            "audit.log.20260102-000000.000000",
+            "audit.log",
+        ]
+
+
+class TestCompression:
+    """Tests for compress_segments."""
+
+    def test_compresses_idle_segments(self, tmp_path):
+        """Test rotated segments are gzipped and originals removed."""
+        from audit_store import compress_segments
+
+        log = tmp_path / "audit.log"
+        log.write_text("active\n")
+        segment = tmp_path / "audit.log.20260101-000000.000000"
+        segment.write_text("old entry\n")
+
+        assert compress_segments(log, grace=0) == [segment]
+        assert not segment.exists()
+        with gzip.open(str(segment) + ".gz", "rt") as f:
+            assert f.read() == "old entry\n"
+        assert log.read_text() == "active\n"
+
+    def test_skips_recent_segments(self, tmp_path):
+        """Test segments modified within the grace period are left alone."""
+        from audit_store import compress_segments
+
+        log = tmp_path / "audit.log"
+        segment = tmp_path / "audit.log.20260101-000000.000000"
+        segment.write_text("fresh\n")
+
+        assert compress_segments(log, grace=60) == []
+        assert segment.exists()
+
+
+GIT_INFO = {"repo": "proj", "branch": "feat/x", "commit": "abc1234", "dirty": True}
+SYSTEM_INFO = {"hostname": "host1", "username": "dev"}
+
+
+class TestParseEntries:
+    """Tests for reading entries back from text and JSONL logs."""
+
+    def test_text_round_trip(self, sample_hook_input):
+        """Test parse_text_entry recovers the fields format_log_entry wrote."""
+        import io
+
+        from audit_logger import format_log_entry
+        from audit_store import iter_entries
+
+        sample_hook_input["tool_input"]["command"] = "cat <<EOF\nline two\nEOF"
+        text = format_log_entry(sample_hook_input, GIT_INFO, SYSTEM_INFO) + "\n"
+
+        [(offset, entry)] = list(iter_entries(io.BytesIO(text.encode()), "text"))
+        assert offset == len(text.encode())
+        assert entry["session"] == "test-ses"
+        assert entry["host"] == "host1"
+        assert entry["cwd"] == "/tmp/test-project"
+        assert entry["repo"] == "proj"
+        assert entry["branch"] == "feat/x"
+        assert entry["commit"] == "abc1234"
+        assert entry["dirty"] is True
+        assert entry["command"] == "cat <<EOF\nline two\nEOF"
+        assert entry["description"] == "Check git status"
+        assert entry["event"] == "PreToolUse"
+
+    def test_text_unknown_dirty(self, sample_hook_input):
+        """Test "[dirty?]" parses to an unknown (None) dirty flag."""
+        import io
+
+        from audit_logger import format_log_entry
+        from audit_store import iter_entries
+
+        git_info = {**GIT_INFO, "dirty": None}
+        text = format_log_entry(sample_hook_input, git_info, SYSTEM_INFO) + "\n"
+
+        [(_, entry)] = list(iter_entries(io.BytesIO(text.encode()), "text"))
+        assert entry["dirty"] is None
+        assert entry["commit"] == "abc1234"
+
+    def test_partial_entry_not_yielded(self, sample_hook_input):
+        """Test an entry still being written is left for the next read."""
+        import io
+
+        from audit_logger import format_log_entry
+        from audit_store import iter_entries
+
+        full = format_log_entry(sample_hook_input, GIT_INFO, SYSTEM_INFO) + "\n"
+        data = (full + full[:40]).encode()
+
+        entries = list(iter_entries(io.BytesIO(data), "text"))
+        assert len(entries) == 1
+        assert entries[0][0] == len(full.encode())
+
+    def test_resume_from_offset(self, sample_hook_input):
+        """Test reading resumes at a previous end offset."""
+        import io
+
+        from audit_logger import format_log_entry
+        from audit_store import iter_entries
+
+        first = format_log_entry(sample_hook_input, GIT_INFO, SYSTEM_INFO) + "\n"
+        sample_hook_input["tool_input"]["command"] = "ls"
+        second = format_log_entry(sample_hook_input, GIT_INFO, SYSTEM_INFO) + "\n"
+        stream = io.BytesIO((first + second).encode())
+
+        [(_, entry)] = list(iter_entries(stream, "text", len(first.encode())))
+        assert entry["command"] == "ls"
+
+    def test_jsonl_entries(self, sample_hook_input):
+        """Test JSONL records are parsed and timestamps normalized to local time."""
+        import io
+
+        from audit_logger import format_json_entry
+        from audit_store import iter_entries
+
+        line = format_json_entry(sample_hook_input, GIT_INFO, SYSTEM_INFO) + "\n"
+        data = (line + "not json\n").encode()
+
+        entries = list(iter_entries(io.BytesIO(data), "jsonl"))
+        assert len(entries) == 1
+        entry = entries[0][1]
+        assert entry["command"] == "git status"
+        assert "T" not in entry["timestamp"]
+        assert len(entry["timestamp"]) == len("2026-01-01 00:00:00.000")
+
+
+WRITER_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import audit_store
+
+log_file, writer, count, size = sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5])
+for i in range(count):
+    body = (writer[0] * size)
+    audit_store.append(log_file, f"BEGIN {writer} {i}\\n{body}\\nEND {writer} {i}\\n")
+"""
+
+
+class TestConcurrentAppends:
+    """Stress tests for atomic appends and group commit."""
+
+    def run_writers(self, log_file, writers=8, count=40, size=256 * 1024, env=None):
+        import subprocess
+        import sys
+
+        scripts = Path(__file__).resolve().parents[2] / "scripts"
+        env = {**os.environ, "CLAUDE_AUDIT_MAX_BYTES": "0", **(env or {})}
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-c", WRITER_SCRIPT, str(scripts), str(log_file),
+                 f"{chr(ord('a') + w)}{w}", str(count), str(size)],
+                env=env,
+            )
+            for w in range(writers)
+        ]
+        for proc in procs:
+            assert proc.wait(timeout=120) == 0
+
+    def test_no_torn_entries(self, tmp_path):
+        """Test large entries from parallel writers never interleave."""
+        log = tmp_path / "audit.log"
+        writers, count, size = 8, 40, 256 * 1024
+        self.run_writers(log, writers, count, size)
+
+        lines = log.read_text().split("\n")[:-1]
+        assert len(lines) == writers * count * 3
+        seen = set()
+        for i in range(0, len(lines), 3):
+            begin, body, end = lines[i:i + 3]
+            _, writer, seq = begin.split()
+            assert end == f"END {writer} {seq}"
+            assert body == writer[0] * size
+            seen.add((writer, seq))
+        assert len(seen) == writers * count
+
+    def test_group_commit_entries_intact(self, tmp_path):
+        """Test group commit mode keeps every entry and records the synced size."""
+        log = tmp_path / "audit.log"
+        self.run_writers(log, 8, 20, 1024, env={"CLAUDE_AUDIT_GROUP_COMMIT": "1"})
+
+        assert log.read_text().count("BEGIN ") == 160
+        inode, synced = (tmp_path / "audit.log.sync.lock").read_text().split()
+        assert int(inode) == log.stat().st_ino
+        assert int(synced) <= log.stat().st_size
+
+    def test_group_sync_skips_covered_writes(self, tmp_path):
+        """Test a writer whose entry was already synced does not fsync again."""
+        from audit_store import group_sync
+
+        log = tmp_path / "audit.log"
+        fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            os.write(fd, b"first\n")
+            assert group_sync(log, fd) is True
+            with patch("audit_store.os.fsync") as mock_fsync:
+                assert group_sync(log, fd) is False
+                mock_fsync.assert_not_called()
+            os.write(fd, b"second\n")
+            assert group_sync(log, fd) is True
+        finally:
+            os.close(fd)
+
+    def test_write_to_replaced_file_refused(self, tmp_path):
+        """Test write_entry leaves a file replaced under its lock untouched."""
+        from audit_store import write_entry
+
+        log = tmp_path / "audit.log"
+        log.write_text("old\n")
+        fd = os.open(log, os.O_WRONLY | os.O_APPEND)
+        try:
+            (tmp_path / "new.log").write_text("new\n")
+            os.replace(tmp_path / "new.log", log)
+            assert write_entry(fd, b"entry\n") is False
+        finally:
+            os.close(fd)
+        assert log.read_text() == "new\n"
@@ -0,0 +1,293 @@
+"""Tests for format_server.py and its post_edit client."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+
+# Minimal stand-ins for a project's prettier/eslint packages
+PRETTIER_STUB = """
+exports.getFileInfo = async (file) => ({ ignored: false, inferredParser: "babel" });
+exports.resolveConfig = async () => ({ pid: process.pid });
+exports.format = async (source, options) =>
+  source.includes("// formatted by")
+    ? source
+    : source.trim().replace(/ +/g, " ") + "\\n// formatted by " + options.pid + "\\n";
+"""
+
+ESLINT_STUB = """
+class ESLint {
+  async lintFiles(files) {
+    const fs = require("fs");
+    return files.map((filePath) => {
+      const bad = fs.readFileSync(filePath, "utf8").includes("var ");
+      return {
+        filePath,
+        errorCount: bad ? 1 : 0,
+        messages: bad ? [{ line: 1, column: 1, severity: 2, message: "Unexpected var", ruleId: "no-var" }] : [],
+      };
+    });
+  }
+  static async outputFixes() {}
+}
+exports.ESLint = ESLint;
+"""
+
+
+@pytest.fixture
+def node_project(tmp_path):
+    """Project root with stub prettier and eslint packages installed."""
+    root = tmp_path / "web"
+    for name, source in (("prettier", PRETTIER_STUB), ("eslint", ESLINT_STUB)):
+        package = root / "node_modules" / name
+        package.mkdir(parents=True)
+        (package / "index.js").write_text(source)
+    (root / "package.json").write_text('{"name": "web"}')
+    (root / "src").mkdir()
+    return root
+
+
+@pytest.fixture
+def sock_path():
+    """Short socket path (AF_UNIX paths are limited to ~104 bytes)."""
+    run_dir = Path(tempfile.mkdtemp(prefix="fmt-", dir="/tmp"))
+    yield run_dir / "format.sock"
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def server(sock_path, monkeypatch):
+    """Run the server in a background thread, pointing clients at it."""
+    import format_server
+
+    monkeypatch.setenv("CLAUDE_HOOK_FORMAT_SERVER", "1")
+    with patch("post_edit.format_server_socket", return_value=str(sock_path)):
+        thread = threading.Thread(
+            target=format_server.serve,
+            kwargs={"sock_path": sock_path, "idle_timeout": 30},
+            daemon=True,
+        )
+        thread.start()
+        for _ in range(200):
+            if sock_path.exists():
+                break
+            time.sleep(0.01)
+        yield sock_path
+        format_server.stop()
+        thread.join(timeout=5)
+
+
+@needs_node
+class TestNodeWorker:
+    """Tests for the warm Node worker."""
+
+    def test_formats_and_lints(self, node_project):
+        """Test a worker formats in place and reports lint errors."""
+        from format_server import NodeWorker
+
+        source = node_project / "src" / "a.js"
+        source.write_text("var  x = 1;")
+        worker = NodeWorker(str(node_project), shutil.which("node"))
+        try:
+            results = worker.request(str(source), ["prettier", "eslint"], timeout=10)
+        finally:
+            worker.stop()
+
+        assert [r["tool"] for r in results] == ["prettier", "eslint"]
+        assert results[0]["status"] == "ok"
+        assert source.read_text().startswith("var x = 1;\n// formatted by")
+        assert results[1]["status"] == "failed"
+        assert "Unexpected var (no-var)" in results[1]["output"]
+
+    def test_instance_reused(self, node_project):
+        """Test consecutive requests are served by the same Node process."""
+        from format_server import NodeWorker
+
+        first, second = node_project / "src" / "a.js", node_project / "src" / "b.js"
+        first.write_text("let a = 1;")
+        second.write_text("let b = 2;")
+        worker = NodeWorker(str(node_project), shutil.which("node"))
+        try:
+            worker.request(str(first), ["prettier"], timeout=10)
+            worker.request(str(second), ["prettier"], timeout=10)
+        finally:
+            worker.stop()
+
+        assert first.read_text().splitlines()[-1] == second.read_text().splitlines()[-1]
+
+    def test_missing_tool(self, tmp_path):
+        """Test tools not installed in the project are reported as missing."""
+        from format_server import NodeWorker
+
+        source = tmp_path / "a.js"
+        source.write_text("let a = 1;")
+        worker = NodeWorker(str(tmp_path), shutil.which("node"))
+        try:
+            results = worker.request(str(source), ["prettier", "eslint"], timeout=10)
+        finally:
+            worker.stop()
+
+        assert [r["status"] for r in results] == ["missing", "missing"]
+
+
+@needs_node
+class TestWorkerPool:
+    """Tests for worker reuse and restarts."""
+
+    def test_restart_on_config_change(self, node_project):
+        """Test a changed config file starts a fresh worker."""
+        from format_server import WorkerPool
+
+        pool = WorkerPool()
+        try:
+            first = pool.get(str(node_project))
+            assert pool.get(str(node_project)) is first
+
+            config = node_project / ".prettierrc"
+            config.write_text("{}")
+            os.utime(config, ns=(1, 1))
+            second = pool.get(str(node_project))
+            assert second is not first
+            assert pool.get(str(node_project)) is second
+        finally:
+            pool.stop_all()
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test the pool keeps at most max_workers workers."""
+        from format_server import WorkerPool
+
+        roots = []
+        for name in ("a", "b", "c"):
+            (tmp_path / name).mkdir()
+            roots.append(str(tmp_path / name))
+        pool = WorkerPool(max_workers=2)
+        try:
+            first = pool.get(roots[0])
+            pool.get(roots[1])
+            pool.get(roots[2])
+            assert pool.get(roots[0]) is not first
+        finally:
+            pool.stop_all()
+
+
+@needs_node
+class TestServer:
+    """Tests for the server and the post_edit client."""
+
+    def test_run_on_format_server(self, server, node_project):
+        """Test post_edit gets per-tool results from the server."""
+        from post_edit import run_on_format_server
+
+        source = node_project / "src" / "a.js"
+        source.write_text("let  a = 1;")
+
+        results = run_on_format_server(str(source), ["prettier", "eslint"])
+
+        assert results == {"prettier": (True, "", True), "eslint": (True, "", False)}
+        assert source.read_text().startswith("let a = 1;")
+
+    def test_formatted_file_untouched(self, server, node_project):
+        """Test the server leaves an already formatted file's mtime alone."""
+        from post_edit import run_on_format_server
+
+        source = node_project / "src" / "a.js"
+        source.write_text("let a = 1;\n// formatted by 0\n")
+        os.utime(source, ns=(1, 1))
+
+        assert run_on_format_server(str(source), ["prettier"]) == {"prettier": (True, "", False)}
+        assert source.stat().st_mtime_ns == 1
+
+    def test_handle_typescript_uses_server(self, server, node_project, capsys):
+        """Test handle_typescript starts no tool processes when served."""
+        from post_edit import handle_typescript
+
+        source = node_project / "src" / "a.ts"
+        source.write_text("var a = 1;")
+        with patch("post_edit.run_command") as mock_run:
+            handle_typescript(str(source))
+
+        mock_run.assert_not_called()
+        out = capsys.readouterr().out
+        assert "✓ prettier" in out
+        assert "eslint failed" in out and "no-var" in out
+
+    def test_missing_tool_falls_back(self, server, tmp_path):
+        """Test tools the project lacks are left to the subprocess path."""
+        from post_edit import run_on_format_server
+
+        source = tmp_path / "a.js"
+        source.write_text("let a = 1;")
+
+        assert run_on_format_server(str(source), ["prettier"]) == {}
+
+
+class TestClientFallback:
+    """Tests for post_edit when the server is unavailable."""
+
+    def test_disabled_by_default(self, tmp_path, monkeypatch):
+        """Test no server is contacted unless CLAUDE_HOOK_FORMAT_SERVER=1."""
+        from post_edit import run_on_format_server
+
+        monkeypatch.delenv("CLAUDE_HOOK_FORMAT_SERVER", raising=False)
+        with patch("post_edit.request_format_server") as mock_request:
+            assert run_on_format_server(str(tmp_path / "a.js"), ["prettier"]) == {}
+        mock_request.assert_not_called()
+
+    def test_unreachable_server_starts_one(self, tmp_path, monkeypatch, capsys):
+        """Test an unreachable server is started and the edit runs tools directly."""
+        from post_edit import handle_typescript
+
+        monkeypatch.setenv("CLAUDE_HOOK_FORMAT_SERVER", "1")
+        source = tmp_path / "a.js"
+        source.write_text("let a = 1;")
+        with patch("post_edit.format_server_socket", return_value=str(tmp_path / "none.sock")), \
+                patch("post_edit.start_format_server") as mock_start, \
+                patch("post_edit.resolve_npm_tool", side_effect=lambda tool, root=None: [tool]), \
+                patch("post_edit.run_command", side_effect=lambda cmd, **kwargs: (True, kwargs.get("input") or "")) as mock_run:
+            handle_typescript(str(source))
+
+        mock_start.assert_called_once()
+        assert [call.args[0][0] for call in mock_run.call_args_list] == ["prettier", "eslint"]
+        assert "✓ prettier" in capsys.readouterr().out
+
+    def test_batch_starts_server_once(self, tmp_path, monkeypatch):
+        """Test a batch against an unreachable server launches it only once."""
+        from post_edit import typescript_batch
+
+        monkeypatch.setenv("CLAUDE_HOOK_FORMAT_SERVER", "1")
+        monkeypatch.setattr("post_edit._format_server_started", False)
+        files = []
+        for name in ("a.js", "b.js", "c.js"):
+            (tmp_path / name).write_text("let a = 1;")
+            files.append(str(tmp_path / name))
+        with patch("post_edit.format_server_socket", return_value=str(tmp_path / "none.sock")), \
+                patch("post_edit.start_server") as mock_start, \
+                patch("post_edit.resolve_npm_tool", side_effect=lambda tool, root=None: [tool]), \
+                patch("post_edit.run_command", side_effect=lambda cmd, **kwargs: (True, kwargs.get("input") or "")):
+            typescript_batch(files)
+
+        mock_start.assert_called_once_with("format_server.py")
+
+
+class TestConfigSignature:
+    """Tests for config_signature function."""
+
+    def test_only_config_files(self, tmp_path):
+        """Test only formatter/linter config files are part of the signature."""
+        from format_server import config_signature
+
+        (tmp_path / "eslint.config.mjs").write_text("export default []")
+        (tmp_path / ".prettierrc.json").write_text("{}")
+        (tmp_path / "index.js").write_text("")
+
+        assert [name for name, _, _ in config_signature(str(tmp_path))] == [
+            ".prettierrc.json",
+            "eslint.config.mjs",
+        ]
@@ -0,0 +1,191 @@
+"""Tests for git_reader.py."""
+
+import os
+from unittest.mock import patch
+
+
+class TestFindGitDir:
+    """Tests for find_git_dir function."""
+
+    def test_not_a_repository(self, tmp_path):
+        """Test directories outside a repository return (None, None)."""
+        from git_reader import find_git_dir
+
+        assert find_git_dir(str(tmp_path)) == (None, None)
+
+    def test_gitdir_file(self, tmp_path):
+        """Test a .git file with a relative gitdir pointer is resolved."""
+        from git_reader import find_git_dir
+
+        real = tmp_path / "store" / "modules" / "sub"
+        real.mkdir(parents=True)
+        work = tmp_path / "sub"
+        work.mkdir()
+        (work / ".git").write_text("gitdir: ../store/modules/sub\n")
+
+        assert find_git_dir(str(work)) == (str(work), str(real))
+
+    def test_invalid_git_file(self, tmp_path):
+        """Test a .git file without gitdir is not treated as a repository."""
+        from git_reader import find_git_dir
+
+        (tmp_path / ".git").write_text("garbage\n")
+        assert find_git_dir(str(tmp_path)) == (None, None)
+
+
+class TestReadGitInfo:
+    """Tests for read_git_info function."""
+
+    def test_outside_repository(self, tmp_path):
+        """Test non-repository returns an empty dict."""
+        from git_reader import read_git_info
+
+        assert read_git_info(str(tmp_path)) == {}
+
+    def test_branch_and_commit(self, git_repo, git):
+        """Test branch and short SHA match git."""
+        from git_reader import read_git_info
+
+        info = read_git_info(str(git_repo / "."))
+        assert info["root"] == str(git_repo)
+        assert info["branch"] == "main"
+        assert info["detached"] is False
+        assert info["commit"] == git("rev-parse", "HEAD")[:7]
+
+    def test_packed_refs(self, git_repo, git):
+        """Test refs moved into packed-refs are still resolved."""
+        from git_reader import read_git_info
+
+        git("pack-refs", "--all")
+        assert not (git_repo / ".git" / "refs" / "heads" / "main").exists()
+        assert read_git_info(str(git_repo))["commit"] == git("rev-parse", "HEAD")[:7]
+
+    def test_unborn_branch(self, tmp_path, git):
+        """Test a fresh repository reports its branch without a commit."""
+        from git_reader import read_git_info
+
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        git("init", "-q", "-b", "trunk")
+        info = read_git_info(str(repo))
+        assert info["branch"] == "trunk"
+        assert info["commit"] is None
+
+    def test_worktree(self, git_repo, git, tmp_path):
+        """Test linked worktrees read HEAD from their own gitdir."""
+        from git_reader import read_git_info
+
+        wt = tmp_path / "wt"
+        git("worktree", "add", "-q", "-b", "feature", str(wt))
+        git("commit", "-q", "--allow-empty", "-m", "on feature", cwd=wt)
+        info = read_git_info(str(wt))
+        assert info["root"] == str(wt)
+        assert info["branch"] == "feature"
+        assert info["commit"] == git("rev-parse", "HEAD", cwd=wt)[:7]
+
+    def test_detached_lightweight_tag(self, git_repo, git):
+        """Test detached HEAD resolves a lightweight tag."""
+        from git_reader import read_git_info
+
+        git("tag", "v1")
+        git("checkout", "-q", "--detach")
+        info = read_git_info(str(git_repo))
+        assert info["detached"] is True
+        assert info["branch"] is None
+        assert info["tag"] == "v1"
+
+    def test_detached_packed_annotated_tag(self, git_repo, git):
+        """Test annotated tags are matched through peeled packed-refs lines."""
+        from git_reader import read_git_info
+
+        git("tag", "-a", "v2", "-m", "release")
+        git("pack-refs", "--all")
+        git("checkout", "-q", "--detach")
+        assert read_git_info(str(git_repo))["tag"] == "v2"
+
+    def test_detached_loose_annotated_tag(self, git_repo, git):
+        """Test loose annotated tags are peeled through their tag object."""
+        from git_reader import read_git_info
+
+        git("tag", "-a", "v3", "-m", "release")
+        git("checkout", "-q", "--detach")
+        assert read_git_info(str(git_repo))["tag"] == "v3"
+
+    def test_detached_loose_tags_with_packed_objects(self, git_repo, git):
+        """Test loose tags whose objects are packed are peeled from the pack."""
+        from git_reader import read_git_info
+
+        git("commit", "-q", "--allow-empty", "-m", "second")
+        git("tag", "-a", "v3", "-m", "release")
+        git("tag", "-a", "v4", "-m", "older", "HEAD~1")
+        git("tag", "v5", "HEAD~1")
+        git("repack", "-q", "-a", "-d")
+        git("prune-packed")
+        git("checkout", "-q", "--detach")
+        info = read_git_info(str(git_repo))
+        assert info["tag"] == "v3"
+
+        git("tag", "-d", "v3")
+        assert read_git_info(str(git_repo))["tag"] is None
+
+    def test_detached_unreadable_tag_object_needs_fallback(self, git_repo, git):
+        """Test loose tags whose object cannot be read request a git fallback."""
+        from git_reader import read_git_info
+
+        git("commit", "-q", "--allow-empty", "-m", "second")
+        git("tag", "-a", "v3", "-m", "release", "HEAD~1")
+        git("checkout", "-q", "--detach")
+        with patch("git_reader.read_object", return_value=None):
+            assert read_git_info(str(git_repo)) is None
+
+    def test_core_abbrev(self, git_repo, git):
+        """Test a numeric core.abbrev sets the short SHA length."""
+        from git_reader import read_git_info
+
+        full = git("rev-parse", "HEAD")
+        git("config", "core.abbrev", "12")
+        assert read_git_info(str(git_repo))["commit"] == full[:12]
+        git("config", "core.abbrev", "no")
+        assert read_git_info(str(git_repo))["commit"] == full
+        git("config", "core.abbrev", "auto")
+        assert read_git_info(str(git_repo))["commit"] == full[:7]
+
+    def test_git_dir_env_override(self, git_repo):
+        """Test GIT_DIR overrides request a git fallback."""
+        from git_reader import read_git_info
+
+        with patch.dict(os.environ, {"GIT_DIR": str(git_repo / ".git")}):
+            assert read_git_info(str(git_repo)) is None
+
+    def test_reftable(self, git_repo):
+        """Test reftable ref storage requests a git fallback."""
+        from git_reader import read_git_info
+
+        (git_repo / ".git" / "reftable").mkdir()
+        assert read_git_info(str(git_repo)) is None
+
+
+class TestMain:
+    """Tests for the command-line interface."""
+
+    def test_single_field(self, git_repo, capsys):
+        """Test printing a single field."""
+        from git_reader import main
+
+        assert main(["--cwd", str(git_repo), "branch"]) == 0
+        assert capsys.readouterr().out.strip() == "main"
+
+    def test_all_fields(self, git_repo, capsys):
+        """Test key=value output for all fields."""
+        from git_reader import main
+
+        assert main(["--cwd", str(git_repo)]) == 0
+        out = capsys.readouterr().out
+        assert "branch=main" in out
+        assert "detached=False" in out
+
+    def test_not_a_repository(self, tmp_path):
+        """Test exit code 1 outside a repository."""
+        from git_reader import main
+
+        assert main(["--cwd", str(tmp_path)]) == 1
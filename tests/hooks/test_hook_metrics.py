@@ -0,0 +1,224 @@
+"""Tests for hook_metrics.py and the hooks' command instrumentation."""
+
+import json
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def metrics(temp_home, monkeypatch):
+    """Enable metrics; returns a reader for the recorded entries."""
+    monkeypatch.setenv("CLAUDE_HOOK_METRICS", "1")
+    path = temp_home / ".claude" / "hook-metrics.jsonl"
+
+    def read():
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    return read
+
+
+class TestRecord:
+    """Tests for recording command timings."""
+
+    def test_disabled_by_default(self, temp_home, monkeypatch):
+        """Test nothing is written unless CLAUDE_HOOK_METRICS=1."""
+        from hook_metrics import record
+
+        monkeypatch.delenv("CLAUDE_HOOK_METRICS", raising=False)
+        record("post_edit", "handle_python", ["ruff", "check"], 0.01, 0)
+
+        assert not (temp_home / ".claude").exists()
+
+    def test_record_fields(self, metrics, tmp_path):
+        """Test a record holds the tool, runner, wall time and exit status."""
+        from hook_metrics import record
+
+        record("post_edit", "handle_python", ["/usr/bin/ruff", "check", "a.py"], 0.0421, 1, cwd=str(tmp_path))
+
+        [entry] = metrics()
+        assert entry["hook"] == "post_edit"
+        assert entry["handler"] == "handle_python"
+        assert entry["tool"] == "ruff check"
+        assert entry["runner"] == "direct"
+        assert entry["ms"] == 42.1
+        assert entry["exit"] == 1
+        assert entry["timeout"] is False
+        assert entry["cwd"] == str(tmp_path)
+
+    @pytest.mark.parametrize(
+        ("cmd", "expected"),
+        [
+            (["/usr/bin/uvx", "ruff", "format", "a.py"], ("ruff format", "uvx")),
+            (["npx", "prettier", "--write", "a.ts"], ("prettier", "npx")),
+            (["/p/node_modules/.bin/eslint", "--fix", "a.ts"], ("eslint", "local")),
+            (["/p/.venv/bin/ruff", "check", "a.py"], ("ruff check", "local")),
+            (["gofmt", "-w", "a.go"], ("gofmt", "direct")),
+            (["mypy", "."], ("mypy", "direct")),
+        ],
+    )
+    def test_describe(self, cmd, expected):
+        """Test the tool label and how it was resolved."""
+        from hook_metrics import describe
+
+        assert describe(cmd) == expected
+
+    def test_rotation(self, metrics, temp_home, monkeypatch):
+        """Test the file is rotated once it passes the size limit."""
+        from hook_metrics import record
+
+        monkeypatch.setenv("CLAUDE_HOOK_METRICS_MAX_BYTES", "1")
+        record("post_edit", None, ["ruff"], 0.01, 0)
+        record("post_edit", None, ["ruff"], 0.02, 0)
+
+        rotated = temp_home / ".claude" / "hook-metrics.jsonl.1"
+        assert json.loads(rotated.read_text())["ms"] == 20.0
+
+
+class TestInstrumentation:
+    """Tests for the hooks' run_command instrumentation."""
+
+    def test_post_edit_records_handler(self, metrics, python_file):
+        """Test post_edit records commands under the handler that ran them."""
+        import post_edit
+
+        with patch("post_edit.resolve_tool", return_value=[sys.executable, "-c", "pass"]), \
+                patch.dict(os.environ, {"CLAUDE_HOOK_CACHE": "0"}):
+            post_edit.run_group(post_edit.handle_python, [str(python_file)])
+
+        entries = metrics()
+        assert entries and all(entry["handler"] == "handle_python" for entry in entries)
+        assert all(entry["hook"] == "post_edit" and entry["exit"] == 0 for entry in entries)
+
+    def test_post_edit_records_timeout(self, metrics):
+        """Test a timed-out command is recorded with no exit code."""
+        from post_edit import run_command
+
+        ok, _ = run_command([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+
+        [entry] = metrics()
+        assert not ok
+        assert entry["timeout"] is True and entry["exit"] is None
+        assert entry["ms"] < 5000
+
+    def test_post_edit_records_missing_command(self, metrics):
+        """Test a command that cannot start is still recorded."""
+        from post_edit import run_command
+
+        run_command(["definitely-not-a-tool-xyz"])
+
+        [entry] = metrics()
+        assert entry["tool"] == "definitely-not-a-tool-xyz" and entry["exit"] is None
+
+    def test_pre_commit_records_check(self, metrics):
+        """Test pre_commit records commands under the running check."""
+        import pre_commit
+
+        with patch.object(pre_commit, "current_check", "check_linting"):
+            pre_commit.run_command([sys.executable, "-c", "raise SystemExit(3)"])
+
+        [entry] = metrics()
+        assert entry["hook"] == "pre_commit"
+        assert entry["handler"] == "check_linting"
+        assert entry["exit"] == 3
+
+    @pytest.mark.parametrize("hook", ["post_edit", "pre_commit"])
+    def test_disabled_skips_import(self, hook, monkeypatch):
+        """Test commands run with metrics off never import hook_metrics."""
+        import importlib
+
+        monkeypatch.delenv("CLAUDE_HOOK_METRICS", raising=False)
+        monkeypatch.delitem(sys.modules, "hook_metrics", raising=False)
+
+        importlib.import_module(hook).run_command([sys.executable, "-c", "pass"])
+
+        assert "hook_metrics" not in sys.modules
+
+    def test_audit_logger_records_git(self, metrics, tmp_path):
+        """Test audit_logger records its git commands."""
+        from audit_logger import run_command
+
+        run_command(["git", "--version"], cwd=str(tmp_path))
+
+        [entry] = metrics()
+        assert entry["hook"] == "audit_logger" and entry["tool"] == "git"
+
+
+def write_records(path, entries):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries) + "not json\n")
+
+
+class TestSummary:
+    """Tests for the percentile summary."""
+
+    def test_percentiles(self):
+        """Test nearest-rank p50/p95/p99 per handler and tool."""
+        from hook_metrics import summarize
+
+        records = [
+            {"hook": "post_edit", "handler": "handle_python", "tool": "ruff check", "runner": "direct",
+             "ms": float(ms), "exit": 0}
+            for ms in range(1, 101)
+        ]
+        records.append({"hook": "post_edit", "handler": "handle_go", "tool": "gofmt", "runner": "direct",
+                        "ms": 5.0, "exit": 1, "timeout": True})
+
+        python, go = summarize(records)
+
+        assert (python["p50"], python["p95"], python["p99"], python["max"]) == (50.0, 95.0, 99.0, 100.0)
+        assert python["count"] == 100 and python["failures"] == 0
+        assert (go["tool"], go["failures"], go["timeouts"]) == ("gofmt", 1, 1)
+
+    def test_main_filters(self, temp_home, capsys):
+        """Test --since and --hook select records and the rows print as JSON."""
+        import time
+
+        from hook_metrics import main
+
+        now = time.time()
+        write_records(Path(temp_home) / ".claude" / "hook-metrics.jsonl", [
+            {"ts": now - 10 * 86400, "hook": "post_edit", "handler": "handle_python", "tool": "ruff check",
+             "runner": "direct", "ms": 900.0, "exit": 0},
+            {"ts": now, "hook": "post_edit", "handler": "handle_python", "tool": "ruff check",
+             "runner": "direct", "ms": 30.0, "exit": 0},
+            {"ts": now, "hook": "pre_commit", "handler": "check_types", "tool": "mypy",
+             "runner": "direct", "ms": 4000.0, "exit": 0},
+        ])
+
+        assert main(["--since", "7d", "--hook", "post_edit", "--by", "tool", "--json"]) == 0
+
+        assert json.loads(capsys.readouterr().out) == [{
+            "tool": "ruff check", "count": 1, "p50": 30.0, "p95": 30.0, "p99": 30.0,
+            "max": 30.0, "failures": 0, "timeouts": 0,
+        }]
+
+    def test_table_slowest_first(self, temp_home, capsys):
+        """Test the table lists the slowest p95 first."""
+        from hook_metrics import main
+
+        write_records(Path(temp_home) / ".claude" / "hook-metrics.jsonl", [
+            {"ts": 1, "hook": "post_edit", "handler": "handle_python", "tool": "ruff format",
+             "runner": "local", "ms": 12.0, "exit": 0},
+            {"ts": 1, "hook": "post_edit", "handler": "handle_rust", "tool": "cargo clippy",
+             "runner": "direct", "ms": 8000.0, "exit": 0},
+        ])
+
+        main([])
+        lines = capsys.readouterr().out.splitlines()
+
+        assert lines[0].split()[:4] == ["hook", "handler", "tool", "runner"]
+        assert "cargo clippy" in lines[1] and "ruff format" in lines[2]
+
+    def test_invalid_arguments(self, temp_home, capsys):
+        """Test unknown group fields and times are rejected."""
+        from hook_metrics import main
+
+        assert main(["--by", "colour"]) == 1
+        assert main(["--since", "yesterday"]) == 1
+        assert "invalid time" in capsys.readouterr().err
@@ -0,0 +1,156 @@
+"""Cold-start budget tests for the Python hooks.
+
+Every hook runs as a fresh interpreter per tool call, so import time is paid
+on every invocation. These tests run each hook under ``python -X importtime``
+and fail when the modules it imports (beyond a bare interpreter) take longer
+than the budget, or when an early-exit path loads modules it does not need.
+
+The budget defaults to 50 ms and can be raised on slow machines with
+CLAUDE_HOOK_IMPORT_BUDGET_MS.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).parent.parent.parent / "scripts"
+HOOKS_DIR = SCRIPTS_DIR / "hooks"
+DEFAULT_BUDGET_MS = 50
+
+
+def import_budget_us():
+    try:
+        return int(float(os.environ.get("CLAUDE_HOOK_IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)) * 1000)
+    except ValueError:
+        return DEFAULT_BUDGET_MS * 1000
+
+
+def parse_importtime(stderr):
+    """Return [(module, cumulative_us)] for top-level imports in -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue  # Header line or nested import (already counted by its parent)
+        imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+@pytest.fixture
+def run_importtime(tmp_path, temp_home):
+    """Run a Python command under -X importtime with warm bytecode caches."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("CLAUDE_")}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["HOME"] = str(temp_home)
+    env.setdefault("USER", "tester")  # Login sessions always set it; minimal CI shells may not
+    env["PYTHONPYCACHEPREFIX"] = str(tmp_path / "pycache")
+
+    def run(args, stdin="", cwd=None, extra_env=None):
+        def once():
+            return subprocess.run(
+                [sys.executable, "-X", "importtime", *args],
+                input=stdin,
+                capture_output=True,
+                text=True,
+                cwd=cwd or tmp_path,
+                env={**env, **(extra_env or {})},
+                timeout=30,
+                check=False,
+            )
+
+        # The first run compiles bytecode; measure the second, as hooks run in practice
+        once()
+        baseline = {name for name, _ in parse_importtime(
+            subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "pass"],
+                capture_output=True, text=True, env=env, timeout=30, check=True,
+            ).stderr
+        )}
+        result = once()
+        imports = [(name, us) for name, us in parse_importtime(result.stderr) if name not in baseline]
+        return result, imports
+
+    return run
+
+
+def assert_within_budget(imports):
+    total = sum(us for _, us in imports)
+    slowest = ", ".join(f"{name} {us / 1000:.1f}ms" for name, us in sorted(imports, key=lambda i: -i[1])[:5])
+    assert total <= import_budget_us(), (
+        f"hook imports took {total / 1000:.1f}ms (budget {import_budget_us() / 1000:.0f}ms): {slowest}"
+    )
+
+
+def loaded_modules(result):
+    """Every module name (nested included) in -X importtime output."""
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+class TestAuditLoggerImportTime:
+    """Cold-start budget for audit_logger.py."""
+
+    HOOK_INPUT = json.dumps({"tool_input": {"command": "ls -la", "description": "List"}})
+    UNNEEDED = frozenset({"subprocess", "socket", "getpass", "traceback", "pathlib", "tempfile", "shlex", "typing"})
+
+    def test_outside_repository(self, run_importtime):
+        """Test logging outside a repository stays within the budget."""
+        result, imports = run_importtime([str(SCRIPTS_DIR / "audit_logger.py")], stdin=self.HOOK_INPUT)
+
+        assert result.returncode == 0, result.stderr
+        assert_within_budget(imports)
+        assert not loaded_modules(result) & self.UNNEEDED
+
+    def test_inside_repository(self, run_importtime, git_repo):
+        """Test logging inside a repository reads git metadata without subprocess."""
+        result, imports = run_importtime(
+            [str(SCRIPTS_DIR / "audit_logger.py")], stdin=self.HOOK_INPUT, cwd=git_repo
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert_within_budget(imports)
+        assert not loaded_modules(result) & self.UNNEEDED
+
+
+class TestPostEditImportTime:
+    """Cold-start budget for post_edit.py."""
+
+    UNNEEDED = frozenset({"subprocess", "shutil", "shlex", "traceback", "pathlib", "typing"})
+
+    @pytest.mark.parametrize(
+        "extra_env",
+        [
+            {"TOOL_USE": "Read", "FILE_PATH": "notes.md"},
+            {"TOOL_USE": "Edit", "FILE_PATH": "notes.md"},
+        ],
+    )
+    def test_early_exit(self, run_importtime, tmp_path, extra_env):
+        """Test skipped tools and unhandled file types exit before heavy imports."""
+        (tmp_path / "notes.md").write_text("# Notes\n")
+        result, imports = run_importtime([str(HOOKS_DIR / "post_edit.py")], extra_env=extra_env)
+
+        assert result.returncode == 0, result.stderr
+        assert_within_budget(imports)
+        assert not loaded_modules(result) & self.UNNEEDED
+
+
+class TestPreCommitImportTime:
+    """Import-time budget for pre_commit.py."""
+
+    def test_import(self, run_importtime):
+        """Test importing pre_commit stays within the budget."""
+        code = f"import sys; sys.path.insert(0, {str(HOOKS_DIR)!r}); import pre_commit"
+        result, imports = run_importtime(["-c", code])
+
+        assert result.returncode == 0, result.stderr
+        assert_within_budget(imports)
+        assert not loaded_modules(result) & {"typing", "shlex", "pathlib"}
@@ -0,0 +1,217 @@
+"""Tests for lint_queue.py and its post_edit client."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def projects(tmp_path):
+    """Three Python projects with one source file each."""
+    files = []
+    for name in ("one", "two", "three"):
+        root = tmp_path / name
+        root.mkdir()
+        (root / "pyproject.toml").write_text("")
+        source = root / "app.py"
+        source.write_text("x = 1\n")
+        files.append(str(source))
+    return files
+
+
+class RecordingLint:
+    """Lint stand-in recording batches and peak concurrency."""
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handler, files):
+        with self._lock:
+            self.batches.append(list(files))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.duration)
+        with self._lock:
+            self.active -= 1
+        return {path: [f"  ⚠️  lint of {os.path.basename(path)}"] for path in files}
+
+
+class TestLintQueue:
+    """Tests for debouncing and bounded workers."""
+
+    def test_burst_linted_once(self, temp_home, projects):
+        """Test repeated edits to one file within the quiet period lint it once."""
+        from lint_queue import LintQueue
+
+        lint = RecordingLint()
+        queue = LintQueue(delay=0.2, workers=2, lint=lint)
+        for _ in range(5):
+            queue.submit([projects[0]])
+            time.sleep(0.02)
+        wait_for(queue.idle)
+
+        assert lint.batches == [[projects[0]]]
+
+    def test_bounded_workers(self, temp_home, projects):
+        """Test no more than the configured number of lints run at once."""
+        from lint_queue import LintQueue
+
+        lint = RecordingLint(duration=0.1)
+        queue = LintQueue(delay=0.01, workers=1, lint=lint)
+        queue.submit(projects)
+        wait_for(lambda: len(lint.batches) == 3 and queue.idle())
+
+        assert lint.peak == 1
+        assert sorted(path for batch in lint.batches for path in batch) == sorted(projects)
+
+    def test_results_taken_once(self, temp_home, projects):
+        """Test results are handed out once and kept in the status file."""
+        import lint_queue
+
+        queue = lint_queue.LintQueue(delay=0.01, lint=RecordingLint())
+        queue.submit([projects[0]])
+        wait_for(queue.idle)
+        root = lint_queue.project_root(projects[0])
+
+        assert queue.take(root) == [{"file": projects[0], "lines": ["  ⚠️  lint of app.py"]}]
+        assert queue.take(root) == []
+        # Written after the result is handed over, outside the queue's lock
+        wait_for(Path(lint_queue.status_path(root)).exists)
+        status = json.loads(Path(lint_queue.status_path(root)).read_text())
+        assert status["files"][projects[0]]["lines"] == ["  ⚠️  lint of app.py"]
+
+    def test_new_edit_drops_stale_result(self, temp_home, projects):
+        """Test a result is not handed out once its file was edited again."""
+        import lint_queue
+
+        lint = RecordingLint()
+        queue = lint_queue.LintQueue(delay=0.01, lint=lint)
+        queue.submit([projects[0]])
+        wait_for(queue.idle)
+        queue.delay = 10
+        queue.submit([projects[0]])
+
+        assert queue.take(lint_queue.project_root(projects[0])) == []
+
+
+@pytest.fixture
+def sock_path():
+    """Short socket path (AF_UNIX paths are limited to ~104 bytes)."""
+    run_dir = Path(tempfile.mkdtemp(prefix="lint-", dir="/tmp"))
+    yield run_dir / "lint.sock"
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def server(temp_home, sock_path, monkeypatch):
+    """Run the queue in a background thread, pointing clients at it."""
+    import lint_queue
+
+    monkeypatch.setenv("CLAUDE_HOOK_LINT_QUEUE", "1")
+    with patch("post_edit.lint_queue_socket", return_value=str(sock_path)):
+        thread = threading.Thread(
+            target=lint_queue.serve,
+            kwargs={"sock_path": sock_path, "idle_timeout": 30, "delay": 0.05, "workers": 2},
+            daemon=True,
+        )
+        thread.start()
+        wait_for(sock_path.exists)
+        yield sock_path
+        lint_queue.stop()
+        thread.join(timeout=5)
+
+
+def fake_ruff(calls):
+    """run_command stand-in failing ruff check."""
+
+    def run(cmd, timeout=None, cwd=None, env=None, input=None):
+        calls.append(cmd[1])
+        if cmd[1] == "check":
+            return False, "app.py:1:1: F401 unused import"
+        return True, input or ""
+
+    return run
+
+
+class TestClient:
+    """Tests for post_edit in lint queue mode."""
+
+    def run_edit(self, path):
+        from post_edit import main
+
+        with patch.dict(os.environ, {"TOOL_USE": "Edit", "FILE_PATH": path}):
+            main()
+
+    def test_lint_deferred_and_shown_next_run(self, server, projects, capsys):
+        """Test only formatting runs in the hook and lint results appear on the next run."""
+        import lint_queue
+
+        calls = []
+        root = lint_queue.project_root(projects[0])
+        sibling = os.path.join(root, "other.py")
+        Path(sibling).write_text("y = 1\n")
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=fake_ruff(calls)):
+            self.run_edit(projects[0])
+            first = capsys.readouterr().out
+            assert calls == ["format"]
+            assert "✓ already formatted" in first and "lint queued" in first
+            wait_for(lambda: os.path.exists(lint_queue.status_path(root)))
+
+            self.run_edit(projects[1])
+            assert "background lint" not in capsys.readouterr().out  # Another project
+
+            self.run_edit(sibling)
+            out = capsys.readouterr().out
+
+        assert "app.py (background lint)" in out and "F401" in out
+
+    def test_edit_drops_pending_result(self, server, projects, capsys):
+        """Test editing a file again hides its earlier, now stale, result."""
+        import lint_queue
+
+        root = lint_queue.project_root(projects[0])
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=fake_ruff([])):
+            self.run_edit(projects[0])
+            wait_for(lambda: os.path.exists(lint_queue.status_path(root)))
+            capsys.readouterr()
+            self.run_edit(projects[0])
+
+        assert "background lint" not in capsys.readouterr().out
+
+    def run_edit_with(self, path, calls):
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=fake_ruff(calls)):
+            self.run_edit(path)
+
+    def test_unreachable_queue_lints_now(self, temp_home, projects, tmp_path, monkeypatch, capsys):
+        """Test an unreachable queue is started and the edit is linted in the foreground."""
+        monkeypatch.setenv("CLAUDE_HOOK_LINT_QUEUE", "1")
+        calls = []
+        with patch("post_edit.lint_queue_socket", return_value=str(tmp_path / "none.sock")), \
+                patch("post_edit.start_server") as mock_start:
+            self.run_edit_with(projects[0], calls)
+
+        mock_start.assert_called_once_with("lint_queue.py")
+        assert calls == ["format", "check"]
+        assert "Linting failed" in capsys.readouterr().out
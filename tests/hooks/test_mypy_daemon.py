@@ -0,0 +1,174 @@
+"""Tests for mypy_daemon.py and pre_commit's type check."""
+
+import os
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def project(temp_home, tmp_path):
+    """Project with mypy configured and dmypy in its .venv."""
+    root = tmp_path / "proj"
+    bin_dir = root / ".venv" / "bin"
+    bin_dir.mkdir(parents=True)
+    (root / ".venv" / "lib" / "python3.12" / "site-packages").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[tool.mypy]\nstrict = true\n")
+    for tool in ("dmypy", "mypy"):
+        (bin_dir / tool).write_text("#!/bin/sh\nexit 0\n")
+        (bin_dir / tool).chmod(0o755)
+    return root
+
+
+class FakeRun:
+    """run_command stand-in: dmypy run answers with output, git fails."""
+
+    def __init__(self, output="Daemon started\nSuccess: no issues found in 1 source file\n", ok=True):
+        self.output = output
+        self.ok = ok
+        self.calls = []
+
+    def __call__(self, cmd, timeout=30, cwd=None, input=None):
+        self.calls.append(cmd)
+        if cmd[0] == "git":
+            return False, "", "not a git repository"
+        if "run" in cmd:
+            return self.ok, self.output, ""
+        return True, "", ""
+
+    def subcommands(self):
+        return [cmd[3] for cmd in self.calls if "--status-file" in cmd]
+
+
+class TestCheck:
+    """Tests for running checks through the daemon."""
+
+    def test_runs_project_dmypy(self, project):
+        """Test the project's dmypy runs with a status file outside the project."""
+        import mypy_daemon
+
+        run = FakeRun()
+        success, output, _ = mypy_daemon.check(str(project), ["."], run)
+
+        [cmd] = run.calls
+        assert cmd[0] == str(project / ".venv" / "bin" / "dmypy")
+        assert cmd[1:3] == ["--status-file", mypy_daemon.status_file(str(project))]
+        assert cmd[3:6] == ["run", "--timeout", "1800"] and cmd[-2:] == ["--", "."]
+        assert str(project) not in cmd[2]
+        assert success and output == "Success: no issues found in 1 source file\n"
+
+    def test_config_change_recycles(self, project):
+        """Test a changed mypy config stops the daemon, and an unchanged one does not."""
+        import mypy_daemon
+
+        run = FakeRun()
+        mypy_daemon.check(str(project), ["."], run)
+        status = mypy_daemon.status_file(str(project))
+        Path(status).write_text("{}")
+        mypy_daemon.check(str(project), ["."], run)
+        assert run.subcommands() == ["run", "run"]
+
+        (project / "pyproject.toml").write_text("[tool.mypy]\nstrict = false\n")
+        mypy_daemon.check(str(project), ["."], run)
+
+        assert run.subcommands() == ["run", "run", "stop", "run"]
+
+    def test_environment_change_recycles(self, project):
+        """Test installing packages into the environment stops the daemon."""
+        import mypy_daemon
+
+        run = FakeRun()
+        mypy_daemon.check(str(project), ["."], run)
+        Path(mypy_daemon.status_file(str(project))).write_text("{}")
+        site_packages = project / ".venv" / "lib" / "python3.12" / "site-packages"
+        os.utime(site_packages, ns=(0, 0))
+
+        mypy_daemon.check(str(project), ["."], run)
+
+        assert run.subcommands() == ["run", "stop", "run"]
+
+    def test_type_errors_are_a_verdict(self, project):
+        """Test type errors are returned, not treated as a daemon failure."""
+        import mypy_daemon
+
+        run = FakeRun("a.py:1: error: Name 'x' is not defined  [name-defined]\nFound 1 error in 1 file\n", ok=False)
+
+        success, output, _ = mypy_daemon.check(str(project), ["a.py"], run)
+
+        assert not success and "name-defined" in output
+
+    def test_daemon_failure_falls_back(self, project):
+        """Test a daemon failure returns None and drops the status file."""
+        import mypy_daemon
+
+        status = mypy_daemon.status_file(str(project))
+        os.makedirs(os.path.dirname(status))
+        Path(status).write_text("{}")
+
+        assert mypy_daemon.check(str(project), ["."], FakeRun("", ok=False)) is None
+        assert not os.path.exists(status)
+
+    def test_no_dmypy(self, temp_home, tmp_path):
+        """Test None is returned when dmypy is not installed."""
+        import mypy_daemon
+
+        with patch("mypy_daemon.shutil.which", return_value=None):
+            assert mypy_daemon.check(str(tmp_path), ["."], FakeRun()) is None
+
+
+class TestCacheDir:
+    """Tests for the cache directory shared by worktrees."""
+
+    def test_worktrees_share_cache(self, temp_home, tmp_path):
+        """Test two worktrees of one repository get the same cache directory."""
+        import mypy_daemon
+        import pre_commit
+
+        main = tmp_path / "main"
+        main.mkdir()
+        (main / "a.py").write_text("X = 1\n")
+        for args in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "init"],
+                     ["worktree", "add", "-q", str(tmp_path / "other")]):
+            subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=main, check=True)
+        elsewhere = tmp_path / "elsewhere"
+        elsewhere.mkdir()
+
+        shared = mypy_daemon.cache_dir(str(main), pre_commit.run_command)
+
+        assert mypy_daemon.cache_dir(str(tmp_path / "other"), pre_commit.run_command) == shared
+        assert shared.startswith(str(temp_home / ".claude" / "cache" / "mypy"))
+        assert mypy_daemon.cache_dir(str(elsewhere), FakeRun()) != shared
+
+
+class TestCheckTypes:
+    """Tests for pre_commit.check_types with the daemon enabled."""
+
+    def test_falls_back_to_cold_run(self, project, monkeypatch):
+        """Test a failed daemon check reruns mypy cold with the shared cache."""
+        import pre_commit
+
+        monkeypatch.chdir(project)
+        monkeypatch.setenv("CLAUDE_PRE_COMMIT_DMYPY", "1")
+        run = FakeRun("", ok=False)
+
+        with patch("pre_commit.run_command", side_effect=run), patch("pre_commit.check_tool", return_value=False):
+            assert pre_commit.check_types() is True
+
+        cold = run.calls[-1]
+        assert cold[0] == str(project / ".venv" / "bin" / "mypy")
+        assert cold[1] == "--cache-dir" and cold[-1] == "."
+
+    def test_disabled_runs_mypy(self, project, monkeypatch):
+        """Test without CLAUDE_PRE_COMMIT_DMYPY mypy runs cold as before."""
+        import pre_commit
+
+        monkeypatch.chdir(project)
+        monkeypatch.delenv("CLAUDE_PRE_COMMIT_DMYPY", raising=False)
+        run = FakeRun()
+
+        with patch("pre_commit.run_command", side_effect=run), patch("pre_commit.check_tool", return_value=True):
+            pre_commit.check_types()
+
+        assert run.calls == [["mypy", "."]]
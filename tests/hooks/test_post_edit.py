@@ -97,29 +97,109 @@ class TestResolveTool:
     """Tests for resolve_tool function."""
 
     def test_existing_tool(self):
-        """Test existing tool returns tool name."""
+        """Test existing tool resolves to its absolute path."""
+        import shutil
+
         from post_edit import resolve_tool
 
         result = resolve_tool("python3")
-        assert result == ["python3"]
+        assert result == [shutil.which("python3")]
 
     def test_nonexistent_tool_with_uvx(self):
         """Test non-existent tool falls back to uvx if available."""
         from post_edit import resolve_tool
 
-        with patch("post_edit.has_tool") as mock_has:
-            mock_has.side_effect = lambda t: t == "uvx"
+        with patch("post_edit.find_tool") as mock_find:
+            mock_find.side_effect = lambda t: "/usr/bin/uvx" if t == "uvx" else None
             result = resolve_tool("ruff")
-            assert result == ["uvx", "ruff"]
+            assert result == ["/usr/bin/uvx", "ruff"]
 
     def test_nonexistent_tool_without_fallback(self):
         """Test non-existent tool returns empty list."""
         from post_edit import resolve_tool
 
-        with patch("post_edit.has_tool", return_value=False):
+        with patch("post_edit.find_tool", return_value=None):
             result = resolve_tool("nonexistent")
             assert result == []
 
+    def test_project_venv_preferred(self, tmp_path):
+        """Test a tool in the project's .venv wins over PATH."""
+        from post_edit import resolve_tool
+
+        ruff = tmp_path / ".venv" / "bin" / "ruff"
+        ruff.parent.mkdir(parents=True)
+        ruff.write_text("#!/bin/sh\n")
+        ruff.chmod(0o755)
+
+        with patch("post_edit.find_tool", return_value="/usr/bin/ruff"):
+            assert resolve_tool("ruff", str(tmp_path)) == [str(ruff)]
+
+    def test_node_modules_bin_in_parent(self, tmp_path):
+        """Test npm tools are found in a parent's node_modules/.bin (hoisted)."""
+        from post_edit import resolve_npm_tool
+
+        eslint = tmp_path / "node_modules" / ".bin" / "eslint"
+        eslint.parent.mkdir(parents=True)
+        eslint.write_text("#!/bin/sh\n")
+        eslint.chmod(0o755)
+        package = tmp_path / "packages" / "web"
+        package.mkdir(parents=True)
+
+        with patch("post_edit.find_tool", return_value=None):
+            assert resolve_npm_tool("eslint", str(package)) == [str(eslint)]
+
+
+class TestToolCache:
+    """Tests for the persistent tool resolution cache."""
+
+    def test_cached_resolution_reused(self, tmp_path):
+        """Test a second resolution does not search PATH again."""
+        from post_edit import resolve_npm_tool
+
+        with patch("post_edit.find_tool", side_effect=lambda t: "/usr/bin/npx" if t == "npx" else None) as mock_find:
+            assert resolve_npm_tool("prettier", str(tmp_path)) == ["/usr/bin/npx", "prettier"]
+            calls = mock_find.call_count
+            assert resolve_npm_tool("prettier", str(tmp_path)) == ["/usr/bin/npx", "prettier"]
+
+        assert mock_find.call_count == calls
+
+    def test_local_install_invalidates(self, tmp_path):
+        """Test installing the tool into the project replaces a cached npx fallback."""
+        from post_edit import resolve_npm_tool
+
+        with patch("post_edit.find_tool", side_effect=lambda t: "/usr/bin/npx" if t == "npx" else None):
+            assert resolve_npm_tool("prettier", str(tmp_path)) == ["/usr/bin/npx", "prettier"]
+            prettier = tmp_path / "node_modules" / ".bin" / "prettier"
+            prettier.parent.mkdir(parents=True)
+            prettier.write_text("#!/bin/sh\n")
+            prettier.chmod(0o755)
+            assert resolve_npm_tool("prettier", str(tmp_path)) == [str(prettier)]
+
+    def test_lockfile_change_invalidates(self, tmp_path):
+        """Test a changed lockfile resolves the tool again."""
+        from post_edit import resolve_tool
+
+        lock = tmp_path / "uv.lock"
+        lock.write_text("version = 1\n")
+        with patch("post_edit.find_tool", return_value="/usr/bin/ruff") as mock_find:
+            resolve_tool("ruff", str(tmp_path))
+            resolve_tool("ruff", str(tmp_path))
+            assert mock_find.call_count == 1
+            lock.write_text("version = 1\n# updated\n")
+            resolve_tool("ruff", str(tmp_path))
+            assert mock_find.call_count == 2
+
+    def test_path_change_misses(self, tmp_path, monkeypatch):
+        """Test entries are keyed by PATH."""
+        from post_edit import resolve_tool
+
+        with patch("post_edit.find_tool", return_value="/usr/bin/ruff") as mock_find:
+            resolve_tool("ruff", str(tmp_path))
+            monkeypatch.setenv("PATH", "/opt/bin")
+            resolve_tool("ruff", str(tmp_path))
+
+        assert mock_find.call_count == 2
+
 
 class TestFindProjectRoot:
     """Tests for find_project_root function."""
@@ -327,3 +407,396 @@ class TestExceptionHandling:
 
         captured = capsys.readouterr()
         assert "error" in captured.err.lower() or "error" in captured.out.lower()
+
+
+@pytest.fixture
+def two_projects(tmp_path):
+    """Two Python projects: a.py and b.py in one, c.py in the other."""
+    files = {}
+    for project, names in (("one", ("a.py", "b.py")), ("two", ("c.py",))):
+        root = tmp_path / project
+        root.mkdir()
+        (root / "pyproject.toml").write_text("")
+        for name in names:
+            files[name] = root / name
+            files[name].write_text("x = 1\n")
+    return files
+
+
+def recording_ruff(calls, outputs=None):
+    """run_command stand-in recording ruff invocations, failing with outputs[subcommand]."""
+    import threading
+
+    lock = threading.Lock()
+    outputs = outputs or {}
+
+    def run(cmd, timeout=None, cwd=None, input=None):
+        with lock:
+            calls.append(cmd)
+        out = outputs.get(cmd[1], "")
+        if not out and input is not None:
+            return True, input  # Already formatted
+        return not out, out
+
+    return run
+
+
+class TestRunBatch:
+    """Tests for batch mode."""
+
+    def test_one_run_per_project_root(self, two_projects, monkeypatch):
+        """Test files are checked with one ruff run per project root, and a
+        lone file is piped straight through the formatter."""
+        from post_edit import run_batch
+
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        calls = []
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=recording_ruff(calls)):
+            run_batch([str(p) for p in two_projects.values()])
+
+        formats = sorted(cmd[2:] for cmd in calls if cmd[1] == "format")
+        assert formats == [
+            ["--check", str(two_projects["a.py"]), str(two_projects["b.py"])],
+            ["--stdin-filename", str(two_projects["c.py"]), "-"],
+        ]
+
+    def test_results_reported_per_file(self, two_projects, monkeypatch, capsys):
+        """Test lint output is attributed to the file it names."""
+        from post_edit import run_batch
+
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        monkeypatch.chdir(two_projects["a.py"].parent)
+        outputs = {"check": "b.py:1:1: F401 `os` imported but unused\nFound 1 error."}
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=recording_ruff([], outputs)):
+            run_batch(["a.py", "b.py"])
+
+        out = capsys.readouterr().out
+        a_report, b_report = out.split("🔧 a.py")[1].split("🔧 b.py")
+        assert "✓ already formatted" in a_report and "Linting failed" not in a_report
+        assert "Linting failed" in b_report and "F401" in b_report
+
+    def test_unattributed_failure_fails_all(self, two_projects, monkeypatch, capsys):
+        """Test a failure naming no file is reported for every file."""
+        from post_edit import run_batch
+
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        outputs = {"format": "error: invalid pyproject.toml"}
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=recording_ruff([], outputs)):
+            run_batch([str(two_projects["a.py"]), str(two_projects["b.py"])])
+
+        assert capsys.readouterr().out.count("format failed: error: invalid pyproject.toml") == 2
+
+    def test_cached_files_skipped(self, two_projects):
+        """Test only files without a cached result are passed to the tools."""
+        from post_edit import handle_python, run_batch, run_handler
+
+        calls = []
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=recording_ruff(calls)):
+            run_handler(handle_python, str(two_projects["a.py"]))
+            calls.clear()
+            run_batch([str(two_projects["a.py"]), str(two_projects["b.py"])])
+
+        assert [cmd[2:] for cmd in calls if cmd[1] == "format"] == [["--stdin-filename", str(two_projects["b.py"]), "-"]]
+
+    def test_main_batch_arguments(self, two_projects, monkeypatch, capsys):
+        """Test main --batch handles every file and skips unsupported ones."""
+        from post_edit import main
+
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        notes = two_projects["a.py"].parent / "notes.txt"
+        notes.write_text("")
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=recording_ruff([])):
+            main(["--batch", str(two_projects["a.py"]), str(two_projects["c.py"]), str(notes)])
+
+        out = capsys.readouterr().out
+        assert "a.py" in out and "c.py" in out and "notes.txt" not in out
+
+
+class TestPathsFromInput:
+    """Tests for paths_from_input function."""
+
+    def test_hook_payload(self):
+        """Test the edited file is taken from a hook payload."""
+        from post_edit import paths_from_input
+
+        payload = '{"tool_name": "MultiEdit", "tool_input": {"file_path": "/src/a.py"}}'
+        assert paths_from_input(payload) == ["/src/a.py"]
+
+    def test_non_edit_tool_ignored(self):
+        """Test payloads for other tools yield no paths."""
+        from post_edit import paths_from_input
+
+        assert paths_from_input('{"tool_name": "Bash", "tool_input": {"command": "ls"}}') == []
+
+    def test_list_and_lines(self):
+        """Test a JSON list or one path per line is accepted."""
+        from post_edit import paths_from_input
+
+        assert paths_from_input('["a.py", "b.ts"]') == ["a.py", "b.ts"]
+        assert paths_from_input("a.py\n\nb.ts\n") == ["a.py", "b.ts"]
+
+
+# Formatter stand-in: upper-cases stdin
+UPPER = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read().upper())"]
+
+
+class TestFormatFiles:
+    """Tests for write-only-if-changed formatting."""
+
+    def test_unchanged_file_keeps_mtime(self, tmp_path):
+        """Test an already formatted file is reported and not rewritten."""
+        from post_edit import format_files
+
+        source = tmp_path / "a.py"
+        source.write_text("X = 1\n")
+        os.utime(source, ns=(1, 1))
+
+        assert format_files([str(source)], [], lambda path: UPPER) == {str(source): False}
+        assert source.stat().st_mtime_ns == 1
+
+    def test_changed_file_replaced(self, tmp_path):
+        """Test a file is rewritten in place, keeping its mode and line endings."""
+        from post_edit import format_files
+
+        source = tmp_path / "a.py"
+        source.write_bytes(b"x = 1\r\n")
+        source.chmod(0o640)
+
+        assert format_files([str(source)], [], lambda path: UPPER) == {str(source): True}
+        assert source.read_bytes() == b"X = 1\r\n"
+        assert source.stat().st_mode & 0o777 == 0o640
+        assert not list(tmp_path.glob(".a.py.*"))  # No temporary file left
+
+    def test_check_selects_files(self, tmp_path):
+        """Test with several files only those the check lists are piped through."""
+        from post_edit import format_files
+
+        a, b = tmp_path / "a.py", tmp_path / "b.py"
+        a.write_text("x = 1\n")
+        b.write_text("y = 2\n")
+        check = [sys.executable, "-c", f"print('Would reformat: {b}')"]
+        with patch("post_edit.format_via_stdin", return_value=True) as piped:
+            results = format_files([str(a), str(b)], check, lambda path: UPPER)
+
+        assert results == {str(a): False, str(b): True}
+        assert [call.args[0] for call in piped.call_args_list] == [str(b)]
+
+    def test_empty_output_never_blanks(self, tmp_path):
+        """Test a formatter printing nothing leaves the file alone."""
+        from post_edit import format_via_stdin
+
+        source = tmp_path / "a.py"
+        source.write_text("x = 1\n")
+
+        assert format_via_stdin(str(source), [sys.executable, "-c", "pass"]) == ["formatter printed nothing"]
+        assert source.read_text() == "x = 1\n"
+
+    def test_concurrent_edit_kept(self, tmp_path):
+        """Test a file edited while it was being formatted is not overwritten."""
+        from post_edit import replace_if_changed
+
+        source = tmp_path / "a.py"
+        source.write_text("x = 2\n")
+
+        with pytest.raises(ValueError):
+            replace_if_changed(str(source), "x = 1\n", "X = 1\n")
+        assert source.read_text() == "x = 2\n"
+
+
+class TestSplitOutput:
+    """Tests for split_output function."""
+
+    def test_matches_path_forms(self, tmp_path):
+        """Test lines are matched by given, absolute and cwd-relative paths."""
+        from post_edit import split_output
+
+        a, b = str(tmp_path / "src" / "a.rs"), str(tmp_path / "src" / "data.rs")
+        output = "\n".join([
+            "src/a.rs:1:1: warning: unused",
+            f"{b}:2:1: error: mismatched types",
+            "warning: 2 warnings emitted",
+        ])
+
+        by_file = split_output(output, [a, b], cwd=str(tmp_path))
+
+        assert by_file[a] == ["src/a.rs:1:1: warning: unused"]
+        assert by_file[b] == [f"{b}:2:1: error: mismatched types"]
+        assert by_file[None] == ["warning: 2 warnings emitted"]
+
+
+@pytest.fixture
+def cargo_workspace(tmp_path):
+    """Workspace with crates a and b, each with src/lib.rs."""
+    root = tmp_path / "ws"
+    (root / "crates").mkdir(parents=True)
+    (root / "Cargo.toml").write_text('[workspace]\nmembers = ["crates/a", "crates/b"]\nresolver = "2"\n')
+    for name in ("a", "b"):
+        crate = root / "crates" / name
+        (crate / "src").mkdir(parents=True)
+        (crate / "Cargo.toml").write_text(f'[package]\nname = "{name}"\nversion = "0.1.0"\nedition = "2021"\n')
+        (crate / "src" / "lib.rs").write_text("pub fn f() { let x = 1; }\n")
+    return root
+
+
+def clippy_message(file_name, message, level="warning"):
+    import json
+
+    return json.dumps({
+        "reason": "compiler-message",
+        "message": {
+            "level": level,
+            "message": message,
+            "spans": [{"file_name": file_name, "is_primary": True, "line_start": 1, "column_start": 18}],
+        },
+    })
+
+
+def fake_cargo(workspace, calls, clippy_output="", clippy_ok=True):
+    """run_command stand-in answering cargo metadata/fmt/clippy."""
+    import json
+
+    metadata = json.dumps({
+        "workspace_root": str(workspace),
+        "packages": [
+            {"name": name, "manifest_path": str(workspace / "crates" / name / "Cargo.toml"), "edition": "2021"}
+            for name in ("a", "b")
+        ],
+    })
+
+    def run(cmd, timeout=None, cwd=None, env=None, input=None):
+        calls.append((cmd, env))
+        if cmd[0] == "rustfmt":
+            return True, input or ""
+        if cmd[1] == "metadata":
+            return True, metadata
+        if cmd[1] == "clippy":
+            return clippy_ok, clippy_output
+        return True, ""
+
+    return run
+
+
+class TestRustClippy:
+    """Tests for scoped clippy in rust_batch."""
+
+    def run(self, workspace, files, calls, **kwargs):
+        from post_edit import rust_batch
+
+        with patch("post_edit.has_tool", return_value=True), \
+                patch("post_edit.run_command", side_effect=fake_cargo(workspace, calls, **kwargs)):
+            return rust_batch([str(f) for f in files])
+
+    def test_scoped_to_owning_crate(self, cargo_workspace):
+        """Test clippy checks only the crate owning the edited file."""
+        calls = []
+        self.run(cargo_workspace, [cargo_workspace / "crates" / "a" / "src" / "lib.rs"], calls)
+
+        clippy = next(cmd for cmd, _ in calls if cmd[1] == "clippy")
+        assert clippy[clippy.index("-p") + 1] == "a"
+        assert "--message-format=json" in clippy
+        assert "--all-targets" not in clippy
+
+    def test_tests_dir_checks_all_targets(self, cargo_workspace):
+        """Test a file outside src/ (integration test) checks all targets."""
+        test_file = cargo_workspace / "crates" / "b" / "tests" / "it.rs"
+        test_file.parent.mkdir()
+        test_file.write_text("")
+        calls = []
+        self.run(cargo_workspace, [test_file], calls)
+
+        clippy = next(cmd for cmd, _ in calls if cmd[1] == "clippy")
+        assert "b" in clippy and "--all-targets" in clippy
+
+    def test_diagnostics_matched_on_span_path(self, cargo_workspace):
+        """Test diagnostics are reported for the file of their primary span only."""
+        a = cargo_workspace / "crates" / "a" / "src" / "lib.rs"
+        b = cargo_workspace / "crates" / "b" / "src" / "lib.rs"
+        output = "\n".join([
+            clippy_message("crates/b/src/lib.rs", "unused variable: `x`"),
+            clippy_message("crates/b/src/lib.rs", "needless return"),
+        ])
+
+        report = self.run(cargo_workspace, [a, b], [], clippy_output=output)
+
+        assert report[str(a)] == ["  ✓ rustfmt (already formatted)"]
+        assert report[str(b)][-1] == "  ⚠️  crates/b/src/lib.rs:1:18: warning: unused variable: `x` (+1 more)"
+
+    def test_failure_elsewhere_reports_first_error(self, cargo_workspace):
+        """Test a failed build with no diagnostic for the file reports the first error."""
+        a = cargo_workspace / "crates" / "a" / "src" / "lib.rs"
+        output = clippy_message("crates/a/src/other.rs", "mismatched types", level="error")
+
+        report = self.run(cargo_workspace, [a], [], clippy_output=output, clippy_ok=False)
+
+        assert report[str(a)][-1] == "  ⚠️  crates/a/src/other.rs:1:18: error: mismatched types"
+
+    def test_rustfmt_only_edited_files(self, cargo_workspace):
+        """Test rustfmt formats just the edited file, with its crate's edition."""
+        lib = cargo_workspace / "crates" / "a" / "src" / "lib.rs"
+        calls = []
+        self.run(cargo_workspace, [lib], calls)
+
+        [rustfmt] = [cmd for cmd, _ in calls if cmd[0] == "rustfmt"]
+        assert rustfmt[rustfmt.index("--edition") + 1] == "2021"
+        assert not any(cmd[:2] == ["cargo", "fmt"] for cmd, _ in calls)
+
+    def test_metadata_cached(self, cargo_workspace):
+        """Test cargo metadata runs again only after a manifest changes."""
+        lib = cargo_workspace / "crates" / "a" / "src" / "lib.rs"
+        calls = []
+        self.run(cargo_workspace, [lib], calls)
+        self.run(cargo_workspace, [lib], calls)
+        assert [cmd[1] for cmd, _ in calls].count("metadata") == 1
+
+        (cargo_workspace / "crates" / "a" / "Cargo.toml").write_text('[package]\nname = "a"\nversion = "0.2.0"\n')
+        self.run(cargo_workspace, [lib], calls)
+        assert [cmd[1] for cmd, _ in calls].count("metadata") == 2
+
+    def test_shared_target_dir(self, cargo_workspace, monkeypatch):
+        """Test clippy builds into the shared target directory."""
+        from post_edit import cargo_target_dir
+
+        monkeypatch.delenv("CARGO_TARGET_DIR", raising=False)
+        monkeypatch.delenv("CLAUDE_HOOK_CARGO_TARGET_DIR", raising=False)
+        calls = []
+        self.run(cargo_workspace, [cargo_workspace / "crates" / "a" / "src" / "lib.rs"], calls)
+
+        env = next(env for cmd, env in calls if cmd[1] == "clippy")
+        assert env == {"CARGO_TARGET_DIR": cargo_target_dir(str(cargo_workspace))}
+
+
+class TestCargoTargetDir:
+    """Tests for cargo_target_dir function."""
+
+    def test_shared_across_worktrees(self, tmp_path, monkeypatch):
+        """Test a linked worktree uses the main checkout's target directory."""
+        from post_edit import cargo_target_dir
+
+        monkeypatch.delenv("CARGO_TARGET_DIR", raising=False)
+        monkeypatch.delenv("CLAUDE_HOOK_CARGO_TARGET_DIR", raising=False)
+        main = tmp_path / "main"
+        worktree_git = main / ".git" / "worktrees" / "feature"
+        worktree_git.mkdir(parents=True)
+        (worktree_git / "commondir").write_text("../..\n")
+        feature = tmp_path / "feature"
+        feature.mkdir()
+        (feature / ".git").write_text(f"gitdir: {worktree_git}\n")
+        (tmp_path / "other" / ".git").mkdir(parents=True)
+
+        assert cargo_target_dir(str(feature)) == cargo_target_dir(str(main))
+        assert cargo_target_dir(str(tmp_path / "other")) != cargo_target_dir(str(main))
+
+    def test_explicit_target_dir_respected(self, tmp_path, monkeypatch):
+        """Test CARGO_TARGET_DIR and CLAUDE_HOOK_CARGO_TARGET_DIR=0 leave cargo's choice."""
+        from post_edit import cargo_target_dir
+
+        monkeypatch.setenv("CARGO_TARGET_DIR", "/tmp/target")
+        assert cargo_target_dir(str(tmp_path)) is None
+        monkeypatch.delenv("CARGO_TARGET_DIR")
+        monkeypatch.setenv("CLAUDE_HOOK_CARGO_TARGET_DIR", "0")
+        assert cargo_target_dir(str(tmp_path)) is None
@@ -0,0 +1,345 @@
+"""Tests for pre_commit.py."""
+
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(temp_home, tmp_path, monkeypatch):
+    """Git repository with one committed module, as the working directory."""
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'repo'\n\n[tool.ruff]\nline-length = 100\n")
+    (root / "pkg" / "old.py").write_text("VALUE = 1\n")
+    git(root, "init", "-q")
+    git(root, "-c", "user.name=t", "-c", "user.email=t@t", "add", ".")
+    git(root, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    monkeypatch.chdir(root)
+    monkeypatch.delenv("CLAUDE_PRE_COMMIT_STAGED", raising=False)
+    return root
+
+
+def recording_run(calls):
+    """run_command stand-in recording ruff/mypy calls and running git."""
+    import pre_commit
+
+    real = pre_commit.run_command
+
+    def run(cmd, timeout=30, cwd=None, input=None):
+        if cmd[0] == "git":
+            return real(cmd, timeout, cwd, input)
+        calls.append((cmd, cwd))
+        return True, "", ""
+
+    return run
+
+
+class TestStagedMode:
+    """Tests for checking only the staged files."""
+
+    def test_checks_staged_files_only(self, repo):
+        """Test ruff runs on the staged files and not the whole tree."""
+        import pre_commit
+
+        (repo / "pkg" / "new.py").write_text("NEW = 2\n")
+        (repo / "pkg" / "unstaged.py").write_text("X = 3\n")
+        git(repo, "add", "pkg/new.py")
+        calls = []
+
+        with patch("pre_commit.run_command", side_effect=recording_run(calls)), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]):
+            assert pre_commit.main(["--staged"]) == 0
+
+        # Checks may run concurrently: compare regardless of order
+        ruff = sorted(cmd for cmd, _ in calls if cmd[0] == "ruff")
+        assert ruff == [
+            ["ruff", "check", "--force-exclude", "pkg/new.py"],
+            ["ruff", "format", "--check", "--force-exclude", "pkg/new.py"],
+        ]
+        assert pre_commit.staged is None
+
+    def test_reads_staged_content(self, repo):
+        """Test ruff sees the staged blob and config, not the working copy."""
+        import pre_commit
+
+        (repo / "pkg" / "old.py").write_text("VALUE = 'staged'\n")
+        git(repo, "add", "pkg/old.py")
+        (repo / "pkg" / "old.py").write_text("VALUE = 'working copy'\n")
+        seen = {}
+
+        def run(cmd, timeout=30, cwd=None, input=None):
+            if cmd[0] == "git":
+                return real(cmd, timeout, cwd, input)
+            if cmd[:2] == ["ruff", "check"]:
+                seen["source"] = Path(cwd, "pkg", "old.py").read_text()
+                seen["config"] = Path(cwd, "pyproject.toml").read_text()
+            return True, "", ""
+
+        real = pre_commit.run_command
+        with patch("pre_commit.run_command", side_effect=run), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]):
+            pre_commit.main(["--staged"])
+
+        assert seen["source"] == "VALUE = 'staged'\n"
+        assert "line-length = 100" in seen["config"]
+
+    def test_no_staged_python_files(self, repo, capsys):
+        """Test nothing runs when no Python file is staged."""
+        import pre_commit
+
+        (repo / "README.md").write_text("# repo\n")
+        git(repo, "add", "README.md")
+        calls = []
+
+        with patch("pre_commit.run_command", side_effect=recording_run(calls)):
+            assert pre_commit.main(["--staged"]) == 0
+
+        assert calls == []
+        assert "No staged Python files" in capsys.readouterr().out
+
+    def test_deleted_files_skipped(self, repo, monkeypatch):
+        """Test staged deletions are not checked, and the env var enables the mode."""
+        import pre_commit
+
+        git(repo, "rm", "-q", "pkg/old.py")
+        monkeypatch.setenv("CLAUDE_PRE_COMMIT_STAGED", "1")
+        calls = []
+
+        with patch("pre_commit.run_command", side_effect=recording_run(calls)):
+            assert pre_commit.main([]) == 0
+
+        assert calls == []
+
+    def test_mypy_runs_in_working_tree(self, repo):
+        """Test mypy checks the staged paths from the repository root."""
+        import pre_commit
+
+        (repo / "pkg" / "new.py").write_text("NEW = 2\n")
+        git(repo, "add", "pkg/new.py")
+        calls = []
+
+        with patch("pre_commit.run_command", side_effect=recording_run(calls)), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]), \
+                patch("pre_commit.check_tool", return_value=True):
+            pre_commit.main(["--staged"])
+
+        assert (["mypy", "pkg/new.py"], str(repo)) in calls
+
+    def test_security_scans_staged_content(self, repo, capsys):
+        """Test the secret scan reports staged secrets by repository path."""
+        import pre_commit
+
+        (repo / "pkg" / "old.py").write_text('api_key = "sk-live-123"\n')
+        git(repo, "add", "pkg/old.py")
+        (repo / "pkg" / "old.py").write_text("VALUE = 1\n")
+
+        with patch("pre_commit.run_command", side_effect=recording_run([])), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]):
+            pre_commit.main(["--staged"])
+
+        assert "pkg/old.py:1: api_key" in capsys.readouterr().out
+
+    def test_outside_repository_checks_whole_tree(self, temp_home, tmp_path, monkeypatch):
+        """Test staged mode falls back to the full check outside a repository."""
+        import pre_commit
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+        calls = []
+
+        with patch("pre_commit.run_command", side_effect=recording_run(calls)), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]):
+            assert pre_commit.main(["--staged"]) == 0
+
+        assert ["ruff", "check", "."] in [cmd for cmd, _ in calls]
+
+
+class TestSecurityFiles:
+    """Tests for the files and blob SHAs the security check scans."""
+
+    def test_git_python_files(self, repo):
+        """Test tracked files keep their index SHA unless changed, untracked
+        ones are hashed, and ignored or deleted ones are left out."""
+        import pre_commit
+
+        (repo / "pkg" / "clean.py").write_text("CLEAN = 1\n")
+        (repo / "pkg" / "gone.py").write_text("GONE = 1\n")
+        git(repo, "add", "pkg")
+        (repo / "pkg" / "old.py").write_text("VALUE = 2\n")
+        (repo / "pkg" / "gone.py").unlink()
+        (repo / ".gitignore").write_text("generated.py\n")
+        (repo / "generated.py").write_text("token = 'x'\n")
+        (repo / "new.py").write_text("NEW = 1\n")
+        index = subprocess.run(
+            ["git", "rev-parse", ":pkg/clean.py"], cwd=repo, capture_output=True, text=True, check=True
+        )
+
+        files = dict(pre_commit.git_python_files())
+
+        assert files == {"pkg/clean.py": index.stdout.strip(), "pkg/old.py": None, "new.py": None}
+
+    def test_outside_repository(self, temp_home, tmp_path, monkeypatch):
+        """Test None is returned outside a repository."""
+        import pre_commit
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+
+        assert pre_commit.git_python_files() is None
+
+    def test_staged_blobs(self, repo):
+        """Test staged mode scans by the staged blob SHA."""
+        import pre_commit
+
+        (repo / "pkg" / "old.py").write_text("VALUE = 2\n")
+        git(repo, "add", "pkg/old.py")
+        index = subprocess.run(
+            ["git", "rev-parse", ":pkg/old.py"], cwd=repo, capture_output=True, text=True, check=True
+        )
+        scanned = []
+
+        def scan_cached(items):
+            scanned.extend(items)
+            return []
+
+        with patch("pre_commit.run_command", side_effect=recording_run([])), \
+                patch("pre_commit.resolve_tool", return_value=["ruff"]), \
+                patch("secret_scan.scan_cached", side_effect=scan_cached):
+            pre_commit.main(["--staged"])
+
+        [(name, _, sha)] = scanned
+        assert (name, sha) == ("pkg/old.py", index.stdout.strip())
+
+
+def fake_check(name, result=True, before=None):
+    """Check stand-in printing its name, after calling before()."""
+
+    def check():
+        if before is not None:
+            before()
+        print(f"{name} output")
+        return result
+
+    check.__name__ = f"check_{name.lower()}"
+    return check
+
+
+class TestConcurrentChecks:
+    """Tests for running the checks concurrently."""
+
+    def test_concurrent_output_in_order(self, capsys):
+        """Test all checks run at once and print in their usual order."""
+        import threading
+
+        import pre_commit
+
+        barrier = threading.Barrier(4, timeout=5)
+        with patch("pre_commit.check_formatting", fake_check("Formatting", before=barrier.wait)), \
+                patch("pre_commit.check_linting", fake_check("Linting", before=barrier.wait)), \
+                patch("pre_commit.check_types", fake_check("Types", before=barrier.wait)), \
+                patch("pre_commit.check_security", fake_check("Security", before=barrier.wait)):
+            assert pre_commit.run_checks(jobs=4) == 0
+
+        out = capsys.readouterr().out
+        positions = [out.index(f"{name} output") for name in ("Formatting", "Linting", "Types", "Security")]
+        assert positions == sorted(positions)
+        assert not isinstance(__import__("sys").stdout, pre_commit.ThreadOutput)
+
+    def test_fail_fast_kills_running_check(self, capsys):
+        """Test a failure cancels the others and kills their commands."""
+        import sys
+        import threading
+        import time
+
+        import pre_commit
+
+        started = threading.Event()
+
+        def slow_types():
+            started.set()
+            ok, _, _ = pre_commit.run_command([sys.executable, "-c", "import time; time.sleep(30)"], timeout=60)
+            print("Types output")
+            return ok
+
+        begin = time.monotonic()
+        with patch("pre_commit.check_formatting", fake_check("Formatting", False, before=lambda: started.wait(5))), \
+                patch("pre_commit.check_linting", fake_check("Linting")), \
+                patch("pre_commit.check_types", slow_types), \
+                patch("pre_commit.check_security", fake_check("Security")):
+            assert pre_commit.run_checks(jobs=2, fail_fast=True) == 1
+
+        out = capsys.readouterr().out
+        assert time.monotonic() - begin < 10
+        assert "Failed: Formatting\n" in out
+        # Linting ran to completion in the second slot before Types started
+        assert "Linting output" in out
+        assert "Cancelled (fail-fast): Types, Security" in out
+        assert "Types output" not in out
+        assert not pre_commit.cancelled.is_set()
+
+    def test_serial_fail_fast(self, capsys):
+        """Test one job runs the checks in turn and stops at a failure."""
+        import pre_commit
+
+        with patch("pre_commit.check_formatting", fake_check("Formatting")), \
+                patch("pre_commit.check_linting", fake_check("Linting", False)), \
+                patch("pre_commit.check_types", fake_check("Types")), \
+                patch("pre_commit.check_security", fake_check("Security")):
+            assert pre_commit.run_checks(jobs=1, fail_fast=True) == 1
+
+        out = capsys.readouterr().out
+        assert "Formatting output" in out and "Types output" not in out
+        assert "Cancelled (fail-fast): Types, Security" in out
+
+    def test_failures_without_fail_fast(self, capsys):
+        """Test every check runs and each failure is reported."""
+        import pre_commit
+
+        with patch("pre_commit.check_formatting", fake_check("Formatting", False)), \
+                patch("pre_commit.check_linting", fake_check("Linting")), \
+                patch("pre_commit.check_types", fake_check("Types", False)), \
+                patch("pre_commit.check_security", fake_check("Security")):
+            assert pre_commit.run_checks(jobs=4) == 1
+
+        out = capsys.readouterr().out
+        assert "Failed: Formatting, Types" in out and "Security output" in out
+
+    def test_jobs_setting(self, monkeypatch):
+        """Test --jobs, then CLAUDE_PRE_COMMIT_JOBS, then the CPU count."""
+        import os
+
+        from pre_commit import parse_args
+
+        monkeypatch.setenv("CLAUDE_PRE_COMMIT_JOBS", "3")
+        assert parse_args(["--jobs", "2"]).jobs == 2
+        assert parse_args([]).jobs == 3
+        monkeypatch.setenv("CLAUDE_PRE_COMMIT_JOBS", "many")
+        assert parse_args([]).jobs == (os.cpu_count() or 1)
+
+
+class TestInstallation:
+    """Tests for running pre_commit.py as a git hook."""
+
+    def test_copied_hook_explains_symlink(self, tmp_path):
+        """Test a copy without its sibling modules fails with install instructions."""
+        import shutil
+        import sys
+        from pathlib import Path
+
+        hook = tmp_path / "pre-commit"
+        shutil.copy(Path(__file__).resolve().parents[2] / "scripts" / "hooks" / "pre_commit.py", hook)
+
+        result = subprocess.run(
+            [sys.executable, str(hook)], cwd=tmp_path, capture_output=True, text=True, check=False
+        )
+
+        assert result.returncode == 1
+        assert "cannot find post_edit.py" in result.stderr
+        assert "ln -sf" in result.stderr
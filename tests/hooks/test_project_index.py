@@ -0,0 +1,160 @@
+"""Tests for project_index.py."""
+
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def project(temp_home, tmp_path):
+    """Project root with a nested source directory."""
+    root = tmp_path / "proj"
+    nested = root / "src" / "pkg"
+    nested.mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[project]\nname = 'proj'\n")
+    return root
+
+
+class TestFindRoot:
+    """Tests for find_root function."""
+
+    def test_cached_lookup_skips_walk(self, project):
+        """Test a second lookup checks no markers."""
+        import project_index
+
+        nested = str(project / "src" / "pkg")
+        assert project_index.find_root(nested) == str(project)
+        with patch("project_index.os.path.exists") as mock_exists:
+            assert project_index.find_root(nested) == str(project)
+        mock_exists.assert_not_called()
+
+    def test_new_marker_between_refreshes(self, project):
+        """Test creating a marker below the old root moves the root."""
+        import project_index
+
+        nested = project / "src" / "pkg"
+        assert project_index.find_root(str(nested)) == str(project)
+        (project / "src" / "package.json").write_text("{}")
+
+        assert project_index.find_root(str(nested)) == str(project / "src")
+
+    def test_removed_marker_refreshes(self, project, tmp_path):
+        """Test removing the root's marker is noticed."""
+        import project_index
+
+        nested = str(project / "src")
+        project_index.find_root(nested)
+        (project / "pyproject.toml").unlink()
+
+        assert project_index.find_root(nested) != str(project)
+
+    def test_index_bounded(self, project, monkeypatch):
+        """Test the directory index keeps at most MAX_DIRS entries."""
+        import project_index
+
+        monkeypatch.setattr(project_index, "MAX_DIRS", 2)
+        for directory in (project, project / "src", project / "src" / "pkg"):
+            project_index.find_root(str(directory))
+
+        assert list(project_index.load()["dirs"]) == [str(project / "src"), str(project / "src" / "pkg")]
+
+
+class TestProfile:
+    """Tests for project profiles and cached values."""
+
+    def test_toolchains_and_configs(self, project):
+        """Test the profile lists markers, configs and implied toolchains."""
+        import project_index
+
+        (project / "Cargo.toml").write_text("[package]\n")
+        (project / "ruff.toml").write_text("")
+        profile = project_index.profile(str(project))
+
+        assert profile["markers"] == ["pyproject.toml", "Cargo.toml"]
+        assert list(profile["configs"]) == ["ruff.toml"]
+        assert profile["toolchains"] == ["python", "rust"]
+
+    def test_config_change_refreshes(self, project):
+        """Test a changed config file refreshes the profile and drops cached values."""
+        import project_index
+
+        project_index.store(str(project), "ruff", ["/usr/bin/ruff"], [])
+        assert project_index.lookup(str(project), "ruff") == ["/usr/bin/ruff"]
+
+        (project / "ruff.toml").write_text("line-length = 100\n")
+
+        assert project_index.lookup(str(project), "ruff") is None
+        assert "ruff.toml" in project_index.profile(str(project))["configs"]
+
+    def test_projects_bounded(self, tmp_path, temp_home, monkeypatch):
+        """Test the project map keeps at most MAX_PROJECTS entries, oldest dropped first."""
+        import project_index
+
+        monkeypatch.setattr(project_index, "MAX_PROJECTS", 2)
+        roots = [tmp_path / name for name in ("a", "b", "c")]
+        for root in roots:
+            root.mkdir()
+            project_index.store(str(root), "ruff", ["ruff"], [])
+
+        assert list(project_index.load()["projects"]) == [str(roots[1]), str(roots[2])]
+
+    def test_parallel_writers_keep_all_updates(self, project):
+        """Test stores from concurrent processes are not lost."""
+        import project_index
+
+        script = (
+            "import sys, project_index\n"
+            "for i in range(20):\n"
+            "    project_index.store(sys.argv[1], f'{sys.argv[2]}-{i}', i, [])\n"
+        )
+        hooks_dir = Path(project_index.__file__).parent
+        procs = [
+            subprocess.Popen([sys.executable, "-c", script, str(project), f"tool{n}"], cwd=hooks_dir)
+            for n in range(4)
+        ]
+        for proc in procs:
+            assert proc.wait(timeout=60) == 0
+
+        project_index._loaded = (None, None)
+        for n in range(4):
+            for i in range(20):
+                assert project_index.lookup(str(project), f"tool{n}-{i}") == i
+
+    def test_persisted_across_processes(self, project):
+        """Test the index is read back from disk."""
+        import project_index
+
+        project_index.find_root(str(project / "src"))
+        project_index._loaded = (None, None)
+        with patch("project_index.os.path.exists") as mock_exists:
+            assert project_index.find_root(str(project / "src")) == str(project)
+        mock_exists.assert_not_called()
+
+
+class TestPreCommit:
+    """Tests for pre_commit's use of the index."""
+
+    def test_shares_post_edit_tool_resolution(self, project, monkeypatch):
+        """Test pre_commit reuses the command post_edit resolved for the project."""
+        import post_edit
+        import pre_commit
+
+        monkeypatch.chdir(project)
+        with patch("post_edit.find_tool", return_value="/opt/ruff/bin/ruff"):
+            post_edit.resolve_tool("ruff", str(project))
+        with patch("post_edit.find_tool") as mock_find:
+            assert pre_commit.resolve_tool("ruff") == ["/opt/ruff/bin/ruff"]
+        mock_find.assert_not_called()
+
+    def test_mypy_config_from_profile(self, project, monkeypatch):
+        """Test check_types finds the mypy configuration through the profile."""
+        import pre_commit
+
+        monkeypatch.chdir(project / "src")
+        with patch("pre_commit.check_tool", return_value=True), \
+                patch("pre_commit.run_command", return_value=(True, "", "")) as mock_run:
+            assert pre_commit.check_types() is True
+        mock_run.assert_called_once()
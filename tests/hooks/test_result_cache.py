@@ -0,0 +1,249 @@
+"""Tests for result_cache.py and post_edit.run_handler."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def project(temp_home, tmp_path):
+    """Python project with one source file."""
+    root = tmp_path / "proj"
+    root.mkdir()
+    (root / "pyproject.toml").write_text("[tool.ruff]\nline-length = 100\n")
+    source = root / "app.py"
+    source.write_text("x = 1\n")
+    return root
+
+
+def fake_ruff(outputs):
+    """run_command stand-in recording ruff invocations; files are already formatted."""
+
+    def run(cmd, timeout=None, cwd=None, input=None):
+        outputs.append(cmd[1])
+        return True, input or ""
+
+    return run
+
+
+class TestRunHandler:
+    """Tests for caching handler results."""
+
+    def run(self, source, calls):
+        from post_edit import handle_python, run_handler
+
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=fake_ruff(calls)):
+            run_handler(handle_python, str(source))
+
+    def test_unchanged_file_replays(self, project, capsys):
+        """Test a second run on identical content replays without running tools."""
+        calls = []
+        self.run(project / "app.py", calls)
+        first = capsys.readouterr().out
+
+        self.run(project / "app.py", calls)
+        second = capsys.readouterr().out
+
+        assert calls == ["format", "check"]
+        assert "✓ already formatted" in first
+        assert second.startswith(first)
+        assert "cached" in second
+
+    def test_content_change_misses(self, project):
+        """Test changed content runs the handler again."""
+        calls = []
+        self.run(project / "app.py", calls)
+        (project / "app.py").write_text("x = 2\n")
+        self.run(project / "app.py", calls)
+
+        assert calls == ["format", "check"] * 2
+
+    def test_config_change_misses(self, project):
+        """Test a changed config file runs the handler again."""
+        calls = []
+        self.run(project / "app.py", calls)
+        (project / "pyproject.toml").write_text("[tool.ruff]\nline-length = 80\n")
+        self.run(project / "app.py", calls)
+
+        assert len(calls) == 4
+
+    def test_tool_change_misses(self, project, tmp_path):
+        """Test a different tool executable runs the handler again."""
+        calls = []
+        ruff = tmp_path / "bin" / "ruff"
+        ruff.parent.mkdir()
+        ruff.write_text("#!/bin/sh\n")
+        ruff.chmod(0o755)
+        with patch.dict(os.environ, {"PATH": str(ruff.parent)}):
+            self.run(project / "app.py", calls)
+            ruff.write_text("#!/bin/sh\n# upgraded\n")
+            self.run(project / "app.py", calls)
+
+        assert len(calls) == 4
+
+    def test_timeout_not_cached(self, project):
+        """Test results of timed-out commands are not replayed."""
+        import post_edit
+
+        def timed_out(cmd, timeout=None, cwd=None, input=None):
+            post_edit._mark_incomplete()
+            return False, "Command timed out"
+
+        calls = []
+        for _ in range(2):
+            with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                    patch("post_edit.run_command", side_effect=timed_out) as run:
+                post_edit.run_handler(post_edit.handle_python, str(project / "app.py"))
+            calls.append(run.call_count)
+
+        assert calls == [2, 2]
+
+    def test_queued_check_keeps_format_entry(self, project):
+        """Test the lint queue's check run does not evict the format step's entry."""
+        from post_edit import CHECK, FORMAT, handle_python, run_group
+
+        calls = []
+        source = str(project / "app.py")
+        with patch("post_edit.resolve_tool", return_value=["ruff"]), \
+                patch("post_edit.run_command", side_effect=fake_ruff(calls)):
+            run_group(handle_python, [source], steps=(FORMAT,))
+            run_group(handle_python, [source], steps=(CHECK,))
+            report = run_group(handle_python, [source], steps=(FORMAT,))
+
+        assert calls == ["format", "check"]
+        assert "cached" in report[source][-1]
+
+    def test_disabled(self, project, monkeypatch):
+        """Test CLAUDE_HOOK_CACHE=0 always runs the handler."""
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        calls = []
+        self.run(project / "app.py", calls)
+        self.run(project / "app.py", calls)
+
+        assert len(calls) == 4
+
+
+class TestStore:
+    """Tests for the cache table."""
+
+    def test_lru_eviction(self, temp_home):
+        """Test least recently used entries are evicted over the limit."""
+        import result_cache
+
+        conn = result_cache.connect()
+        try:
+            for name in ("a", "b", "c"):
+                result_cache.store(conn, name, f"/src/{name}.py", name, limit=2)
+            assert result_cache.lookup(conn, "a") is None
+            # Touch b so c becomes the oldest
+            assert result_cache.lookup(conn, "b") == "b"
+            result_cache.store(conn, "d", "/src/d.py", "d", limit=2)
+            assert result_cache.lookup(conn, "c") is None
+            assert result_cache.lookup(conn, "b") == "b"
+        finally:
+            conn.close()
+
+    def test_one_entry_per_file(self, temp_home):
+        """Test only a file's latest result is kept."""
+        import result_cache
+
+        conn = result_cache.connect()
+        try:
+            result_cache.store(conn, "old", "/src/a.py", "old")
+            result_cache.store(conn, "new", "/src/a.py", "new")
+            assert result_cache.lookup(conn, "old") is None
+            assert result_cache.lookup(conn, "new") == "new"
+        finally:
+            conn.close()
+
+    def test_one_entry_per_file_and_handler(self, temp_home):
+        """Test a file's results for different handlers are kept side by side."""
+        import result_cache
+
+        conn = result_cache.connect()
+        try:
+            result_cache.store(conn, "format", "/src/a.py", "f", handler="python:format")
+            result_cache.store(conn, "check", "/src/a.py", "c", handler="python:check")
+            assert result_cache.lookup(conn, "format") == "f"
+            assert result_cache.lookup(conn, "check") == "c"
+        finally:
+            conn.close()
+
+    def test_old_schema_replaced(self, temp_home):
+        """Test a table from before the handler column is dropped and recreated."""
+        import sqlite3
+
+        import result_cache
+
+        path = result_cache.cache_path()
+        os.makedirs(os.path.dirname(path))
+        old = sqlite3.connect(path)
+        old.execute("CREATE TABLE results (key TEXT PRIMARY KEY, path TEXT, output TEXT, last_used REAL)")
+        old.execute("INSERT INTO results VALUES ('k', '/src/a.py', 'out', 0)")
+        old.commit()
+        old.close()
+
+        conn = result_cache.connect()
+        try:
+            assert result_cache.lookup(conn, "k") is None
+            result_cache.store(conn, "k", "/src/a.py", "new", handler="h")
+            assert result_cache.lookup(conn, "k") == "new"
+        finally:
+            conn.close()
+
+
+class TestConfigDigest:
+    """Tests for config_digest function."""
+
+    def test_prefix_patterns_and_ancestors(self, tmp_path):
+        """Test matching configs in ancestor directories up to root are hashed."""
+        from result_cache import config_digest
+
+        nested = tmp_path / "pkg" / "src"
+        nested.mkdir(parents=True)
+        source = nested / "a.ts"
+        source.write_text("")
+        before = config_digest(str(source), (".eslintrc*",), root=str(tmp_path))
+
+        (tmp_path / ".eslintrc.json").write_text("{}")
+        after = config_digest(str(source), (".eslintrc*",), root=str(tmp_path))
+        (tmp_path / "unrelated.json").write_text("{}")
+
+        assert before != after
+        assert config_digest(str(source), (".eslintrc*",), root=str(tmp_path)) == after
+
+
+class TestTreeSignature:
+    """Tests for tree_signature function."""
+
+    def test_excludes_edited_file(self, tmp_path):
+        """Test the edited file counts neither in the total nor the newest mtime."""
+        from result_cache import tree_signature
+
+        (tmp_path / "target").mkdir()
+        (tmp_path / "target" / "gen.rs").write_text("")
+        for name, mtime in (("a.rs", 10**9), ("b.rs", 2 * 10**9), ("notes.md", 3 * 10**9)):
+            (tmp_path / name).write_text("")
+            os.utime(tmp_path / name, ns=(mtime, mtime))
+
+        assert tree_signature(str(tmp_path), ".rs") == f"2:{2 * 10**9}"
+        assert tree_signature(str(tmp_path), ".rs", exclude=str(tmp_path / "b.rs")) == f"1:{10**9}"
+
+    def test_memo_walks_once(self, tmp_path):
+        """Test a shared memo walks the tree once for the files of a batch."""
+        import result_cache
+
+        paths = []
+        for i in range(3):
+            (tmp_path / f"m{i}.rs").write_text("")
+            paths.append(str(tmp_path / f"m{i}.rs"))
+        expected = [result_cache.tree_signature(str(tmp_path), ".rs", exclude=path) for path in paths]
+
+        memo = {}
+        with patch("result_cache.os.walk", side_effect=os.walk) as walk:
+            signatures = [result_cache.tree_signature(str(tmp_path), ".rs", exclude=p, memo=memo) for p in paths]
+
+        assert walk.call_count == 1
+        assert signatures == expected
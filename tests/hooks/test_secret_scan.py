@@ -0,0 +1,183 @@
+"""Tests for secret_scan.py."""
+
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+
+class TestScanBytes:
+    """Tests for the combined-pattern scan."""
+
+    def test_line_numbers_and_rules(self):
+        """Test each match reports its rule and 1-based line."""
+        from secret_scan import scan_bytes
+
+        data = b'import os\n\nAPI_KEY = "abc"\nx = 1\npassword="hunter2"  # trailing\ntoken = "t"'
+
+        assert scan_bytes(data) == [
+            (3, "API key", 'API_KEY = "abc"'),
+            (5, "Password", 'password="hunter2"  # trailing'),
+            (6, "Token", 'token = "t"'),
+        ]
+
+    def test_no_match_builds_no_index(self):
+        """Test a clean file is not split into lines."""
+        import secret_scan
+
+        with patch("secret_scan.re.finditer") as mock_finditer:
+            assert secret_scan.scan_bytes(b"x = 1\n" * 1000) == []
+        mock_finditer.assert_not_called()
+
+    def test_skip_reason(self):
+        """Test binary and minified content is recognised."""
+        from secret_scan import SNIFF_BYTES, skip_reason
+
+        assert skip_reason(b'token = "t"\0\1\2') == "binary"
+        assert skip_reason(b"var a=1;" * SNIFF_BYTES) == "minified"
+        assert skip_reason(b'token = "t"\n' * SNIFF_BYTES) is None
+
+
+class TestScanFile:
+    """Tests for reading files."""
+
+    def test_large_file_mapped(self, tmp_path):
+        """Test files over the threshold are scanned through mmap."""
+        import secret_scan
+
+        path = tmp_path / "big.py"
+        path.write_bytes(b"x = 1\n" * 100 + b'secret = "s3"\n')
+
+        with patch("secret_scan.MMAP_THRESHOLD", 10):
+            hits, reason, sha = secret_scan.scan_file(str(path))
+
+        assert reason is None
+        assert hits == [(101, "Secret", 'secret = "s3"')]
+        assert sha == secret_scan.blob_sha(path.read_bytes())
+
+    def test_unreadable_file_reported(self, tmp_path):
+        """Test a missing file is reported as an error, not raised."""
+        from secret_scan import scan_batch
+
+        [(key, _, hits, _, error)] = scan_batch([("gone.py", str(tmp_path / "gone.py"), None)])
+
+        assert key == "gone.py" and hits == [] and error
+
+    def test_process_pool_keeps_order(self, tmp_path):
+        """Test results come back in input order from the process pool."""
+        import secret_scan
+
+        items = []
+        for i in range(12):
+            path = tmp_path / f"m{i}.py"
+            path.write_text(f'token = "{i}"\n' if i % 3 == 0 else "x = 1\n")
+            items.append((f"m{i}.py", str(path), None))
+
+        with patch("secret_scan.PARALLEL_THRESHOLD", 1), patch("secret_scan.BATCH_SIZE", 5):
+            results = list(secret_scan.scan_paths(items, workers=2))
+
+        assert [key for key, *_ in results] == [key for key, _, _ in items]
+        assert [key for key, _, hits, *_ in results if hits] == ["m0.py", "m3.py", "m6.py", "m9.py"]
+
+
+@pytest.fixture
+def sources(temp_home, tmp_path, monkeypatch):
+    """Two source files, one holding a secret, with the cache enabled."""
+    monkeypatch.delenv("CLAUDE_HOOK_CACHE", raising=False)
+    (tmp_path / "a.py").write_text('token = "t"\n')
+    (tmp_path / "b.py").write_text("x = 1\n")
+    return tmp_path
+
+
+class TestScanCache:
+    """Tests for the blob SHA keyed result cache."""
+
+    def test_blob_sha_matches_git(self, tmp_path):
+        """Test blob_sha agrees with git hash-object."""
+        from secret_scan import blob_sha
+
+        path = tmp_path / "a.py"
+        path.write_bytes(b'token = "t"\n\xff')
+        expected = subprocess.run(["git", "hash-object", str(path)], capture_output=True, text=True, check=True)
+
+        assert blob_sha(path.read_bytes()) == expected.stdout.strip()
+
+    def test_known_blobs_not_read(self, sources):
+        """Test a second scan with the same SHAs reads no file."""
+        import secret_scan
+
+        items = [(name, str(sources / name), None) for name in ("a.py", "b.py")]
+        first = secret_scan.scan_cached(items)
+        known = [(key, path, sha) for (key, path, _), (_, sha, *_) in zip(items, first)]
+
+        with patch("secret_scan.scan_file") as mock_scan:
+            second = secret_scan.scan_cached(known)
+
+        mock_scan.assert_not_called()
+        assert second == first
+        assert second[0][2] == [(1, "Token", 'token = "t"')]
+
+    def test_only_new_blobs_scanned(self, sources):
+        """Test files are hashed but only unseen content is stored."""
+        import secret_scan
+
+        secret_scan.scan_cached([("a.py", str(sources / "a.py"), None)])
+        (sources / "a.py").write_text('password = "p"\n')
+
+        [(_, _, hits, _, _)] = secret_scan.scan_cached([("a.py", str(sources / "a.py"), None)])
+
+        assert hits == [(1, "Password", 'password = "p"')]
+
+    def test_ruleset_change_misses(self, sources):
+        """Test results of another ruleset are not reused."""
+        import secret_scan
+
+        [(_, sha, *_)] = secret_scan.scan_cached([("a.py", str(sources / "a.py"), None)])
+
+        with patch("secret_scan.RULES", (("Token", r"\bnothing\b"),)), patch("secret_scan._pattern", None):
+            [(_, _, hits, _, _)] = secret_scan.scan_cached([("a.py", str(sources / "a.py"), sha)])
+
+        assert hits == []
+
+    def test_eviction(self, sources, monkeypatch):
+        """Test the oldest entries go beyond the size limit."""
+        import secret_scan
+
+        monkeypatch.setenv("CLAUDE_SECRET_SCAN_CACHE_SIZE", "1")
+        secret_scan.scan_cached([("a.py", str(sources / "a.py"), None)])
+        secret_scan.scan_cached([("b.py", str(sources / "b.py"), None)])
+
+        conn = secret_scan.connect()
+        assert conn.execute("SELECT count(*) FROM scans").fetchone() == (1,)
+
+    def test_disabled(self, sources, monkeypatch):
+        """Test CLAUDE_HOOK_CACHE=0 scans without touching the cache."""
+        import secret_scan
+
+        monkeypatch.setenv("CLAUDE_HOOK_CACHE", "0")
+        secret_scan.scan_cached([("a.py", str(sources / "a.py"), None)])
+
+        assert not (sources / "home" / ".claude" / "cache" / "secret-scan.sqlite").exists()
+
+
+class TestFindings:
+    """Tests for turning hits into report lines."""
+
+    def test_placeholders_in_tests_dropped(self):
+        """Test placeholder values are ignored in test files only."""
+        from secret_scan import findings
+
+        hits = [(1, "Token", 'token = "fake-token"'), (2, "Token", 'token = "real"')]
+
+        assert findings("tests/test_api.py", hits) == ['tests/test_api.py:2: token = "real"']
+        assert len(findings("app/api.py", hits)) == 2
+
+    def test_per_rule_cap(self):
+        """Test each rule reports at most two lines per file."""
+        from secret_scan import findings
+
+        hits = [(i, "Token", f'token = "{i}"') for i in range(1, 5)] + [(9, "Secret", 'secret = "s"')]
+
+        assert findings("a.py", hits) == [
+            'a.py:1: token = "1"', 'a.py:2: token = "2"', 'a.py:9: secret = "s"',
+        ]
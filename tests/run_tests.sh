@@ -20,6 +20,7 @@ error() { echo -e "${RED}[✗]${NC} $1"; }
 # Track results
 PYTHON_RESULT=0
 BATS_RESULT=0
+BENCH_RESULT=0
 
 # =============================================================================
 # Python tests
@@ -68,6 +69,27 @@ run_bats_tests() {
     fi
 }
 
+# =============================================================================
+# Hook latency benchmarks (SKIP_BENCH=1 to skip)
+# =============================================================================
+
+run_benchmarks() {
+    if [ "${SKIP_BENCH:-0}" = "1" ]; then
+        warn "Skipping hook benchmarks (SKIP_BENCH=1)"
+        return 0
+    fi
+    log "Running hook latency benchmarks..."
+
+    cd "$REPO_DIR"
+    if python3 tests/benchmarks/bench_hooks.py --check; then
+        log "No benchmark regressions!"
+        return 0
+    else
+        error "Benchmark regressions (re-record with: python3 tests/benchmarks/bench_hooks.py --save-baseline)"
+        return 1
+    fi
+}
+
 # =============================================================================
 # Syntax checks
 # =============================================================================
@@ -136,6 +158,14 @@ main() {
         exit_code=1
     fi
 
+    echo ""
+
+    # Benchmarks
+    if ! run_benchmarks; then
+        BENCH_RESULT=1
+        exit_code=1
+    fi
+
     # Summary
     echo ""
     echo "========================================"
@@ -149,6 +179,7 @@ main() {
         error "Some tests failed:"
         [ "$PYTHON_RESULT" -ne 0 ] && error "  - Python tests"
         [ "$BATS_RESULT" -ne 0 ] && error "  - Shell tests (bats)"
+        [ "$BENCH_RESULT" -ne 0 ] && error "  - Hook benchmarks"
     fi
 
     echo ""